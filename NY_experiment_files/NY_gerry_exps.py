@@ -1,43 +1,33 @@
-from gerrychain import Partition, Graph, updaters, Election
+from gerrychain import Partition, updaters
 from gerrychain.proposals import recom
 from gerrychain.tree import bipartition_tree
-from gerrychain.constraints import contiguous
 from gerrychain.optimization import Gingleator
 from functools import partial
 import random
-import jsonlines as jl
 import os
-from pyben import PyBenEncoder
 import json
+import sys
 
-SCRIPT_FILE_PATH = os.path.abspath(__file__)
-SCRIPT_DIR = os.path.dirname(SCRIPT_FILE_PATH)
-
-def safe_reward_partial_dist(part, minority_perc_col, threshold):
-    """Gingleator score function that rewards all opportunity districts plus partial credit for
-    the next highest district below threshold.
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-    As opposed to the function currently present in GerryChain, this function won't throw an
-    error if no districts are below threshold. If no such district exists, returns number of
-    opportunity districts.
+from chain_tools.assignment_export import AssignmentStreamWriter
+from chain_tools.checkpoint import Checkpointer, resumable_short_bursts
+from chain_tools.columnar_stats import open_stats_sink
+from chain_tools.contiguity import ContiguityPolicy
+from chain_tools.election_tally import ElectionTally
+from chain_tools.graph_cache import load_dual_graph
+from chain_tools.parallel_bursts import parallel_short_bursts
+from chain_tools.profiling import ChainProfiler
+from chain_tools.scoring import ShareUpdater, reward_partial_dist
 
-    Args:
-        part (Partition): GerryChain Partition object.
-        minority_perc_col (str): Column name for minority percentage.
-        threshold (float): Threshold for minority percentage.
-    """
-    try:
-        return Gingleator.reward_partial_dist(
-            part=part, minority_perc_col=minority_perc_col, threshold=threshold
-        )
-    except ValueError:
-        return Gingleator.num_opportunity_dists(
-            part=part, minority_perc_col=minority_perc_col, threshold=threshold
-        )
+SCRIPT_FILE_PATH = os.path.abspath(__file__)
+SCRIPT_DIR = os.path.dirname(SCRIPT_FILE_PATH)
 
 # Block_type indicates whether using block groups, VTDs, or tracts as underlying blocks
 # Election/party indicate what data we're using to do the gerrymandering
-def NY_gerry_exp(block_type, election, party, init_part, random_seed, total_steps):
+def NY_gerry_exp(block_type, election, party, init_part, random_seed, total_steps, stats_format="jsonl",
+    checkpoint_every=None, resume=False, parallel_bursts=None, profile_every=None, contiguity="full",
+    summary=False):
     """Runs 
 
     Args:
@@ -47,6 +37,21 @@ def NY_gerry_exp(block_type, election, party, init_part, random_seed, total_step
         init_part (int): Number of initial district partition to use for Markov chain (1–5)
         random_seed (int): Random seed for reproducibility.
         total_steps (int): Total number of steps for each chain.
+        stats_format (str): Format of the per-step updater output, "jsonl" or "columnar", or
+            "none" to write none and keep only the summaries, which requires ``summary``.
+        checkpoint_every (int, optional): Number of steps between checkpoints; None disables
+            checkpointing.
+        resume (bool): Whether to resume from the checkpoint left by an interrupted run.
+        parallel_bursts (int, optional): If given, run this many independent bursts per round on
+            as many worker processes (see chain_tools.parallel_bursts) instead of one at a time.
+        profile_every (int, optional): If given, time the stages of the chain loop and write
+            their histograms to a ``_metrics.jsonl`` file next to the updater output every
+            this many steps (see chain_tools.profiling).
+        contiguity (str): How the chain checks that districts stay connected: "full",
+            "changed-districts-only" or "audit-every-N" (see chain_tools.contiguity).
+        summary (bool): Whether to also keep histograms of the seats won and of the district
+            vote shares, written to a ``.summary.json`` file next to the updater output at every
+            checkpoint and at the end (see chain_tools.ensemble_summary.SummaryWriter).
     """
 
     # Load dual graph
@@ -55,10 +60,7 @@ def NY_gerry_exp(block_type, election, party, init_part, random_seed, total_step
         f"conn_{block_type}_dual_graph_init_parts.json"
     )
 
-    dual_graph = Graph.from_json(dual_graph_info)
-
-    # For use later when saving results
-    graph_node_order = list(dual_graph.nodes)
+    dual_graph = load_dual_graph(dual_graph_info)
 
     save_assignment_results_to = (
         f"{SCRIPT_DIR}/../NY_output_ensembles/{block_type}/gerry_toward_{party}_using_{election}_data/"
@@ -68,6 +70,7 @@ def NY_gerry_exp(block_type, election, party, init_part, random_seed, total_step
         f"{SCRIPT_DIR}/../NY_output_ensembles/{block_type}/gerry_toward_{party}_using_{election}_data/"
         f"init_part_{init_part}_random_seed_{random_seed}_burst_length_20_{total_steps}_steps_updaters.jsonl"
     )
+    save_checkpoint_to = save_assignment_results_to.replace("_assignment.ben", "_checkpoint.pkl")
                                 
     os.makedirs(os.path.dirname(save_assignment_results_to), exist_ok=True)
     os.makedirs(os.path.dirname(save_updaters_results_to), exist_ok=True)
@@ -78,38 +81,18 @@ def NY_gerry_exp(block_type, election, party, init_part, random_seed, total_step
     random.seed(random_seed)
 
     # Define updaters
-    # Only tracking vote totals for Gingleator, so define different updaters depending on whether we're gerrymandering on Pres vs. Sen election data
-    if election == "pres":
-        my_updaters = {
-            "population": updaters.Tally(pop_col, alias="population"),
-            "pres_election": Election(
-                "pres_election", {"D": "PRES20DEM", "R": "PRES20REP"}
-            ),
-            "sen_election": Election(
-                "sen_election", {"D": "SEN22DEM", "R": "SEN22REP"}
-            ),
-            "D_vote_population": updaters.Tally("PRES20DEM", alias="D_vote_population"),
-            "R_vote_population": updaters.Tally("PRES20REP", alias="R_vote_population"),
-            "total_vote_population": updaters.Tally(
-                ["PRES20DEM", "PRES20REP"], alias="total_vote_population"
-            ),
-        }
-
-    elif election == "sen":
-        my_updaters = {
-            "population": updaters.Tally(pop_col, alias="population"),
-            "pres_election": Election(
-                "pres_election", {"D": "PRES20DEM", "R": "PRES20REP"}
-            ),
-            "sen_election": Election(
-                "sen_election", {"D": "SEN22DEM", "R": "SEN22REP"}
-            ),
-            "D_vote_population": updaters.Tally("SEN22DEM", alias="D_vote_population"),
-            "R_vote_population": updaters.Tally("SEN22REP", alias="R_vote_population"),
-            "total_vote_population": updaters.Tally(
-                ["SEN22DEM", "SEN22REP"], alias="total_vote_population"
-            ),
-        }
+    # For Gingleator, take "minority group" to be whichever party we're gerrymandering toward, and
+    # its share of the votes in whichever election (Pres vs. Sen) we're gerrymandering with
+    my_updaters = {
+        "population": updaters.Tally(pop_col, alias="population"),
+        "pres_election": ElectionTally(
+            "pres_election", {"D": "PRES20DEM", "R": "PRES20REP"}, pop_col=pop_col
+        ),
+        "sen_election": ElectionTally(
+            "sen_election", {"D": "SEN22DEM", "R": "SEN22REP"}
+        ),
+        "minority_share": ShareUpdater(f"{election}_election", party),
+    }
 
     initial_partition = Partition(
         dual_graph,
@@ -128,28 +111,51 @@ def NY_gerry_exp(block_type, election, party, init_part, random_seed, total_step
         method=partial(bipartition_tree, allow_pair_reselection=True),
     )
 
-    # For Gingleator, take "minority group" to be whichever party we're gerrymandering toward
-    minority_pop_col = f"{party}_vote_population"
+    # Opt-in per-stage timings, written next to the updater output
+    profiler = ChainProfiler(
+        save_updaters_results_to.replace("_updaters.jsonl", "_metrics.jsonl") if profile_every else None,
+        every=profile_every,
+    )
+    proposal = profiler.instrument_proposal(proposal)
 
     # Define recom chain
     # Gingleator score function should return number of districts where over 50% of the votes go to gerrymandered party
     # + percentage of that party in district where it gets the highest vote share under 50%
     recom_chain = Gingleator(
         proposal=proposal,
-        constraints=[contiguous],
+        constraints=[ContiguityPolicy(contiguity)],
         threshold=0.5,
         initial_state=initial_partition,
-        total_pop_col="total_vote_population",
-        minority_pop_col=minority_pop_col,
-        score_function=safe_reward_partial_dist,
+        minority_perc_col="minority_share",
+        score_function=profiler.wrap("score", reward_partial_dist),
     )
 
+    # Restores the random state and chain position if resuming
+    checkpointer = Checkpointer(save_checkpoint_to, every=checkpoint_every, resume=resume)
+    checkpointer.begin()
+
     # Save assignments, updater results
     with (
-        PyBenEncoder(save_assignment_results_to, overwrite=True) as encoder,
-        jl.open(save_updaters_results_to, "w") as updater_output_file
+        AssignmentStreamWriter(
+            save_assignment_results_to, dual_graph,
+            resume_position=checkpointer.output_position("assignment")
+        ) as assignment_writer,
+        open_stats_sink(
+            save_updaters_results_to, stats_format, initial_partition.parts,
+            resume_position=checkpointer.output_position("updaters"), summary=summary
+        ) as updater_output_file,
+        profiler
     ):
-        for i, plan in enumerate(recom_chain.short_bursts(20, round(total_steps / 20))):
+        checkpointer.track(assignment=assignment_writer, updaters=updater_output_file)
+        profiler.start(first_step=checkpointer.steps_done)
+        if parallel_bursts is None:
+            plans = resumable_short_bursts(recom_chain, 20, round(total_steps / 20), checkpointer)
+        else:
+            plans = parallel_short_bursts(
+                recom_chain, 20, round(total_steps / (20 * parallel_bursts)), parallel_bursts,
+                random_seed, checkpointer
+            )
+        for i, plan in enumerate(plans, start=checkpointer.steps_done):
             if i % 100 == 0:
                 print(f"Processing plan {i}...")
 
@@ -157,47 +163,31 @@ def NY_gerry_exp(block_type, election, party, init_part, random_seed, total_step
                 plan is not None
             ), "Something went terribly wrong. There is no output partition."
 
-            # Save updaters
-            pres_election = plan["pres_election"]
-            sen_election = plan["sen_election"]
-
-            pres_seats_won = {
-                "D": pres_election.seats("D"),
-                "R": pres_election.seats("R"),
-            }
-
-            sen_seats_won = {
-                "D": sen_election.seats("D"),
-                "R": sen_election.seats("R"),
-            }
-
-            pres_regions = pres_election.regions
-            sen_regions = sen_election.regions
-
-            pres_d_counts = pres_election.counts("D")
-            pres_r_counts = pres_election.counts("R")
-            pres_d_votes_by_district = dict(zip(pres_regions, pres_d_counts))
-            pres_r_votes_by_district = dict(zip(pres_regions, pres_r_counts))
-
-            sen_d_counts = sen_election.counts("D")
-            sen_r_counts = sen_election.counts("R")
-            sen_d_votes_by_district = dict(zip(sen_regions, sen_d_counts))
-            sen_r_votes_by_district = dict(zip(sen_regions, sen_r_counts))
-
-            pres_district_winners = {region: ("D" if d > r else "R") for region, d, r in zip(pres_regions, pres_d_counts, pres_r_counts)}
-            sen_district_winners = {region: ("D" if d > r else "R") for region, d, r in zip(sen_regions, sen_d_counts, sen_r_counts)}
-
-            record = {
-                "sample": i + 1,
-                "population": dict(plan["population"]),
-                "Pres seats won": pres_seats_won,
-                "Pres D votes": pres_d_votes_by_district,
-                "Pres R votes": pres_r_votes_by_district,
-                "Sen seats won": sen_seats_won,
-                "Sen D votes": sen_d_votes_by_district,
-                "Sen R votes": sen_r_votes_by_district,
-                "District Pres seats": pres_district_winners,
-                "District Sen seats": sen_district_winners
-            }
-
-            updater_output_file.write(record)
\ No newline at end of file
+            # Save assignment; only the nodes flipped since the previous step are rewritten
+            with profiler.timed("ben_write"):
+                assignment_writer.write(plan)
+
+            # Save updaters; per-district values are arrays ordered like the sorted districts
+            with profiler.timed("updaters"):
+                pres_election = plan["pres_election"]
+                sen_election = plan["sen_election"]
+
+                record = {
+                    "sample": i + 1,
+                    "population": pres_election.population,
+                    "Pres seats won": {"D": pres_election.seats("D"), "R": pres_election.seats("R")},
+                    "Pres D votes": pres_election.votes["D"],
+                    "Pres R votes": pres_election.votes["R"],
+                    "Sen seats won": {"D": sen_election.seats("D"), "R": sen_election.seats("R")},
+                    "Sen D votes": sen_election.votes["D"],
+                    "Sen R votes": sen_election.votes["R"],
+                    "District Pres seats": pres_election.winners(),
+                    "District Sen seats": sen_election.winners()
+                }
+
+            with profiler.timed("stats_write"):
+                updater_output_file.write(record)
+
+            profiler.step()
+
+    checkpointer.finish()
@@ -1,5 +1,5 @@
 import click
-from NY_neutral_exps import NY_neutral_exp
+from NY_neutral_exps import ContiguityPolicy, NY_neutral_exp
 
 @click.command()
 @click.option(
@@ -26,11 +26,55 @@ from NY_neutral_exps import NY_neutral_exp
     help="Number of districting plans per building block graph",
     type=int
 )
+@click.option(
+    "--stats-format",
+    default="jsonl",
+    show_default=True,
+    help="Format of the per-step updater output; none writes none, to keep only --summary",
+    type=click.Choice(["jsonl", "columnar", "none"]),
+)
+@click.option(
+    "--checkpoint-every",
+    default=None,
+    help="Save a resumable checkpoint every this many steps (disabled by default)",
+    type=int,
+)
+@click.option(
+    "--resume",
+    is_flag=True,
+    help="Resume from the checkpoint left by an interrupted run with the same arguments",
+)
+@click.option(
+    "--profile-every",
+    default=None,
+    help="Time the stages of the chain loop and write their histograms to a _metrics.jsonl file every this many steps",
+    type=click.IntRange(min=1),
+)
+@click.option(
+    "--contiguity",
+    default="full",
+    show_default=True,
+    help="How to check that districts stay connected: full, changed-districts-only, or audit-every-N to check every district on every N-th proposal only",
+)
+@click.option(
+    "--summary",
+    is_flag=True,
+    help="Also write histograms of the seats won and district vote shares to a .summary.json file next to the updater output",
+)
 
 def main(
-    block_type, init_part, random_seed, total_steps
+    block_type, init_part, random_seed, total_steps, stats_format,
+    checkpoint_every, resume, profile_every, contiguity, summary
 ):
-    NY_neutral_exp(block_type, init_part, random_seed, total_steps)
+    if stats_format == "none" and not summary:
+        raise click.UsageError("--stats-format none writes no statistics at all; add --summary to keep summaries of them")
+    try:
+        ContiguityPolicy(contiguity)
+    except ValueError as error:
+        raise click.BadParameter(str(error), param_hint="--contiguity")
+    NY_neutral_exp(block_type, init_part, random_seed, total_steps, stats_format,
+        checkpoint_every=checkpoint_every, resume=resume, profile_every=profile_every,
+        contiguity=contiguity, summary=summary)
 
 
 if __name__ == "__main__":
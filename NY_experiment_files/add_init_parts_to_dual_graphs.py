@@ -1,21 +1,32 @@
-from gerrychain import Partition, Graph, updaters
-from gerrychain.tree import recursive_tree_part
-import random
+from gerrychain import Graph
 import os
+import sys
 from networkx.readwrite import json_graph
 import json
 
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from chain_tools.initial_partitions import format_counters, initial_partitions
+from chain_tools.seeding import derive_seed
+
 SCRIPT_FILE_PATH = os.path.abspath(__file__)
 SCRIPT_DIR = os.path.dirname(SCRIPT_FILE_PATH)
 
 random_seed = 547
-random.seed(random_seed)
 
-def add_init_parts(block_type):
+def add_init_parts(block_type, workers=None, timeout=None):
     """For each of the NY dual graphs, finds five initial partitions
     (assignments of units to districts).
     Saves a new dual graph where these initial partition are saved as
     node attributes "init_part_1", "init_part_2", "init_part_3", etc.
+
+    The five partitions are drawn in parallel, each seeded from the block type and its
+    number, so they do not depend on the number of workers.
+
+    Args:
+        block_type (str): "blockgroups", "vtds" or "tracts".
+        workers (int, optional): Number of worker processes. Defaults to one per partition.
+        timeout (float, optional): Seconds allowed per partition before giving up.
     """
 
     dual_graph_info = (
@@ -31,37 +42,27 @@ def add_init_parts(block_type):
 
     dual_graph = Graph.from_json(dual_graph_info)
 
-    # Set pop data, random seed
+    # Set pop data
     pop_col = "TOT_POP"
 
-    my_updaters = {
-        "population": updaters.Tally(pop_col, alias="population")
-    }
-
     # Find five initial partitions
-    for i in range(1,6):
-
-        n_found = 0
-        while n_found < 1:
-            try:
-                init_part_i = Partition.from_random_assignment(
-                    graph=dual_graph,
-                    n_parts=63,
-                    pop_col=pop_col,
-                    updaters=my_updaters,
-                    epsilon=0.01,
-                    method=recursive_tree_part,
-                )
-                n_found += 1
-            except Exception:
-                pass
-
-        assignment = init_part_i.assignment
+    partitions, counters = initial_partitions(
+        dual_graph,
+        63,
+        pop_col,
+        0.01,
+        5,
+        derive_seed(random_seed, block_type),
+        workers=workers,
+        timeout=timeout,
+    )
+    print(f"Initial partitions of {block_type}: {format_counters(counters)}")
 
-        # Add initial partition as attribute to dual graph
+    # Add initial partitions as attributes to dual graph
+    for i, assignment in enumerate(partitions, start=1):
         for node, district in assignment.items():
             dual_graph.nodes[node][f"init_part_{i}"] = district
 
-        # Write dual graph to new file
+    # Write dual graph to new file
     with open(new_file, "w") as f:
         json.dump(json_graph.adjacency_data(dual_graph), f)
\ No newline at end of file
@@ -8,11 +8,23 @@ from add_init_parts_to_dual_graphs import add_init_parts
     help="",
     type=click.Choice(["blockgroups", "vtds", "tracts"]),
 )
+@click.option(
+    "--workers",
+    default=None,
+    type=int,
+    help="Number of worker processes (default: one per initial partition)",
+)
+@click.option(
+    "--timeout",
+    default=None,
+    type=float,
+    help="Seconds allowed per initial partition before giving up (default: no limit)",
+)
 
 def main(
-    block_type
+    block_type, workers, timeout
 ):
-    add_init_parts(block_type)
+    add_init_parts(block_type, workers, timeout)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,41 @@
+import click
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from chain_tools.graph_cache import compile_graph
+
+SCRIPT_FILE_PATH = os.path.abspath(__file__)
+SCRIPT_DIR = os.path.dirname(SCRIPT_FILE_PATH)
+
+@click.command()
+@click.option(
+    "--block-type",
+    "block_types",
+    multiple=True,
+    default=["blockgroups", "vtds", "tracts"],
+    show_default=True,
+    help="Dual graphs to compile; repeat the option to select several",
+    type=click.Choice(["blockgroups", "vtds", "tracts"]),
+)
+
+def main(
+    block_types
+):
+    """Compiles the NY dual graphs (with initial partitions) into the binary form that
+    NY_gerry_exps.py and NY_neutral_exps.py load instead of the JSON when it is up to date.
+    """
+    for block_type in block_types:
+        dual_graph_info = (
+            f"{SCRIPT_DIR}/NY_dual_graphs/connected_dual_graphs_with_initial_partitions/"
+            f"conn_{block_type}_dual_graph_init_parts.json"
+        )
+        if not os.path.exists(dual_graph_info):
+            print(f"Skipping {block_type}: {dual_graph_info} does not exist")
+            continue
+        print(f"Compiled {compile_graph(dual_graph_info)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,289 @@
+import click
+import csv
+import json
+import os
+import re
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from chain_tools.columnar_stats import ColumnarStats, columnar_paths
+from chain_tools.ensemble_summary import (
+    ElectionSummary, merge_summaries, read_summary, record_elections, summary_path
+)
+
+TOP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Where the runners write their updater output, relative to the output directory, without the
+# "_updaters.jsonl" / "_updaters.stats" suffix
+PATH_PATTERNS = {
+    "syn": re.compile(
+        r"(?P<experiment>[^/]+)/r_units_(?P<r_units>\d+)_map_(?P<map>\d+)/block_size_(?P<block_size>\d+)/"
+        r"sample_(?P<sample>\d+)/init_part_(?P<init_part>\d+)_random_seed_(?P<seed>\d+)_"
+        r"burst_length_\d+_steps_(?P<steps>\d+)"
+    ),
+    "NY": re.compile(
+        r"(?P<block_type>[^/]+)/(?P<experiment>[^/]+)/init_part_(?P<init_part>\d+)_random_seed_(?P<seed>\d+)_"
+        r"burst_length_\d+_(?P<steps>\d+)_steps"
+    ),
+}
+DIMENSIONS = [
+    "tree", "experiment", "block_type", "r_units", "map", "block_size", "sample", "init_part", "seed",
+    "steps",
+]
+
+BATCH_ROWS = 10000
+
+
+def find_stats_files(roots):
+    """Updater output files under ``roots`` with the path dimensions of each.
+
+    A run written in the columnar format is read from its ``.stats`` file rather than JSONL, and
+    a run that kept summaries (see chain_tools.ensemble_summary.SummaryWriter) from those.
+
+    Returns:
+        tuple: List of ``(path, dimensions)``, with ``path`` the JSONL path the runner was given,
+        sorted by path, and the number of files whose path matched no known layout.
+    """
+    found = {}
+    unmatched = 0
+    for root in roots:
+        for directory, _, files in os.walk(root):
+            for file in files:
+                if file.endswith("_updaters.jsonl"):
+                    stem = file[: -len("_updaters.jsonl")]
+                elif file.endswith("_updaters.stats.json"):
+                    stem = file[: -len("_updaters.stats.json")]
+                elif file.endswith("_updaters.summary.json"):
+                    stem = file[: -len("_updaters.summary.json")]
+                else:
+                    continue
+                relative = os.path.relpath(os.path.join(directory, stem), root).replace(os.sep, "/")
+                for tree, pattern in PATH_PATTERNS.items():
+                    match = pattern.fullmatch(relative)
+                    if match is not None:
+                        dimensions = dict.fromkeys(DIMENSIONS, "")
+                        dimensions.update(match.groupdict(), tree=tree)
+                        found[os.path.join(directory, f"{stem}_updaters.jsonl")] = dimensions
+                        break
+                else:
+                    unmatched += 1
+    return sorted(found.items()), unmatched
+
+
+def summarize_files(tasks):
+    """Summarizes updater output files, merging those of the same group.
+
+    Args:
+        tasks (list): ``(path, group)`` pairs, with ``path`` as returned by
+            :func:`find_stats_files` and ``group`` a tuple of dimension values.
+
+    Returns:
+        dict: ``{group: (number of files, {election: ElectionSummary})}``.
+    """
+    groups = {}
+    for path, group in tasks:
+        files, summaries = groups.get(group, (0, {}))
+        groups[group] = (files + 1, merge_summaries(summaries, summarize_file(path)))
+    return groups
+
+
+def summarize_file(jsonl_path):
+    """Summarizes the elections of one run's updater output, streaming it in batches.
+
+    Args:
+        jsonl_path (str): JSONL path the runner was given; the run's summaries are read instead
+            if it kept them (and they are not older than its per-step output), and its columnar
+            twin if it was written in that format.
+
+    Returns:
+        dict: ElectionSummary by election ("election" for the synthetic runs, "Pres" and "Sen"
+        for NY).
+    """
+    # A summary older than the per-step output was left by an earlier run
+    per_step = [path for path in (jsonl_path, columnar_paths(jsonl_path)[0]) if os.path.exists(path)]
+    if os.path.exists(summary_path(jsonl_path)) and all(
+        os.path.getmtime(summary_path(jsonl_path)) >= os.path.getmtime(path) for path in per_step
+    ):
+        return read_summary(jsonl_path)
+
+    summaries = {}
+    if not os.path.exists(jsonl_path):
+        stats = ColumnarStats(jsonl_path)
+        elections = record_elections(stats.columns)
+        for start in range(0, len(stats), BATCH_ROWS):
+            rows = stats.rows[start:start + BATCH_ROWS]
+            for election, (d_key, r_key) in elections.items():
+                _add(summaries, election, rows[d_key], rows[r_key])
+        return summaries
+
+    with open(jsonl_path) as f:
+        elections = None
+        batch = []
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                # A run killed mid-write can leave half a line at the end
+                print(f"Skipping an unreadable line of {jsonl_path}", file=sys.stderr)
+                continue
+            if elections is None:
+                elections = record_elections(record)
+            batch.append(record)
+            if len(batch) == BATCH_ROWS:
+                _add_records(summaries, elections, batch)
+                batch = []
+        if batch:
+            _add_records(summaries, elections, batch)
+    return summaries
+
+
+def _add_records(summaries, elections, records):
+    for election, (d_key, r_key) in elections.items():
+        districts = list(records[0][d_key])
+        d_votes = [[record[d_key][district] for district in districts] for record in records]
+        r_votes = [[record[r_key][district] for district in districts] for record in records]
+        _add(summaries, election, d_votes, r_votes)
+
+
+def _add(summaries, election, d_votes, r_votes):
+    d_votes = np.asarray(d_votes)
+    if election not in summaries:
+        summaries[election] = ElectionSummary(d_votes.shape[1])
+    summaries[election].add(d_votes, r_votes)
+
+
+def table_rows(group, files, election, summary, quantiles):
+    """Rows of the output table for one group and election, in long format: the group's
+    dimension values, the election, then (statistic, index, value)."""
+    prefix = [*group, election]
+    rows = [
+        [*prefix, "files", "", files],
+        [*prefix, "plans", "", summary.plans],
+        [*prefix, "mean D seats", "", summary.mean_seats("D")],
+        [*prefix, "mean R seats", "", summary.mean_seats("R")],
+    ]
+    for party in ("D", "R"):
+        rows.extend(
+            [*prefix, f"{party} seats", seats, int(count)]
+            for seats, count in enumerate(summary.seats[party]) if count
+        )
+    rows.extend(
+        [*prefix, "mean D share", rank, share] for rank, share in enumerate(summary.mean_shares())
+    )
+    for quantile, shares in zip(quantiles, summary.share_quantiles(quantiles)):
+        rows.extend([*prefix, f"D share q{quantile:g}", rank, share] for rank, share in enumerate(shares))
+    return rows
+
+
+def _dimension_list(ctx, param, value):
+    names = [name.strip() for name in value.split(",") if name.strip()]
+    unknown = [name for name in names if name not in DIMENSIONS]
+    if unknown:
+        raise click.BadParameter(f"unknown dimensions {unknown}; choose from {DIMENSIONS}")
+    return names
+
+
+def _quantile_list(ctx, param, value):
+    try:
+        quantiles = [float(q) for q in value.split(",")]
+    except ValueError:
+        raise click.BadParameter("expected comma-separated numbers")
+    if not all(0 <= q <= 1 for q in quantiles):
+        raise click.BadParameter("quantiles must be between 0 and 1")
+    return quantiles
+
+
+@click.command()
+@click.option(
+    "--root",
+    "roots",
+    multiple=True,
+    default=[f"{TOP_DIR}/output_stats", f"{TOP_DIR}/NY_output_ensembles"],
+    show_default=True,
+    help="Directory of runner output to aggregate; repeat for several",
+)
+@click.option(
+    "--group-by",
+    default="tree,experiment,block_type,r_units,map,block_size",
+    show_default=True,
+    callback=_dimension_list,
+    help=f"Comma-separated path dimensions to group the runs by, from: {', '.join(DIMENSIONS)}",
+)
+@click.option(
+    "--quantiles",
+    default="0.05,0.25,0.5,0.75,0.95",
+    show_default=True,
+    callback=_quantile_list,
+    help="Comma-separated quantiles of each district's D share to report",
+)
+@click.option(
+    "--output",
+    default=f"{TOP_DIR}/analysis/results/ensemble_summary.csv",
+    show_default=True,
+    help="CSV file to write the table to",
+)
+@click.option(
+    "--sketches",
+    default=None,
+    help="Also write each group's mergeable summaries to this JSON file",
+)
+@click.option("--workers", default=os.cpu_count(), show_default=True, type=int, help="Number of worker processes")
+@click.option("--files-per-task", default=50, show_default=True, type=click.IntRange(min=1), help="Files each worker reads per task")
+def main(roots, group_by, quantiles, output, sketches, workers, files_per_task):
+    """Aggregates the per-step updater output of the synthetic and NY runners into one table.
+
+    Every file is streamed in batches (JSONL line by line, columnar output through a memory map)
+    into a summary of each election: histograms of the seats each party wins and of the D share
+    of each district ranked by D share, from which the mean seats and share quantiles are read.
+    Files are summarized on a process pool and the summaries of a group merged exactly, so
+    memory does not grow with the number of steps or files.
+
+    The table is a CSV in long format, one row per group dimension values, election ("election"
+    for synthetic runs, "Pres" and "Sen" for NY), statistic, index and value. "D seats" and
+    "R seats" rows give the number of plans (value) in which the party wins index seats; "mean D
+    share" and "D share q<quantile>" rows give the D share of the district of rank index, 0
+    being the district with the lowest D share in each plan. Shares are rounded to 1/1000.
+    """
+    found, unmatched = find_stats_files([root for root in roots if os.path.isdir(root)])
+    if unmatched:
+        print(f"Skipping {unmatched} updater files whose paths match no runner's layout")
+    tasks = [(path, tuple(dimensions[name] for name in group_by)) for path, dimensions in found]
+    chunks = [tasks[i:i + files_per_task] for i in range(0, len(tasks), files_per_task)]
+    print(f"Aggregating {len(tasks)} files in {len(chunks)} tasks on {workers} workers")
+
+    groups = {}
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        for n_done, result in enumerate(executor.map(summarize_files, chunks), start=1):
+            for group, (files, summaries) in result.items():
+                total_files, merged = groups.get(group, (0, {}))
+                groups[group] = (total_files + files, merge_summaries(merged, summaries))
+            if n_done % 100 == 0 or n_done == len(chunks):
+                print(f"Finished {n_done} of {len(chunks)} tasks")
+
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow([*group_by, "election", "statistic", "index", "value"])
+        for group, (files, summaries) in sorted(groups.items()):
+            for election, summary in sorted(summaries.items()):
+                writer.writerows(table_rows(group, files, election, summary, quantiles))
+    print(f"Wrote {len(groups)} groups to {output}")
+
+    if sketches is not None:
+        with open(sketches, "w") as f:
+            json.dump([
+                {
+                    "group": dict(zip(group_by, group)),
+                    "files": files,
+                    "elections": {election: summary.to_dict() for election, summary in summaries.items()},
+                }
+                for group, (files, summaries) in sorted(groups.items())
+            ], f)
+
+
+if __name__ == "__main__":
+    main()
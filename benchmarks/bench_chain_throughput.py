@@ -0,0 +1,278 @@
+import click
+import json
+import multiprocessing
+import os
+import platform
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from functools import partial, wraps
+
+from gerrychain import MarkovChain, Partition, updaters
+from gerrychain.accept import always_accept
+from gerrychain.constraints import contiguous
+from gerrychain.optimization import Gingleator
+from gerrychain.proposals import recom
+from gerrychain.tree import bipartition_tree
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from chain_tools.assignment_export import AssignmentStreamWriter
+from chain_tools.columnar_stats import open_stats_sink
+from chain_tools.election_tally import ElectionTally
+from chain_tools.graph_cache import load_dual_graph
+from chain_tools.scoring import ShareUpdater, reward_partial_dist
+
+TOP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+STAGES = ["proposal", "updaters", "constraints", "scoring", "record", "output"]
+
+
+class StageTimer:
+    """Accumulates wall-clock time per stage of the chain loop."""
+
+    def __init__(self):
+        self.seconds = dict.fromkeys(STAGES, 0.0)
+
+    def wrap(self, stage, function):
+        """Returns ``function`` with the time spent in it added to ``stage``."""
+        @wraps(function)
+        def timed(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                self.seconds[stage] += time.perf_counter() - start
+
+        return timed
+
+
+def ny_case(block_type):
+    """Chain setup mirroring NY_neutral_exps.py / NY_gerry_exps.py (pres election, party D)."""
+    graph = load_dual_graph(
+        f"{TOP_DIR}/NY_experiment_files/NY_dual_graphs/connected_dual_graphs_with_initial_partitions/"
+        f"conn_{block_type}_dual_graph_init_parts.json"
+    )
+    my_updaters = {
+        "population": updaters.Tally("TOT_POP", alias="population"),
+        "pres_election": ElectionTally(
+            "pres_election", {"D": "PRES20DEM", "R": "PRES20REP"}, pop_col="TOT_POP"
+        ),
+        "sen_election": ElectionTally("sen_election", {"D": "SEN22DEM", "R": "SEN22REP"}),
+        "minority_share": ShareUpdater("pres_election", "D"),
+    }
+    proposal = partial(
+        recom, pop_col="TOT_POP", pop_target=320655, epsilon=0.01, node_repeats=2,
+        method=partial(bipartition_tree, allow_pair_reselection=True),
+    )
+    return graph, my_updaters, proposal, ["pres_election", "sen_election"], "minority_share"
+
+
+def syn_case(block_size):
+    """Chain setup mirroring the GG experiment of syn_experiment.py on one gerrymandered building block sample."""
+    graph = load_dual_graph(
+        f"{TOP_DIR}/syn_experiment_files/syn_building_block_partitions/gerry/"
+        f"r_units_72_map_1_burst_length_20/block_size_{block_size}/sample_1.json"
+    )
+    my_updaters = {
+        "population": updaters.Tally("population", alias="population"),
+        "election": ElectionTally("election", {"D": "D", "R": "R"}, pop_col="population"),
+        "D_share": ShareUpdater("election", "D", denominator="population"),
+    }
+    proposal = partial(recom, pop_col="population", pop_target=12, epsilon=0, node_repeats=2)
+    return graph, my_updaters, proposal, ["election"], "D_share"
+
+
+def run_case(case, mode, steps, random_seed):
+    """Runs one fixed-seed chain with output to a temporary directory and returns its timings.
+
+    Proposal time includes the updaters the proposal itself reads (e.g. cut edges).
+    "updaters" computes every updater of the case on each proposed plan right after the proposal.
+    They are lazy, so otherwise their cost would land in whichever stage reads them first: the
+    score function in short bursts, the record in a neutral chain. "constraints" is the
+    contiguity check, "scoring" the Gingleator score function, "record" building each step's
+    record from the computed updaters and "output" writing the assignment and record.
+    """
+    kind, value = case.split(":")
+    graph, my_updaters, proposal, elections, share_col = (
+        ny_case(value) if kind == "ny" else syn_case(int(value))
+    )
+    random.seed(random_seed)
+    timer = StageTimer()
+    initial_partition = Partition(graph, assignment="init_part_1", updaters=my_updaters)
+    timed_proposal = timer.wrap("proposal", proposal)
+    compute_updaters = timer.wrap("updaters", lambda plan: [plan[name] for name in my_updaters])
+
+    def propose(partition):
+        plan = timed_proposal(partition)
+        compute_updaters(plan)
+        return plan
+
+    timed_contiguous = timer.wrap("constraints", contiguous)
+
+    if mode == "neutral":
+        plans = MarkovChain(
+            proposal=propose, constraints=[timed_contiguous], accept=always_accept,
+            initial_state=initial_partition, total_steps=steps,
+        )
+    else:
+        optimizer = Gingleator(
+            proposal=propose,
+            constraints=[timed_contiguous],
+            threshold=0.5,
+            initial_state=initial_partition,
+            minority_perc_col=share_col,
+            score_function=timer.wrap("scoring", reward_partial_dist),
+        )
+        plans = optimizer.short_bursts(20, steps // 20)
+
+    def make_record(i, plan):
+        record = {"step": i}
+        for election in elections:
+            tallies = plan[election]
+            record[f"{election} seats won"] = {"D": tallies.seats("D"), "R": tallies.seats("R")}
+            record[f"{election} D votes"] = tallies.votes["D"]
+            record[f"{election} R votes"] = tallies.votes["R"]
+            record[f"{election} winners"] = tallies.winners()
+        return record
+
+    make_record = timer.wrap("record", make_record)
+
+    with tempfile.TemporaryDirectory() as output_dir:
+        with (
+            AssignmentStreamWriter(f"{output_dir}/assignment.ben", graph) as assignment_writer,
+            open_stats_sink(
+                f"{output_dir}/updaters.jsonl", "jsonl", initial_partition.parts
+            ) as updater_output_file,
+        ):
+            def write(plan, record):
+                assignment_writer.write(plan)
+                updater_output_file.write(record)
+
+            write = timer.wrap("output", write)
+            # Only the loop is timed, but MarkovChain already checked the initial plan
+            timer.seconds = dict.fromkeys(STAGES, 0.0)
+            start = time.perf_counter()
+            compute_updaters(initial_partition)
+            for i, plan in enumerate(plans):
+                write(plan, make_record(i, plan))
+            seconds = time.perf_counter() - start
+
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    peak_rss_mb = peak_rss / 2**20 if sys.platform == "darwin" else peak_rss / 2**10
+
+    stages = dict(timer.seconds)
+    stages["other"] = max(0.0, seconds - sum(stages.values()))
+    return {
+        "case": case,
+        "mode": mode,
+        "steps": steps,
+        "nodes": len(graph),
+        "seconds": seconds,
+        "steps_per_sec": steps / seconds,
+        "stage_seconds": stages,
+        "peak_rss_mb": peak_rss_mb,
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"], cwd=TOP_DIR, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_comparison(results, baseline_path):
+    with open(baseline_path) as f:
+        baseline = {(r["case"], r["mode"]): r for r in json.load(f)["results"]}
+    for result in results:
+        old = baseline.get((result["case"], result["mode"]))
+        if old is None:
+            continue
+        print(
+            f"{result['case']:>10} {result['mode']:>12}: "
+            f"{result['steps_per_sec'] / old['steps_per_sec']:.2f}x steps/sec, "
+            f"{result['peak_rss_mb'] / old['peak_rss_mb']:.2f}x peak RSS vs {baseline_path}"
+        )
+
+
+@click.command()
+@click.option(
+    "--case",
+    "cases",
+    multiple=True,
+    default=["ny:tracts", "syn:2", "syn:3", "syn:4", "syn:6"],
+    show_default=True,
+    help='Graphs to benchmark: "ny:<block type>" or "syn:<block size>"; repeat to select several',
+)
+@click.option(
+    "--mode",
+    "modes",
+    multiple=True,
+    default=["neutral", "short_bursts"],
+    show_default=True,
+    type=click.Choice(["neutral", "short_bursts"]),
+)
+@click.option("--ny-steps", default=200, show_default=True, type=int, help="Steps per NY chain")
+@click.option("--syn-steps", default=2000, show_default=True, type=int, help="Steps per synthetic chain")
+@click.option("--random-seed", default=1, show_default=True, type=int)
+@click.option(
+    "--output",
+    default=f"{TOP_DIR}/benchmarks/results/chain_throughput.json",
+    show_default=True,
+    help="Where to save the results as JSON",
+)
+@click.option(
+    "--compare",
+    default=None,
+    help="Results JSON of an earlier run to report speedups against",
+)
+def main(cases, modes, ny_steps, syn_steps, random_seed, output, compare):
+    """Measures ReCom step throughput on fixed-seed short chains.
+
+    Each (case, mode) runs in a fresh process, so that its peak RSS is its own.
+    """
+    context = multiprocessing.get_context("spawn")
+    results = []
+    for case in cases:
+        steps = ny_steps if case.startswith("ny:") else syn_steps
+        for mode in modes:
+            with context.Pool(1) as pool:
+                result = pool.apply(run_case, (case, mode, steps, random_seed))
+            stages = ", ".join(
+                f"{stage} {seconds / result['seconds']:.0%}"
+                for stage, seconds in result["stage_seconds"].items()
+            )
+            print(
+                f"{case:>10} {mode:>12}: {result['steps_per_sec']:8.1f} steps/sec, "
+                f"peak RSS {result['peak_rss_mb']:.0f} MB ({stages})"
+            )
+            results.append(result)
+
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(
+            {
+                "commit": git_commit(),
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "random_seed": random_seed,
+                "results": results,
+            },
+            f,
+            indent=2,
+        )
+    print(f"Saved results to {output}")
+
+    if compare is not None:
+        print_comparison(results, compare)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+import click
+import os
+import random
+import sys
+import timeit
+
+import numpy as np
+from gerrychain.optimization import Gingleator
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from chain_tools.election_tally import DistrictTallies
+from chain_tools.scoring import ShareUpdater, reward_partial_dist
+
+
+class FakePartition(dict):
+    """Stand-in for a Partition whose updaters have already been computed."""
+
+    def __init__(self, values, parts):
+        super().__init__(values)
+        self.parts = parts
+
+
+def safe_reward_partial_dist(part, minority_perc_col, threshold):
+    """The score function the runners used before chain_tools.scoring, for comparison."""
+    try:
+        return Gingleator.reward_partial_dist(
+            part=part, minority_perc_col=minority_perc_col, threshold=threshold
+        )
+    except ValueError:
+        return Gingleator.num_opportunity_dists(
+            part=part, minority_perc_col=minority_perc_col, threshold=threshold
+        )
+
+
+def make_partitions(num_districts, all_opportunity):
+    """Builds one step's inputs for the old (dict) and new (array) scoring paths."""
+    districts = list(range(num_districts))
+    d_votes = np.array([random.randint(1, 100000) for _ in districts])
+    r_votes = np.zeros(num_districts, dtype=d_votes.dtype) if all_opportunity else np.array(
+        [random.randint(1, 100000) for _ in districts]
+    )
+
+    old = FakePartition(
+        {
+            "D_vote_population": dict(zip(districts, d_votes.tolist())),
+            "total_vote_population": dict(zip(districts, (d_votes + r_votes).tolist())),
+        },
+        parts=dict.fromkeys(districts),
+    )
+    tallies = DistrictTallies(np.array(districts), ["D", "R"], np.stack([d_votes, r_votes], axis=1))
+    new = FakePartition({"election": tallies}, parts=dict.fromkeys(districts))
+    return old, new
+
+
+@click.command()
+@click.option("--districts", default=63, show_default=True, type=int, help="Number of districts")
+@click.option("--calls", default=100000, show_default=True, type=int, help="Calls per timing")
+@click.option(
+    "--all-opportunity",
+    is_flag=True,
+    help="Make every district an opportunity district, i.e. time the exception path of the old scorer",
+)
+def main(districts, calls, all_opportunity):
+    """Times one step of Gingleator scoring (share updater + score function) per call, for the
+    old dict/exception-based path and the shared array-based one in chain_tools.scoring.
+    """
+    random.seed(0)
+    old, new = make_partitions(districts, all_opportunity)
+    d_share = ShareUpdater("election", "D")
+
+    def old_step():
+        old["perc"] = {
+            k: old["D_vote_population"][k] / old["total_vote_population"][k] for k in old.parts
+        }
+        return safe_reward_partial_dist(old, "perc", 0.5)
+
+    def new_step():
+        new["D_share"] = d_share(new)
+        return reward_partial_dist(new, "D_share", 0.5)
+
+    assert np.isclose(old_step(), new_step()), "The two scorers disagree"
+
+    for name, step in [("dict + try/except", old_step), ("array", new_step)]:
+        seconds = min(timeit.repeat(step, number=calls, repeat=5))
+        print(f"{name:>18}: {seconds / calls * 1e6:.2f} us per call ({districts} districts)")
+
+
+if __name__ == "__main__":
+    main()
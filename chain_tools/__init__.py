@@ -0,0 +1 @@
+"""Shared helpers used by the NY and synthetic experiment runners."""
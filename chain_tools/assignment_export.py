@@ -0,0 +1,160 @@
+import os
+import shutil
+
+import numpy as np
+from pyben import PyBenEncoder
+
+# Every .ben file starts with a 17 byte banner ("STANDARD BEN FILE" or "MKVCHAIN BEN FILE")
+BEN_HEADER_LENGTH = 17
+
+
+class AssignmentExporter:
+    """Turns partitions into assignment arrays ordered like the graph's nodes.
+
+    The node -> position index is computed once per graph, and the output array is
+    preallocated and reused. When the exported plan is a direct child of the previous
+    one (as it is for every accepted step of a Markov chain), only the flipped nodes
+    are rewritten; otherwise the whole array is refilled from the plan's parts.
+
+    Args:
+        graph (Graph): Graph whose node order defines the order of the exported array.
+        keyframe_every (int, optional): If given, refill the whole array from the plan's parts
+            at least once every this many exports, even when flips alone would suffice.
+    """
+
+    def __init__(self, graph, keyframe_every=None):
+        self.node_order = list(graph.nodes)
+        self.node_index = {node: i for i, node in enumerate(self.node_order)}
+        self.array = np.zeros(len(self.node_order), dtype=np.int64)
+        self.keyframe_every = keyframe_every
+        self._last_plan = None
+        self._since_keyframe = 0
+
+    def export(self, plan):
+        """Returns the assignment of ``plan`` as an integer array in graph node order.
+
+        The returned array is owned by the exporter and is overwritten by the next call,
+        so copy it if it needs to outlive the current step.
+
+        Args:
+            plan (Partition): GerryChain Partition object.
+        """
+        if plan is self._last_plan:
+            return self.array
+
+        keyframe_due = (
+            self.keyframe_every is not None and self._since_keyframe >= self.keyframe_every
+        )
+        if (
+            not keyframe_due
+            and self._last_plan is not None
+            and plan.parent is self._last_plan
+            and plan.flips
+        ):
+            for node, district in plan.flips.items():
+                self.array[self.node_index[node]] = district
+            self._since_keyframe += 1
+        else:
+            self.refresh(plan)
+
+        self._last_plan = plan
+        return self.array
+
+    def refresh(self, plan):
+        """Refills the whole array from the parts of ``plan``.
+
+        Args:
+            plan (Partition): GerryChain Partition object.
+        """
+        for district, nodes in plan.parts.items():
+            positions = np.fromiter(
+                (self.node_index[node] for node in nodes), dtype=np.int64, count=len(nodes)
+            )
+            self.array[positions] = district
+        self._last_plan = plan
+        self._since_keyframe = 0
+        return self.array
+
+
+class AssignmentStreamWriter:
+    """Streams the plans of a chain to a .ben file, one assignment per step.
+
+    Consecutive plans are exported from their flips (see :class:`AssignmentExporter`), with a
+    full keyframe refill every ``keyframe_every`` steps, so the per-step cost scales with the
+    number of nodes that moved rather than with the size of the graph.
+
+    PyBenEncoder cannot append to an existing file, so after the first :meth:`checkpoint` (or
+    when resuming) new plans go to a ``.segment`` file whose frames are appended to the main
+    file at the next checkpoint and on close. A .ben file is a fixed header followed by
+    self-contained frames, so the joined file decodes to the same plans as a single encoder's
+    would. Its bytes can differ: an encoder stores a run of repeated plans as one frame, and a
+    run that spans a checkpoint is split into a frame in each file.
+
+    Args:
+        file_path (str): Path of the .ben file to write.
+        graph (Graph): Graph whose node order defines the order of the saved assignments.
+        keyframe_every (int): Number of steps between full refills of the assignment array.
+        overwrite (bool): Whether to overwrite an existing file at ``file_path``.
+        resume_position (int, optional): Byte offset returned by :meth:`checkpoint`. If given,
+            the existing file is truncated there and appended to.
+    """
+
+    def __init__(self, file_path, graph, keyframe_every=1000, overwrite=True, resume_position=None):
+        self.file_path = file_path
+        self.segment_path = f"{file_path}.segment"
+        self.exporter = AssignmentExporter(graph, keyframe_every=keyframe_every)
+        if resume_position is None:
+            self.encoder = PyBenEncoder(file_path, overwrite=overwrite)
+            self._writing_segment = False
+        else:
+            with open(file_path, "r+b") as f:
+                f.truncate(resume_position)
+            self.encoder = None
+            self._writing_segment = True
+
+    def write(self, plan):
+        """Appends the assignment of ``plan`` to the .ben file.
+
+        Args:
+            plan (Partition): GerryChain Partition object.
+        """
+        if self.encoder is None:
+            self.encoder = PyBenEncoder(self.segment_path, overwrite=True)
+        self.encoder.write(self.exporter.export(plan))
+
+    def checkpoint(self):
+        """Makes every plan written so far durable in ``file_path`` and returns its size in bytes."""
+        self._close_encoder()
+        self._writing_segment = True
+        return os.path.getsize(self.file_path)
+
+    def close(self):
+        self._close_encoder()
+
+    def _close_encoder(self):
+        if self.encoder is None:
+            return
+        self.encoder.close()
+        self.encoder = None
+
+        if self._writing_segment:
+            with open(self.segment_path, "rb") as segment, open(self.file_path, "r+b") as f:
+                header = f.read(BEN_HEADER_LENGTH)
+                if segment.read(BEN_HEADER_LENGTH) != header:
+                    raise ValueError(
+                        f"{self.segment_path} and {self.file_path} have different .ben headers"
+                    )
+                f.seek(0, os.SEEK_END)
+                shutil.copyfileobj(segment, f)
+                f.flush()
+                os.fsync(f.fileno())
+            os.remove(self.segment_path)
+        else:
+            with open(self.file_path, "rb") as f:
+                os.fsync(f.fileno())
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
@@ -0,0 +1,119 @@
+import json
+import os
+import random
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from chain_tools.seeding import derive_seed
+
+
+def atomic_write_json(data, path):
+    """Writes ``data`` as JSON to ``path`` so that ``path`` never holds half a file.
+
+    The JSON goes to a temporary file next to ``path``, which then replaces it in one rename:
+    an interrupted write leaves the old file behind, not a truncated one.
+    """
+    temp_path = f"{path}.tmp{os.getpid()}"
+    try:
+        with open(temp_path, "w") as f:
+            json.dump(data, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+
+class Manifest:
+    """Append-only list of the files a batch has finished, one per line.
+
+    Each line holds a file's name (its path relative to ``root``), and the size and
+    modification time in nanoseconds it had once finished, tab-separated. It is flushed to disk
+    as soon as the file is done, so after an interruption the manifest lists exactly the files
+    that were completely rewritten. A file only counts as finished while its size and
+    modification time still match, so one rewritten since, e.g. by rebuilding the building
+    blocks, is processed again. Lines from older manifests, holding only a name, never match.
+
+    Args:
+        path (str): Where the manifest is kept. It is created on the first :meth:`add`.
+        root (str, optional): Directory the names are relative to. Defaults to the directory
+            of the manifest.
+    """
+
+    def __init__(self, path, root=None):
+        self.path = path
+        self.root = os.path.dirname(path) if root is None else root
+        self.done = {}
+        if os.path.exists(path):
+            with open(path) as f:
+                for line in f:
+                    name, *stat = line.rstrip("\n").split("\t")
+                    if name:
+                        # The last line for a file is the one from its latest run
+                        self.done[name] = tuple(int(value) for value in stat if value)
+
+    def __contains__(self, name):
+        return name in self.done and self.done[name] == self._stat(name)
+
+    def __len__(self):
+        return sum(name in self for name in self.done)
+
+    def add(self, name):
+        stat = self._stat(name)
+        with open(self.path, "a") as f:
+            f.write("\t".join([name, *map(str, stat)]) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        self.done[name] = stat
+
+    def _stat(self, name):
+        try:
+            stat = os.stat(os.path.join(self.root, name))
+        except FileNotFoundError:
+            return None
+        return stat.st_size, stat.st_mtime_ns
+
+
+def process_files(process, paths, root, manifest, random_seed, workers=None):
+    """Runs ``process(path)`` on each of ``paths`` in a process pool, skipping finished files.
+
+    A file is named by its path relative to ``root``. Before processing it, Python's ``random``
+    is seeded with ``derive_seed(random_seed, name)``, so each file's result depends only on
+    its name, not on the number of workers or the order files finish in. Files in
+    ``manifest`` that have not changed since are skipped, and each file is added to it once
+    ``process`` returns.
+    ``process`` should therefore write its output atomically (see :func:`atomic_write_json`).
+
+    Args:
+        process (callable): Module-level function taking a path; it must be picklable.
+        paths (iterable): Files to process.
+        root (str): Directory the names of the files are taken relative to.
+        manifest (Manifest): Record of finished files, with names relative to ``root``.
+        random_seed (int): Seed from which every file's seed is derived.
+        workers (int, optional): Number of worker processes. Defaults to the number of CPUs.
+
+    Yields:
+        tuple: The name of each newly finished file and what ``process`` returned for it, in
+        the order files finish.
+    """
+    names = {os.path.relpath(path, root).replace(os.sep, "/"): path for path in paths}
+    pending = sorted(name for name in names if name not in manifest)
+    if not pending:
+        return
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = {
+            executor.submit(_seeded, process, names[name], derive_seed(random_seed, name)): name
+            for name in pending
+        }
+        for future in as_completed(futures):
+            name = futures[future]
+            result = future.result()
+            manifest.add(name)
+            yield name, result
+
+
+def _seeded(process, path, seed):
+    random.seed(seed)
+    return process(path)
@@ -0,0 +1,499 @@
+import collections
+import random
+import warnings
+from operator import itemgetter
+
+import gerrychain
+import numpy as np
+from gerrychain.constraints.contiguity import affected_parts
+from gerrychain.partition.assignment import get_assignment
+from gerrychain.tree import BipartitionWarning, PopulationBalanceError
+
+from chain_tools.election_tally import DistrictTallies
+
+# The GerryChain release whose recom, bipartition_tree and cut_edges this module reproduces
+# draw for draw; tests/test_bitset_recom.py checks both engines agree step by step
+MIRRORED_GERRYCHAIN_VERSION = "0.3.2"
+
+
+def check_gerrychain_version():
+    """Raises RuntimeError unless the installed GerryChain is the one this engine mirrors.
+
+    The engine gives GerryChain's output by rebuilding its internals (the order of its sets,
+    subgraph views and spanning tree edges, and the random numbers it draws), which any other
+    release may change without notice.
+    """
+    if gerrychain.__version__ != MIRRORED_GERRYCHAIN_VERSION:
+        raise RuntimeError(
+            f"chain_tools.bitset_recom mirrors GerryChain {MIRRORED_GERRYCHAIN_VERSION}, but "
+            f"{gerrychain.__version__} is installed; run the gerrychain engine, or check that "
+            f"tests/test_bitset_recom.py passes and update MIRRORED_GERRYCHAIN_VERSION"
+        )
+
+
+class BitsetGraph:
+    """Adjacency of a small graph as lists and bitmasks, for :class:`BitsetPartition`.
+
+    Nodes are numbered by their position in ``graph.nodes``; a set of nodes is an int with bit
+    ``i`` set for the node at position ``i``. Neighbors are kept in the graph's adjacency
+    order, which is the order networkx (and so GerryChain) visits them in.
+
+    Args:
+        graph (Graph): The graph, e.g. a building block graph. It is kept for its node
+            attributes.
+
+    Raises:
+        RuntimeError: If the installed GerryChain is not the release the engine mirrors (see
+            :func:`check_gerrychain_version`).
+    """
+
+    def __init__(self, graph):
+        check_gerrychain_version()
+        self.graph = graph
+        self.nodes = list(graph.nodes)
+        self.index = {node: i for i, node in enumerate(self.nodes)}
+        self.neighbors = {node: tuple(graph.neighbors(node)) for node in self.nodes}
+        self.neighbor_masks = [self.mask(self.neighbors[node]) for node in self.nodes]
+        self.edges = list(graph.edges)
+        self._columns = {}
+
+    def __len__(self):
+        return len(self.nodes)
+
+    def column(self, name):
+        """Node attribute ``name`` as a dict from node to value."""
+        if name not in self._columns:
+            self._columns[name] = {node: self.graph.nodes[node][name] for node in self.nodes}
+        return self._columns[name]
+
+    def mask(self, nodes):
+        mask = 0
+        for node in nodes:
+            mask |= 1 << self.index[node]
+        return mask
+
+    def connected(self, mask):
+        """Whether the nodes in ``mask`` induce a connected subgraph (False if there are none)."""
+        reached = frontier = mask & -mask
+        while frontier:
+            grown = 0
+            while frontier:
+                low = frontier & -frontier
+                grown |= self.neighbor_masks[low.bit_length() - 1]
+                frontier ^= low
+            frontier = grown & mask & ~reached
+            reached |= frontier
+        return reached == mask and mask != 0
+
+    def view_order(self, nodes):
+        """Order in which networkx iterates the nodes of ``graph.subgraph(nodes)``.
+
+        A subgraph view walks the smaller of its node set and the whole graph: the set's own
+        order when it holds fewer than half of the graph's nodes, graph order otherwise.
+        """
+        if 2 * len(nodes) < len(self.nodes):
+            return list(nodes)
+        return [node for node in self.nodes if node in nodes]
+
+
+def cut_edges(partition):
+    """GerryChain's ``cut_edges`` updater for :class:`BitsetPartition`.
+
+    The set is built with the same operations, so it iterates in the same order, and
+    ``random.choice(tuple(...))`` over it picks the same edge.
+    """
+    parent = partition.parent
+    if not parent:
+        return {
+            tuple(sorted(edge))
+            for edge in partition.graph.edges
+            if partition.crosses_parts(edge)
+        }
+    neighbors = partition.graph.neighbors
+    neighbor_flips = {
+        tuple(sorted((node, neighbor)))
+        for node in partition.flips
+        for neighbor in neighbors[node]
+    }
+    new = {
+        (node, neighbor)
+        for node, neighbor in neighbor_flips
+        if partition.crosses_parts((node, neighbor))
+    }
+    obsolete = {
+        (node, neighbor)
+        for node, neighbor in neighbor_flips
+        if parent.crosses_parts((node, neighbor))
+        and not partition.crosses_parts((node, neighbor))
+    }
+    return (parent["cut_edges"] | new) - obsolete
+
+
+class BitsetPartition:
+    """A stand-in for GerryChain's ``Partition`` on a :class:`BitsetGraph`.
+
+    It has the attributes and methods that MarkovChain, the optimizers, the updaters and the
+    writers in chain_tools use (``graph``, ``assignment``, ``parts``, ``parent``, ``flips``,
+    ``flows``, ``flip``, item access to updaters), plus ``masks``, the nodes of each part as a
+    bitmask. The assignment is GerryChain's own ``Assignment``, so the parts are the same
+    frozensets a ``Partition`` would hold.
+
+    Args:
+        graph (BitsetGraph): Graph to partition (ignored when ``parent`` is given).
+        assignment (str or dict): Node attribute holding each node's part, or a dict from
+            node to part.
+        updaters (dict, optional): Updaters, by alias; ``cut_edges`` is always included.
+        parent (BitsetPartition, optional): Partition that ``flips`` are applied to.
+        flips (dict, optional): Parts that nodes of ``parent`` move to.
+    """
+
+    default_updaters = {"cut_edges": cut_edges}
+
+    def __init__(self, graph=None, assignment=None, updaters=None, parent=None, flips=None):
+        if parent is None:
+            self.graph = graph
+            self.assignment = get_assignment(assignment, graph.graph)
+            if set(self.assignment) != set(graph.nodes):
+                raise KeyError("The graph's node labels do not match the Assignment's keys")
+            self.updaters = dict(self.default_updaters)
+            self.updaters.update(updaters or {})
+            self.parent = None
+            self.flips = None
+            self.flows = None
+            self.masks = {part: graph.mask(nodes) for part, nodes in self.assignment.parts.items()}
+        else:
+            self.graph = parent.graph
+            self.updaters = parent.updaters
+            self.parent = parent
+            self.flips = flips
+            self.flows = _flows(parent.assignment.mapping, flips)
+            self.assignment = parent.assignment.copy()
+            self.assignment.update_flows(self.flows)
+            self.masks = parent.masks.copy()
+            for part, flow in self.flows.items():
+                self.masks[part] = (
+                    self.masks[part] & ~self.graph.mask(flow["out"]) | self.graph.mask(flow["in"])
+                )
+        self._cache = {}
+
+    def __repr__(self):
+        return f"<{self.__class__.__name__} [{len(self)} parts]>"
+
+    def __len__(self):
+        return len(self.parts)
+
+    def __getitem__(self, key):
+        if key not in self._cache:
+            self._cache[key] = self.updaters[key](self)
+        return self._cache[key]
+
+    def keys(self):
+        return self.updaters.keys()
+
+    @property
+    def parts(self):
+        return self.assignment.parts
+
+    def flip(self, flips):
+        return self.__class__(parent=self, flips=flips)
+
+    def crosses_parts(self, edge):
+        return self.assignment.mapping[edge[0]] != self.assignment.mapping[edge[1]]
+
+
+def _flows(mapping, flips):
+    """GerryChain's ``flows_from_changes``: the nodes flowing into and out of each part."""
+    flows = collections.defaultdict(lambda: {"in": set(), "out": set()})
+    for node, target in flips.items():
+        source = mapping[node]
+        if source != target:
+            flows[target]["in"].add(node)
+            flows[source]["out"].add(node)
+    return flows
+
+
+def bitset_contiguous(partition):
+    """GerryChain's ``contiguous`` constraint, checking each affected part's bitmask."""
+    return all(partition.graph.connected(partition.masks[part]) for part in affected_parts(partition))
+
+
+def bitset_recom(
+    partition, pop_col, pop_target, epsilon, node_repeats=1, max_attempts=100000,
+    warn_attempts=1000
+):
+    """GerryChain's ``recom`` proposal (with its default ``bipartition_tree``) on a
+    :class:`BitsetPartition`.
+
+    Draws from Python's ``random`` exactly as ``recom`` does, so from the same seed and
+    initial assignment it proposes the same plans. Everything that decides which random
+    number goes where is rebuilt with the same Python sets and dicts: the cut edges, the node
+    sets of the nested subgraph views ``recom`` bipartitions, the order networkx visits their
+    edges in (one random weight each), Kruskal's tree, the BFS from the random root and the
+    balanced cuts found on it. The networkx views, graphs and partitions around them are what
+    is left out.
+
+    Pair reselection is not supported: like ``recom`` with the default method, a pair of
+    districts without a balanced cut after ``max_attempts`` trees raises RuntimeError.
+
+    Args:
+        partition (BitsetPartition): Current plan.
+        pop_col (str): Node attribute holding population.
+        pop_target (float): Target population of each district.
+        epsilon (float): Allowed relative deviation from ``pop_target``.
+        node_repeats (int): Roots to try on a spanning tree before drawing a new one.
+        max_attempts (int): Roots to try in total before giving up.
+        warn_attempts (int): Number of attempts after which to warn.
+    """
+    edge = random.choice(tuple(partition["cut_edges"]))
+    parts_to_merge = [partition.assignment.mapping[edge[0]], partition.assignment.mapping[edge[1]]]
+    parts_to_merge.sort()
+
+    graph = partition.graph
+    merged = partition.parts[parts_to_merge[0]] | partition.parts[parts_to_merge[1]]
+    # recom bipartitions graph.subgraph(merged), and epsilon_tree_bipartition a subgraph of
+    # that on set(its nodes); each view's node set is a set built from the nodes it is given
+    view_nodes = set(node for node in merged if node in graph.index)
+    remaining_nodes = set(graph.view_order(view_nodes))
+    tree_nodes = graph.view_order(set(node for node in remaining_nodes))
+
+    nodes = _bipartition_tree(
+        graph, tree_nodes, pop_col, pop_target, epsilon, node_repeats, max_attempts,
+        warn_attempts,
+    )
+
+    # epsilon_tree_bipartition
+    populations = graph.column(pop_col)
+    lb_pop = pop_target * (1 - epsilon)
+    ub_pop = pop_target * (1 + epsilon)
+    flips = {}
+    part_pop = 0
+    for node in nodes:
+        flips[node] = parts_to_merge[-2]
+        part_pop += populations[node]
+    if not lb_pop <= part_pop <= ub_pop:
+        raise PopulationBalanceError()
+    remaining_nodes -= nodes
+    part_pop = 0
+    for node in remaining_nodes:
+        flips[node] = parts_to_merge[-1]
+        part_pop += populations[node]
+    if not lb_pop <= part_pop <= ub_pop:
+        raise PopulationBalanceError()
+
+    return partition.flip(flips)
+
+
+def _bipartition_tree(
+    graph, nodes, pop_col, pop_target, epsilon, node_repeats, max_attempts, warn_attempts
+):
+    """``bipartition_tree`` on the subgraph induced by ``nodes`` (listed in view order)."""
+    node_set = set(nodes)
+    populations = graph.column(pop_col)
+    total_pop = sum(populations[node] for node in node_set)
+
+    tree = _random_spanning_tree(graph, nodes, node_set)
+    restarts = 0
+    attempts = 0
+    while attempts < max_attempts:
+        if restarts == node_repeats:
+            tree = _random_spanning_tree(graph, nodes, node_set)
+            restarts = 0
+        cuts, succ = _balanced_cuts(tree, nodes, populations, total_pop, pop_target, epsilon)
+        if cuts:
+            # With no region surcharge, bipartition_tree picks one of the cuts at random
+            node = random.choice(cuts)
+            return frozenset(set(nodes) - _part_nodes(node, succ))
+        restarts += 1
+        attempts += 1
+        if attempts == warn_attempts:
+            warnings.warn(
+                f"\nFailed to find a balanced cut after {warn_attempts} attempts.\n"
+                "If possible, consider enabling pair reselection within your\n"
+                "MarkovChain proposal method to allow the algorithm to select\n"
+                "a different pair of districts for recombination.",
+                BipartitionWarning,
+            )
+    raise RuntimeError(f"Could not find a possible cut after {max_attempts} attempts.")
+
+
+def _random_spanning_tree(graph, nodes, node_set):
+    """Kruskal's tree with a random weight per edge, as neighbor lists in networkx's order."""
+    edges = []
+    seen = set()
+    for node in nodes:
+        for neighbor in graph.neighbors[node]:
+            if neighbor in node_set and neighbor not in seen:
+                edges.append((random.random(), node, neighbor))
+        seen.add(node)
+    edges.sort(key=itemgetter(0))
+
+    root = {node: node for node in nodes}
+
+    def find(node):
+        while root[node] != node:
+            root[node] = root[root[node]]
+            node = root[node]
+        return node
+
+    tree = {node: [] for node in nodes}
+    for _, u, v in edges:
+        root_u, root_v = find(u), find(v)
+        if root_u != root_v:
+            root[root_u] = root_v
+            tree[u].append(v)
+            tree[v].append(u)
+    return tree
+
+
+def _balanced_cuts(tree, nodes, populations, total_pop, pop_target, epsilon):
+    """``find_balanced_edge_cuts_memoization``: the nodes whose edge to their parent is a
+    balanced cut, and the BFS successors of the random root."""
+    root = random.choice([node for node in nodes if len(tree[node]) > 1])
+    pred = {}
+    succ = {}
+    seen = {root}
+    order = [root]
+    for parent in order:
+        children = []
+        for child in tree[parent]:
+            if child not in seen:
+                seen.add(child)
+                pred[child] = parent
+                children.append(child)
+        if children:
+            succ[parent] = children
+            order.extend(children)
+
+    tolerance = pop_target * epsilon
+    cuts = []
+    for node, tree_pop in _calc_pops(succ, root, populations).items():
+        if abs(tree_pop - pop_target) <= tolerance and abs((total_pop - tree_pop) - pop_target) <= tolerance:
+            # Drawn for the cut's weight, which the random choice of cut then ignores
+            random.random()
+            cuts.append(node)
+    return cuts, succ
+
+
+def _calc_pops(succ, root, populations):
+    """Population below each node, in the order GerryChain's ``_calc_pops`` finds them."""
+    subtree_pops = {}
+    stack = collections.deque(n for n in succ[root])
+    while stack:
+        next_node = stack.pop()
+        if next_node not in subtree_pops:
+            if next_node in succ:
+                children = succ[next_node]
+                if all(c in subtree_pops for c in children):
+                    subtree_pops[next_node] = sum(subtree_pops[c] for c in children)
+                    subtree_pops[next_node] += populations[next_node]
+                else:
+                    stack.append(next_node)
+                    for c in children:
+                        if c not in subtree_pops:
+                            stack.append(c)
+            else:
+                subtree_pops[next_node] = populations[next_node]
+    return subtree_pops
+
+
+def _part_nodes(start, succ):
+    """Nodes of the subtree below ``start``."""
+    nodes = set()
+    queue = collections.deque([start])
+    while queue:
+        next_node = queue.pop()
+        if next_node not in nodes:
+            nodes.add(next_node)
+            if next_node in succ:
+                for c in succ[next_node]:
+                    if c not in nodes:
+                        queue.append(c)
+    return nodes
+
+
+def unit_bitsets(graph, membership, unit_votes, pop_col):
+    """Bitsets of the units in each node of ``graph`` and of the units voting for each party.
+
+    Unit ``u`` is bit ``u``. Checks that the counts of the bitsets give each node's
+    population and votes, so that :class:`PopcountTally` tallies the same totals as
+    ``ElectionTally`` on the node attributes.
+
+    Args:
+        graph (Graph): Graph whose nodes are groups of units, e.g. building blocks.
+        membership (np.ndarray): Position in ``graph.nodes`` of each unit's node (see
+            chain_tools.block_graphs.block_membership).
+        unit_votes (dict): Votes of each unit (0 or 1) per party, as arrays ordered like
+            ``membership``.
+        pop_col (str): Node attribute holding population; each unit counts as one person.
+
+    Returns:
+        tuple: Dict from node to its units, and dict from party to its voters' units.
+
+    Raises:
+        ValueError: If a unit has votes other than 0 or 1, or the units of a node do not add
+            up to its attributes.
+    """
+    nodes = list(graph.nodes)
+    node_units = dict.fromkeys(nodes, 0)
+    for unit, position in enumerate(np.asarray(membership).tolist()):
+        node_units[nodes[position]] |= 1 << unit
+
+    party_units = {}
+    for party, votes in unit_votes.items():
+        votes = np.asarray(votes)
+        if not np.isin(votes, (0, 1)).all():
+            raise ValueError(f"{party} votes must be 0 or 1 per unit to be counted as bitsets")
+        party_units[party] = sum(1 << int(unit) for unit in np.flatnonzero(votes))
+
+    for node, units in node_units.items():
+        expected = {column: graph.nodes[node][column] for column in [*party_units, pop_col]}
+        counted = {party: (units & voters).bit_count() for party, voters in party_units.items()}
+        counted[pop_col] = units.bit_count()
+        if counted != expected:
+            raise ValueError(f"The units of node {node} add up to {counted}, not {expected}")
+    return node_units, party_units
+
+
+class PopcountTally:
+    """Updater giving the same ``DistrictTallies`` as ``ElectionTally`` by counting bits.
+
+    A district's population is the number of its units and its votes for a party the number of
+    its units voting for that party: the popcount of its units' bitset, and of that bitset
+    ANDed with the party's. Only the districts that changed are counted again at each step.
+
+    Args:
+        alias (str): Name of the updater in the partition.
+        node_units (dict): Units of each node, as bitsets (see :func:`unit_bitsets`).
+        party_units (dict): Units voting for each party, as bitsets, in the party order of the
+            tallies.
+    """
+
+    def __init__(self, alias, node_units, party_units):
+        self.alias = alias
+        self.node_units = node_units
+        self.parties = list(party_units)
+        self.party_units = list(party_units.values())
+        self._districts = None
+        self._positions = None
+
+    def __call__(self, partition):
+        parent = partition.parent
+        if parent is None or not partition.flips:
+            labels = sorted(partition.parts)
+            totals = np.array([self._count(partition.parts[district]) for district in labels])
+            return DistrictTallies(np.array(labels), self.parties, totals)
+
+        previous = parent[self.alias]
+        if self._districts is not previous.districts:
+            self._districts = previous.districts
+            self._positions = {district: i for i, district in enumerate(previous.districts.tolist())}
+        totals = previous.totals.copy()
+        for district in partition.flows:
+            totals[self._positions[district]] = self._count(partition.parts[district])
+        return DistrictTallies(previous.districts, self.parties, totals)
+
+    def _count(self, nodes):
+        units = 0
+        for node in nodes:
+            units |= self.node_units[node]
+        return [(units & voters).bit_count() for voters in self.party_units] + [units.bit_count()]
@@ -0,0 +1,217 @@
+import json
+import os
+
+import numpy as np
+
+# Graph-level attributes of a building block graph holding its membership: every unit of the
+# underlying map once, and the id of the block it belongs to
+UNIT_IDS = "unit_ids"
+UNIT_BLOCKS = "unit_blocks"
+
+
+def unit_adjacency(graph):
+    """Returns the nodes of ``graph`` and its adjacency in CSR form (``indptr``, ``indices``).
+
+    Row ``i`` of the CSR lists the positions in ``nodes`` of the neighbors of ``nodes[i]``.
+    """
+    nodes = list(graph.nodes)
+    index = {node: i for i, node in enumerate(nodes)}
+    indptr = np.zeros(len(nodes) + 1, dtype=np.int64)
+    indptr[1:] = np.cumsum([len(graph.adj[node]) for node in nodes])
+    indices = np.fromiter(
+        (index[neighbor] for node in nodes for neighbor in graph.adj[node]),
+        dtype=np.int64,
+        count=int(indptr[-1]),
+    )
+    return nodes, indptr, indices
+
+
+def block_labels(partition, unit_nodes):
+    """Returns the block of each of ``unit_nodes`` in ``partition``, for :func:`build_block_graphs`.
+
+    Blocks are numbered 0, 1, ... in the order ``partition.assignment.to_dict()`` first lists
+    them, the order the original builders handed them to ``nx.quotient_graph``, so the built
+    graphs number their blocks as the published ones do.
+    """
+    mapping = partition.assignment.to_dict()
+    order = {part: i for i, part in enumerate(dict.fromkeys(mapping.values()))}
+    return [order[mapping[unit]] for unit in unit_nodes]
+
+
+def build_block_graphs(unit_graph, assignments, sum_columns=()):
+    """Builds the building block dual graph of each sampled partition of ``unit_graph``.
+
+    Gives the same graphs as ``nx.quotient_graph`` over the blocks in increasing label order
+    followed by ``nx.convert_node_labels_to_integers``, without building a subgraph per block:
+    blocks are numbered 0, 1, ... in the order of their labels (see :func:`block_labels`), two
+    blocks are adjacent when any of their units are, and every sample is handled in the same few
+    array operations. Each block gets the quotient graph's "nnodes", "nedges" and "density", a
+    "weight" on each edge counting the unit edges between the two blocks and the sum over its
+    units of each of ``sum_columns``. Which units make up each block is stored once per graph,
+    as the graph attributes ``UNIT_IDS`` (in ``unit_graph.nodes`` order) and ``UNIT_BLOCKS``,
+    the block of each of them.
+
+    Args:
+        unit_graph (Graph): Dual graph of the units, e.g. a 12x12 grid map.
+        assignments (array-like): ``(samples, units)`` block labels, with units in
+            ``unit_graph.nodes`` order.
+        sum_columns (tuple): Unit attributes to total per block, e.g. ("population", "D", "R").
+
+    Returns:
+        list: One dict per sample, in the format ``Graph.to_json`` writes and
+        ``Graph.from_json`` reads.
+    """
+    unit_ids, indptr, indices = unit_adjacency(unit_graph)
+    assignments = np.asarray(assignments)
+    num_samples, num_units = assignments.shape
+
+    # Number each sample's blocks 0, 1, ... in the order of their labels
+    labels, label_index = np.unique(assignments, return_inverse=True)
+    label_index = label_index.reshape(num_samples, num_units)
+    stride = len(labels)
+    sample_offsets = np.arange(num_samples)[:, None] * stride
+    present = np.zeros((num_samples, stride), dtype=bool)
+    np.put_along_axis(present, label_index, True, axis=1)
+    rank = np.cumsum(present, axis=1) - 1
+    blocks = np.take_along_axis(rank, label_index, axis=1)
+    num_blocks = present.sum(axis=1)
+    block_keys = (sample_offsets + blocks).ravel()
+
+    # Unit edges, once each, and the blocks at either end of them in every sample
+    sources = np.repeat(np.arange(num_units), np.diff(indptr))
+    once = sources < indices
+    sources, targets = sources[once], indices[once]
+    source_blocks, target_blocks = blocks[:, sources], blocks[:, targets]
+    between = source_blocks != target_blocks
+    edge_samples = np.broadcast_to(np.arange(num_samples)[:, None], between.shape)[between]
+    low = np.minimum(source_blocks, target_blocks)[between]
+    high = np.maximum(source_blocks, target_blocks)[between]
+    pairs, weights = np.unique(
+        (edge_samples * stride + low) * stride + high, return_counts=True
+    )
+    pair_samples, pair_rest = np.divmod(pairs, stride * stride)
+    low, high = np.divmod(pair_rest, stride)
+
+    # Each block edge appears in both blocks' adjacency, neighbors in increasing order
+    adjacency_source = np.concatenate([pair_samples * stride + low, pair_samples * stride + high])
+    adjacency_target = np.concatenate([high, low]).tolist()
+    adjacency_weight = np.concatenate([weights, weights]).tolist()
+    adjacency_order = np.lexsort((adjacency_target, adjacency_source))
+    adjacency_ends = np.searchsorted(
+        adjacency_source[adjacency_order], np.arange(num_samples * stride + 1)
+    ).tolist()
+    adjacency_order = adjacency_order.tolist()
+
+    # Per-block sizes, internal edges and attribute sums
+    nnodes = np.bincount(block_keys, minlength=num_samples * stride)
+    inside = (sample_offsets + source_blocks)[~between]
+    nedges = np.bincount(inside, minlength=num_samples * stride)
+    possible = nnodes * (nnodes - 1)
+    density = np.divide(
+        2 * nedges, possible, out=np.zeros(len(nnodes), dtype=float), where=possible > 0
+    )
+    sums = {}
+    for column in sum_columns:
+        values = np.array([unit_graph.nodes[node][column] for node in unit_ids])
+        totals = np.bincount(block_keys, weights=np.tile(values, num_samples), minlength=num_samples * stride)
+        # Integer attributes stay integers, as they would summed one unit at a time
+        sums[column] = (totals.round().astype(values.dtype) if values.dtype.kind in "iu" else totals).tolist()
+
+    nnodes, nedges, density = nnodes.tolist(), nedges.tolist(), density.tolist()
+
+    block_graphs = []
+    for sample in range(num_samples):
+        nodes = []
+        adjacency = []
+        for block in range(int(num_blocks[sample])):
+            key = sample * stride + block
+            node = {
+                "graph": None,
+                "nnodes": nnodes[key],
+                "nedges": nedges[key],
+                "density": density[key],
+            }
+            for column in sum_columns:
+                node[column] = sums[column][key]
+            node["id"] = block
+            nodes.append(node)
+            adjacency.append([
+                {"weight": adjacency_weight[k], "id": adjacency_target[k]}
+                for k in adjacency_order[adjacency_ends[key]:adjacency_ends[key + 1]]
+            ])
+        block_graphs.append({
+            "directed": False,
+            "multigraph": False,
+            "graph": [[UNIT_IDS, unit_ids], [UNIT_BLOCKS, blocks[sample].tolist()]],
+            "nodes": nodes,
+            "adjacency": adjacency,
+        })
+    return block_graphs
+
+
+def block_membership(block_graph, unit_nodes):
+    """Returns which block of ``block_graph`` each of ``unit_nodes`` belongs to.
+
+    This is the sparse block-by-unit membership matrix stored by column: entry ``i`` is the
+    position in ``block_graph.nodes`` of the block holding ``unit_nodes[i]``.
+    :func:`block_totals` multiplies it by a vector of unit values.
+
+    Args:
+        block_graph (Graph): Building block graph carrying its membership as the graph
+            attributes ``UNIT_IDS`` and ``UNIT_BLOCKS``, or in the older per-block "units"
+            strings (see :func:`encode_units`).
+        unit_nodes (list): Units of the underlying map, in the order their values will be given.
+    """
+    block_index = {block: i for i, block in enumerate(block_graph.nodes)}
+    if UNIT_BLOCKS in block_graph.graph:
+        block_of = dict(zip(block_graph.graph[UNIT_IDS], block_graph.graph[UNIT_BLOCKS]))
+    else:
+        # Not yet converted by migrate_block_units_cli.py: the units are a JSON list per block
+        block_of = {
+            unit: block
+            for block, data in block_graph.nodes(data=True)
+            for unit in json.loads(data["units"])
+        }
+    return np.array([block_index[block_of[unit]] for unit in unit_nodes], dtype=np.int64)
+
+
+def block_totals(membership, values, num_blocks):
+    """Sums ``values`` (one per unit, ordered like the membership) over each block."""
+    values = np.asarray(values)
+    totals = np.bincount(membership, weights=values, minlength=num_blocks)
+    # Integer values stay integers, as they would summed one unit at a time
+    return totals.round().astype(values.dtype) if values.dtype.kind in "iu" else totals
+
+
+def write_block_graphs(block_graphs, paths):
+    """Saves each graph from :func:`build_block_graphs` to the matching path as JSON."""
+    for block_graph, path in zip(block_graphs, paths, strict=True):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w") as f:
+            json.dump(block_graph, f)
+
+
+def encode_units(data):
+    """Converts a building block graph's JSON from per-block "units" strings to the membership.
+
+    Older block graphs list each block's units as a string on the block, e.g.
+    "[106, 107, 119, 131]". This drops those strings and stores the same membership as the
+    graph attributes ``UNIT_IDS`` (sorted) and ``UNIT_BLOCKS``, in place.
+
+    Args:
+        data (dict): Block graph as read from its JSON.
+
+    Returns:
+        bool: Whether ``data`` changed, i.e. False for a graph already converted.
+    """
+    if not any("units" in node for node in data["nodes"]):
+        return False
+    block_of = {}
+    for node in data["nodes"]:
+        for unit in json.loads(node.pop("units")):
+            block_of[unit] = node["id"]
+    unit_ids = sorted(block_of)
+    data["graph"] = [
+        pair for pair in data["graph"] if pair[0] not in (UNIT_IDS, UNIT_BLOCKS)
+    ] + [[UNIT_IDS, unit_ids], [UNIT_BLOCKS, [block_of[unit] for unit in unit_ids]]]
+    return True
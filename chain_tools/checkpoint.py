@@ -0,0 +1,283 @@
+import itertools
+import os
+import pickle
+import random
+
+from gerrychain import MarkovChain
+from gerrychain.accept import always_accept
+
+
+class Checkpointer:
+    """Periodically saves the state of a chain run so that it can be resumed bit-for-bit.
+
+    A checkpoint holds the assignment(s) needed to restart the chain, the number of plans
+    already emitted, Python's ``random`` state and the durable positions of the run's outputs
+    (see :meth:`track`). Checkpoints are only taken at step boundaries where the chain can be
+    restarted from a single partition: every ``every`` steps for a neutral chain, and at the
+    first burst boundary at or after every ``every`` steps for short bursts.
+
+    At each checkpoint the partition the chain continues from is rebuilt from its assignment,
+    both when the run goes on uninterrupted and when it is resumed, so the two runs stay
+    identical. This also means a checkpointed run is not step-for-step the same chain as a run
+    of the same seed without checkpoints.
+
+    Args:
+        path (str): Where to write the checkpoint file.
+        every (int, optional): Number of steps between checkpoints. If None, checkpointing is
+            disabled, unless ``resume`` picks up a checkpoint that was written with a value.
+        resume (bool): Whether to resume from an existing checkpoint at ``path``.
+    """
+
+    def __init__(self, path, every=None, resume=False):
+        self.path = path
+        self.every = every
+        self.outputs = {}
+        self.steps_done = 0
+        self.chain_state = {}
+        self.context = {}
+        self._saved = None
+        self._pending = None
+
+        if resume:
+            if os.path.exists(path):
+                with open(path, "rb") as f:
+                    self._pending = pickle.load(f)
+                if every is not None and every != self._pending["every"]:
+                    raise ValueError(
+                        f"{path} was written with checkpoints every {self._pending['every']} "
+                        f"steps, not {every}"
+                    )
+                self.every = self._pending["every"]
+                print(
+                    f"Resuming from checkpoint {path} "
+                    f"({self._pending['context']}, step {self._pending['steps_done']})"
+                )
+            else:
+                print(f"No checkpoint at {path}; starting from the beginning")
+
+    @property
+    def enabled(self):
+        return self.every is not None
+
+    def remaining(self, items, key):
+        """Skips the items of an outer loop that were finished before the checkpoint.
+
+        Args:
+            items (Iterable): Values of the outer loop, e.g. building block samples.
+            key (str): Name under which the loop value is passed to :meth:`begin`.
+        """
+        if self._pending is None:
+            yield from items
+            return
+        target = self._pending["context"].get(key)
+        started = False
+        for item in items:
+            started = started or item == target
+            if started:
+                yield item
+
+    def begin(self, **context):
+        """Starts (or resumes) one chain of the run.
+
+        If the pending checkpoint belongs to this chain, restores Python's ``random`` state and
+        the chain position from it; otherwise starts from step 0 and, if enabled, saves a
+        checkpoint at the chain's start.
+
+        Args:
+            **context: Values identifying the chain within the run, e.g. ``sample=17``.
+        """
+        self.outputs = {}
+        if self._pending is not None and self._pending["context"] == context:
+            self._saved, self._pending = self._pending, None
+            self.context = context
+            self.steps_done = self._saved["steps_done"]
+            self.chain_state = self._saved["chain_state"]
+            random.setstate(self._saved["random_state"])
+            return
+
+        self._saved = None
+        self.context = context
+        self.steps_done = 0
+        self.chain_state = {}
+        if self.enabled:
+            self.save(0)
+
+    def output_position(self, name):
+        """Returns the saved position of output ``name``, or None when starting fresh."""
+        if self._saved is None or self._saved["steps_done"] == 0:
+            return None
+        return self._saved["outputs"].get(name)
+
+    def track(self, **outputs):
+        """Registers the outputs whose positions are recorded in each checkpoint.
+
+        Each output must have a ``checkpoint()`` method that makes everything written so far
+        durable and returns a position its writer can later be resumed from.
+        """
+        self.outputs.update(outputs)
+
+    def save(self, steps_done, **chain_state):
+        """Writes a checkpoint after ``steps_done`` plans have been emitted and saved.
+
+        Args:
+            steps_done (int): Number of plans emitted so far by the current chain.
+            **chain_state: Whatever the chain driver needs to restart, e.g. assignments.
+        """
+        data = {
+            "every": self.every,
+            "context": self.context,
+            "steps_done": steps_done,
+            "chain_state": chain_state,
+            "random_state": random.getstate(),
+            "outputs": {name: output.checkpoint() for name, output in self.outputs.items()},
+        }
+        temp_path = f"{self.path}.tmp"
+        with open(temp_path, "wb") as f:
+            pickle.dump(data, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, self.path)
+
+    def finish(self):
+        """Removes the checkpoint once the whole run has completed."""
+        if self.enabled and os.path.exists(self.path):
+            os.remove(self.path)
+
+
+def assignment_list(partition):
+    """Returns the assignment of ``partition`` as a list in graph node order."""
+    assignment = partition.assignment
+    return [assignment[node] for node in partition.graph.nodes]
+
+
+def rebuild_partition(template, assignment):
+    """Builds a fresh partition with ``template``'s class, graph and updaters from an assignment list.
+
+    The result depends only on the assignment (not on the history of flips that led to it),
+    which is what makes a resumed chain match the uninterrupted one.
+
+    Args:
+        template (Partition): Partition providing the graph and updaters, e.g. a GerryChain
+            ``Partition`` or a chain_tools.bitset_recom ``BitsetPartition``.
+        assignment (list): District of each node, in graph node order.
+    """
+    return type(template)(
+        template.graph,
+        assignment=dict(zip(template.graph.nodes, assignment)),
+        updaters=template.updaters,
+    )
+
+
+def resumable_markov_chain(chain, checkpointer):
+    """Iterates over ``chain``, checkpointing every ``checkpointer.every`` steps.
+
+    With checkpointing disabled this is exactly ``iter(chain)``.
+
+    Args:
+        chain (MarkovChain): The configured chain to run.
+        checkpointer (Checkpointer): Checkpointer whose :meth:`~Checkpointer.begin` has been
+            called for this chain.
+    """
+    if not checkpointer.enabled:
+        yield from chain
+        return
+
+    emitted = checkpointer.steps_done
+    if emitted == 0:
+        state = chain.initial_state
+    else:
+        state = rebuild_partition(chain.initial_state, checkpointer.chain_state["state"])
+
+    while emitted < chain.total_steps:
+        n_steps = min(
+            checkpointer.every - emitted % checkpointer.every, chain.total_steps - emitted
+        )
+        if emitted == 0:
+            plans = MarkovChain(chain.proposal, chain.is_valid, chain.accept, state, n_steps)
+        else:
+            # A MarkovChain first yields its initial state, which was already emitted. It is
+            # skipped with islice rather than next(): iterating a MarkovChain again restarts it
+            plans = itertools.islice(
+                MarkovChain(chain.proposal, chain.is_valid, chain.accept, state, n_steps + 1), 1, None
+            )
+
+        for state in plans:
+            yield state
+
+        emitted += n_steps
+        if emitted < chain.total_steps:
+            state = rebuild_partition(chain.initial_state, assignment_list(state))
+            checkpointer.save(emitted, state=assignment_list(state))
+
+
+def resumable_samples(catalog, template, total_steps, checkpointer):
+    """Yields ``total_steps`` plans drawn independently and uniformly from ``catalog``.
+
+    Each plan is a fresh partition like ``template``. Checkpoints hold no chain state, only
+    the number of plans drawn and the random state, and are taken every
+    ``checkpointer.every`` plans.
+
+    Args:
+        catalog (DistrictCatalog): Catalog of the plans of ``template``'s graph (see
+            chain_tools.district_catalog).
+        template (Partition): Partition providing the class, graph and updaters of the plans.
+        total_steps (int): Number of plans to draw.
+        checkpointer (Checkpointer): Checkpointer whose :meth:`~Checkpointer.begin` has been
+            called for these samples.
+    """
+    nodes = list(template.graph.nodes)
+    first = checkpointer.steps_done
+    for step in range(first, total_steps):
+        if checkpointer.enabled and step > first and step % checkpointer.every == 0:
+            checkpointer.save(step)
+        assignment = catalog.sample()
+        yield rebuild_partition(template, [assignment[node] for node in nodes])
+
+
+def resumable_short_bursts(optimizer, burst_length, num_bursts, checkpointer):
+    """Runs ``optimizer.short_bursts(burst_length, num_bursts)`` with checkpoints between bursts.
+
+    With checkpointing disabled this is exactly ``optimizer.short_bursts``. Otherwise the same
+    algorithm runs here, and the best plan so far (which the next burst starts from) is
+    checkpointed at every burst boundary that is a multiple of ``checkpointer.every`` steps,
+    rounded down to whole bursts.
+
+    Args:
+        optimizer (SingleMetricOptimizer): Configured optimizer, e.g. a Gingleator.
+        burst_length (int): Number of steps within each burst.
+        num_bursts (int): Number of bursts to perform.
+        checkpointer (Checkpointer): Checkpointer whose :meth:`~Checkpointer.begin` has been
+            called for this chain.
+    """
+    if not checkpointer.enabled:
+        yield from optimizer.short_bursts(burst_length, num_bursts)
+        return
+
+    bursts_per_checkpoint = max(1, checkpointer.every // burst_length)
+    first_burst = checkpointer.steps_done // burst_length
+    if first_burst == 0:
+        best_part = optimizer._initial_part
+        best_score = optimizer.score(best_part)
+    else:
+        best_part = rebuild_partition(optimizer._initial_part, checkpointer.chain_state["best"])
+        best_score = checkpointer.chain_state["best_score"]
+
+    for burst in range(first_burst, num_bursts):
+        if burst > first_burst and burst % bursts_per_checkpoint == 0:
+            best_part = rebuild_partition(optimizer._initial_part, assignment_list(best_part))
+            checkpointer.save(
+                burst * burst_length, best=assignment_list(best_part), best_score=best_score
+            )
+
+        chain = MarkovChain(
+            optimizer._proposal, optimizer._constraints, always_accept, best_part, burst_length
+        )
+        for part in chain:
+            yield part
+            part_score = optimizer.score(part)
+            if optimizer._is_improvement(part_score, best_score):
+                best_part = part
+                best_score = part_score
+
+        optimizer._best_part = best_part
+        optimizer._best_score = best_score
@@ -0,0 +1,314 @@
+import json
+import os
+import numbers
+
+import jsonlines as jl
+import numpy as np
+
+from chain_tools.ensemble_summary import SummaryWriter
+
+STATS_FORMATS = ["jsonl", "columnar", "none"]
+
+
+def columnar_paths(jsonl_path):
+    """Returns the (data, header) paths used for the columnar twin of a ``.jsonl`` output path.
+
+    Args:
+        jsonl_path (str): Path the runner would write its JSONL updater records to.
+    """
+    base = jsonl_path[: -len(".jsonl")] if jsonl_path.endswith(".jsonl") else jsonl_path
+    return f"{base}.stats", f"{base}.stats.json"
+
+
+def open_stats_sink(
+    jsonl_path, stats_format, districts, batch_size=10000, resume_position=None, summary=False
+):
+    """Opens the per-step updater output of a runner in the requested format.
+
+    Args:
+        jsonl_path (str): Path of the JSONL output. Columnar output is written next to it
+            (see :func:`columnar_paths`).
+        stats_format (str): "jsonl", "columnar", or "none" to write no per-step output, which
+            is only allowed with ``summary``.
+        districts (Iterable): District labels, fixing the column order of per-district values.
+            Per-district values may be given as dicts keyed by district or as NumPy arrays
+            ordered like ``sorted(districts)``.
+        batch_size (int): Number of rows buffered before each write to disk (columnar only).
+        resume_position (int, optional): Position returned by the sink's ``checkpoint()``
+            method. If given, the existing output is truncated there and appended to instead
+            of being overwritten.
+        summary (bool): Whether to also keep summaries of the elections in the records and
+            write them next to the output (see chain_tools.ensemble_summary.SummaryWriter).
+    """
+    if summary:
+        sink = NullStatsWriter() if stats_format == "none" else open_stats_sink(
+            jsonl_path, stats_format, districts, batch_size=batch_size,
+            resume_position=None if resume_position is None else resume_position["sink"],
+        )
+        return SummaryWriter(jsonl_path, sink, resume_position=resume_position)
+    if stats_format == "jsonl":
+        return JsonlStatsWriter(jsonl_path, districts, resume_position=resume_position)
+    elif stats_format == "columnar":
+        return ColumnarStatsWriter(
+            jsonl_path, districts, batch_size=batch_size, resume_position=resume_position
+        )
+    elif stats_format == "none":
+        raise ValueError("Stats format 'none' writes no statistics at all; it needs summary=True")
+    raise ValueError(f"Unknown stats format {stats_format!r}; expected one of {STATS_FORMATS}")
+
+
+class NullStatsWriter:
+    """Discards per-step records, for runs that only keep summaries of them."""
+
+    def write(self, record):
+        pass
+
+    def checkpoint(self):
+        return 0
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+class JsonlStatsWriter:
+    """Writes per-step updater records as JSON lines, exactly as ``jsonlines.open(path, "w")``.
+
+    Unlike a plain jsonlines writer it can report a durable byte offset (see
+    :meth:`checkpoint`) and reopen a file truncated at such an offset. Per-district NumPy
+    arrays in a record are written as dicts keyed by district.
+
+    Args:
+        jsonl_path (str): Path of the JSONL file.
+        districts (Iterable): District labels; per-district arrays are ordered like
+            ``sorted(districts)``.
+        resume_position (int, optional): Byte offset returned by :meth:`checkpoint`.
+    """
+
+    def __init__(self, jsonl_path, districts=(), resume_position=None):
+        self.districts = sorted(districts)
+        if resume_position is None:
+            self._file = open(jsonl_path, "wb")
+        else:
+            self._file = open(jsonl_path, "r+b")
+            self._file.truncate(resume_position)
+            self._file.seek(resume_position)
+        self._writer = jl.Writer(self._file)
+
+    def write(self, record):
+        self._writer.write({
+            key: dict(zip(self.districts, value.tolist())) if isinstance(value, np.ndarray) else value
+            for key, value in record.items()
+        })
+
+    def checkpoint(self):
+        """Flushes everything written so far to disk and returns the file's size in bytes."""
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        return self._file.tell()
+
+    def close(self):
+        self._writer.close()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+class ColumnarStatsWriter:
+    """Writes per-step updater records as fixed-width rows instead of JSON lines.
+
+    Accepts the same record dicts the runners write to JSONL. The layout is fixed by the first
+    record: integer/float values become one column each, dicts keyed by district become one
+    column per district, and other dicts of numbers (e.g. ``{"D": 5, "R": 7}``) become one column
+    per key. String values such as district winners are skipped, since they can be recomputed
+    from the vote columns.
+
+    Rows are buffered and appended to the data file in batches; a small JSON header next to it
+    records the row dtype, the district order and the number of rows written.
+
+    Args:
+        jsonl_path (str): Path the JSONL output would have used; see :func:`columnar_paths`.
+        districts (Iterable): District labels, fixing the column order of per-district values.
+        batch_size (int): Number of rows buffered before each write to disk.
+        resume_position (int, optional): Row count returned by :meth:`checkpoint`. If given,
+            the existing data file is truncated to that many rows and appended to.
+    """
+
+    def __init__(self, jsonl_path, districts, batch_size=10000, resume_position=None):
+        self.data_path, self.header_path = columnar_paths(jsonl_path)
+        self.districts = sorted(districts)
+        self.batch_size = batch_size
+        self.rows_written = 0
+        self.layout = None
+        self.dtype = None
+        self._buffer = None
+        self._buffered = 0
+        if resume_position is None:
+            self._file = open(self.data_path, "wb")
+        else:
+            # The layout is rebuilt from the next record, which has the same shape as the
+            # ones already on disk; only the row size is needed to find the truncation point
+            with open(self.header_path) as f:
+                itemsize = np.dtype([_descr_entry(field) for field in json.load(f)["dtype"]]).itemsize
+            self._file = open(self.data_path, "r+b")
+            self._file.truncate(resume_position * itemsize)
+            self._file.seek(resume_position * itemsize)
+            self.rows_written = resume_position
+
+    def _build_layout(self, record):
+        district_set = set(self.districts)
+        layout = []
+        fields = []
+        for key, value in record.items():
+            if isinstance(value, bool) or isinstance(value, str):
+                continue
+            if isinstance(value, numbers.Number):
+                layout.append((key, None))
+                fields.append((key, _column_dtype([value])))
+            elif isinstance(value, np.ndarray):
+                if value.dtype.kind in "iuf" and value.shape == (len(self.districts),):
+                    layout.append((key, "district_array"))
+                    fields.append((key, _column_dtype(value.tolist()), (len(self.districts),)))
+            elif isinstance(value, dict) and set(value) == district_set:
+                values = list(value.values())
+                if all(isinstance(v, numbers.Number) and not isinstance(v, bool) for v in values):
+                    layout.append((key, "districts"))
+                    fields.append((key, _column_dtype(values), (len(self.districts),)))
+            elif isinstance(value, dict):
+                for sub_key, sub_value in value.items():
+                    if isinstance(sub_value, numbers.Number) and not isinstance(sub_value, bool):
+                        layout.append((key, sub_key))
+                        fields.append((f"{key} {sub_key}", _column_dtype([sub_value])))
+        self.layout = layout
+        self.dtype = np.dtype(fields)
+        self._buffer = np.zeros(self.batch_size, dtype=self.dtype)
+        self._write_header()
+
+    def write(self, record):
+        """Appends one record as a row.
+
+        Args:
+            record (dict): Per-step record, in the format the runners write to JSONL.
+        """
+        if self.layout is None:
+            self._build_layout(record)
+
+        row = self._buffer[self._buffered]
+        for (key, sub_key), name in zip(self.layout, self.dtype.names):
+            value = record[key]
+            if sub_key is None:
+                row[name] = value
+            elif sub_key == "district_array":
+                row[name] = value
+            elif sub_key == "districts":
+                row[name] = [value[district] for district in self.districts]
+            else:
+                row[name] = value[sub_key]
+
+        self._buffered += 1
+        if self._buffered == self.batch_size:
+            self.flush()
+
+    def flush(self):
+        if self._buffered:
+            self._buffer[: self._buffered].tofile(self._file)
+            self.rows_written += self._buffered
+            self._buffered = 0
+            self._file.flush()
+
+    def checkpoint(self):
+        """Flushes all buffered rows to disk and returns the number of rows written."""
+        self.flush()
+        os.fsync(self._file.fileno())
+        if self.layout is not None:
+            self._write_header()
+        return self.rows_written
+
+    def close(self):
+        self.flush()
+        self._file.close()
+        if self.layout is not None:
+            self._write_header()
+
+    def _write_header(self):
+        header = {
+            "dtype": [list(field) for field in self.dtype.descr],
+            "districts": self.districts,
+            "rows": self.rows_written,
+        }
+        with open(self.header_path, "w") as f:
+            json.dump(header, f)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+class ColumnarStats:
+    """Read-only, memory-mapped view of a file written by :class:`ColumnarStatsWriter`.
+
+    Columns are accessed by the record key they came from, e.g. ``stats["D votes"]`` is a
+    ``(steps, districts)`` array whose columns follow ``stats.districts``, and
+    ``stats["Seats won D"]`` is a ``(steps,)`` array.
+
+    Args:
+        jsonl_path (str): Path the JSONL output would have used; see :func:`columnar_paths`.
+    """
+
+    def __init__(self, jsonl_path):
+        data_path, header_path = columnar_paths(jsonl_path)
+        with open(header_path) as f:
+            header = json.load(f)
+
+        self.dtype = np.dtype([_descr_entry(field) for field in header["dtype"]])
+        self.districts = header["districts"]
+
+        # A run that was killed before closing its writer leaves a stale row count in the
+        # header, so trust the size of the data file instead
+        rows = os.path.getsize(data_path) // self.dtype.itemsize
+        if rows:
+            self.rows = np.memmap(data_path, dtype=self.dtype, mode="r", shape=(rows,))
+        else:
+            self.rows = np.zeros(0, dtype=self.dtype)
+
+    @property
+    def columns(self):
+        return list(self.dtype.names)
+
+    def __len__(self):
+        return len(self.rows)
+
+    def __getitem__(self, column):
+        return self.rows[column]
+
+
+def read_columnar_stats(jsonl_path):
+    """Opens the columnar updater output that was written in place of ``jsonl_path``.
+
+    Args:
+        jsonl_path (str): Path the JSONL output would have used.
+    """
+    return ColumnarStats(jsonl_path)
+
+
+def _column_dtype(values):
+    if all(isinstance(v, numbers.Integral) for v in values):
+        return "<i8"
+    return "<f8"
+
+
+def _descr_entry(field):
+    if len(field) == 3:
+        return (field[0], field[1], tuple(field[2]))
+    return tuple(field)
@@ -0,0 +1,118 @@
+import re
+
+from gerrychain.constraints import contiguous
+from gerrychain.constraints.contiguity import affected_parts
+
+from chain_tools.bitset_recom import BitsetPartition, bitset_contiguous
+
+# Settings of ContiguityPolicy; N in "audit-every-N" is a number of proposals, e.g. "audit-every-1000"
+CONTIGUITY_POLICIES = ["full", "changed-districts-only", "audit-every-N"]
+
+
+class ContiguityError(RuntimeError):
+    """Raised when a proposal that should be contiguous by construction has a district that is not."""
+
+
+class ContiguityPolicy:
+    """Contiguity constraint for ReCom chains, with a choice of what to check.
+
+    ReCom splits two merged districts along a spanning tree, so its proposals are contiguous by
+    construction, and re-verifying them at every step is mostly overhead. The policies are:
+
+    - "full": GerryChain's ``contiguous`` (or ``bitset_contiguous`` for a ``BitsetPartition``),
+      which checks every district that changed with networkx and rejects the proposal if one
+      is not connected. This is what the runners always did.
+    - "changed-districts-only": checks only the districts that changed (the two that were
+      merged and re-split) with a breadth-first search over adjacency lists.
+    - "audit-every-N": checks nothing but every N-th proposal, on which every district is
+      checked the same way.
+
+    Under the last two a district that is not connected is a bug in the proposal or the graph
+    rather than a proposal to reject, so it raises ContiguityError. A partition without a parent
+    (the initial plan, or one rebuilt at a checkpoint) is always checked in full, and rejected
+    rather than reported, so MarkovChain still refuses an invalid initial plan.
+
+    Args:
+        policy (str): "full", "changed-districts-only" or "audit-every-N" with N a positive
+            integer.
+    """
+
+    def __init__(self, policy="full"):
+        self.policy = policy
+        self.audit_every = None
+        audit = re.fullmatch(r"audit-every-(\d+)", policy)
+        if audit is not None and int(audit.group(1)) > 0:
+            self.audit_every = int(audit.group(1))
+        elif policy not in ("full", "changed-districts-only"):
+            raise ValueError(
+                f"Unknown contiguity policy {policy!r}; expected 'full', "
+                f"'changed-districts-only' or 'audit-every-N'"
+            )
+        self.__name__ = f"contiguity ({policy})"
+        self._calls = 0
+        self._graph = None
+        self._index = None
+        self._neighbors = None
+        self._state = None
+
+    def __call__(self, partition):
+        if self.policy == "full":
+            if isinstance(partition, BitsetPartition):
+                return bitset_contiguous(partition)
+            return contiguous(partition)
+
+        if partition.parent is None:
+            return all(self._connected(partition, part) for part in partition.parts)
+
+        if self.audit_every is not None:
+            self._calls += 1
+            if self._calls % self.audit_every:
+                return True
+            parts = partition.parts
+        else:
+            parts = affected_parts(partition)
+        for part in parts:
+            if not self._connected(partition, part):
+                raise ContiguityError(
+                    f"District {part} of a proposed plan is not connected "
+                    f"(contiguity policy {self.policy!r}). ReCom never proposes one, so the "
+                    f"proposal or the graph is broken; rerun with the 'full' policy to reject "
+                    f"such plans instead."
+                )
+        return True
+
+    def __getstate__(self):
+        # The adjacency lists are rebuilt on first use, e.g. in a worker process
+        state = self.__dict__.copy()
+        state.update(_graph=None, _index=None, _neighbors=None, _state=None)
+        return state
+
+    def _connected(self, partition, part):
+        if isinstance(partition, BitsetPartition):
+            return partition.graph.connected(partition.masks[part])
+
+        graph = partition.graph
+        if graph is not self._graph:
+            nodes = list(graph.nodes)
+            self._graph = graph
+            self._index = {node: i for i, node in enumerate(nodes)}
+            self._neighbors = [[self._index[neighbor] for neighbor in graph.neighbors(node)] for node in nodes]
+            # 0: outside the district, 1: in it but not reached yet, 2: reached
+            self._state = bytearray(len(nodes))
+
+        members = [self._index[node] for node in partition.parts[part]]
+        if not members:
+            return False
+        state = self._state
+        for member in members:
+            state[member] = 1
+        state[members[0]] = 2
+        reached = [members[0]]
+        for node in reached:
+            for neighbor in self._neighbors[node]:
+                if state[neighbor] == 1:
+                    state[neighbor] = 2
+                    reached.append(neighbor)
+        for member in members:
+            state[member] = 0
+        return len(reached) == len(members)
@@ -0,0 +1,225 @@
+import random
+from collections import Counter, deque
+
+import numpy as np
+
+# Default limits beyond which a catalog gives up (see DistrictCatalog)
+MAX_DISTRICTS = 10000
+MAX_STATES = 1000000
+
+
+class CatalogTooLarge(RuntimeError):
+    """Raised when a graph has more districts or partial plans than a catalog allows."""
+
+
+class DistrictCatalog:
+    """Every feasible district of a small graph, and exact counts and uniform samples of the
+    plans they make up.
+
+    A district is a connected set of nodes whose population is within ``epsilon`` of
+    ``pop_target``; a plan is a partition of all nodes into ``n_parts`` districts. For the
+    synthetic building block graphs, where every block has the same population, the districts
+    are the connected sets of ``12 // block_size`` blocks.
+
+    Districts are bitmasks over the nodes, numbered in breadth-first order from a node far from
+    the rest so that the districts that can cover the first uncovered node overlap little with
+    those covering later nodes. Plans are counted by covering the first uncovered node with each
+    district that fits, memoizing the number of ways to complete each set of covered nodes;
+    uniform plans are then drawn by choosing each district with probability proportional to
+    the number of completions it leaves.
+
+    Args:
+        graph (Graph): Connected graph to district.
+        n_parts (int): Number of districts per plan.
+        pop_col (str): Node attribute holding population (positive).
+        pop_target (float, optional): Target population of each district. Defaults to the total
+            population divided by ``n_parts``.
+        epsilon (float): Allowed relative deviation of each district's population.
+        max_districts (int): Raise CatalogTooLarge when there are more districts than this.
+        max_states (int): Raise CatalogTooLarge when counting needs to memoize more sets of
+            covered nodes than this.
+    """
+
+    def __init__(
+        self, graph, n_parts, pop_col, pop_target=None, epsilon=0, max_districts=MAX_DISTRICTS,
+        max_states=MAX_STATES
+    ):
+        self.nodes = _breadth_first_order(graph)
+        index = {node: i for i, node in enumerate(self.nodes)}
+        self.neighbor_masks = [
+            sum(1 << index[neighbor] for neighbor in graph.neighbors(node)) for node in self.nodes
+        ]
+        self.populations = [graph.nodes[node][pop_col] for node in self.nodes]
+        self.n_parts = n_parts
+        if pop_target is None:
+            pop_target = sum(self.populations) / n_parts
+        self.min_pop = pop_target * (1 - epsilon)
+        self.max_pop = pop_target * (1 + epsilon)
+        self.max_districts = max_districts
+        self.max_states = max_states
+
+        self.districts = self._enumerate()
+        # Districts by their first node, the only ones that can cover it once the nodes before
+        # it are covered
+        self._by_first = [[] for _ in self.nodes]
+        for district in self.districts:
+            self._by_first[(district & -district).bit_length() - 1].append(district)
+        self._full = (1 << len(self.nodes)) - 1
+        self._counts = {}
+
+    def __len__(self):
+        return len(self.districts)
+
+    def district_nodes(self, district):
+        """The nodes of a district (one of :attr:`districts`)."""
+        return [node for i, node in enumerate(self.nodes) if district >> i & 1]
+
+    def totals(self, graph, column):
+        """Sum of node attribute ``column`` over each district, as an array ordered like
+        :attr:`districts`."""
+        values = [graph.nodes[node][column] for node in self.nodes]
+        return np.array([
+            sum(values[i] for i in range(len(self.nodes)) if district >> i & 1)
+            for district in self.districts
+        ])
+
+    def count(self):
+        """Number of plans.
+
+        Raises:
+            CatalogTooLarge: If counting needs more than ``max_states`` memoized states.
+        """
+        return self._count(0, self.n_parts)
+
+    def distribution(self, values):
+        """Number of plans by the sum of ``values`` over their districts.
+
+        Args:
+            values (sequence): An integer per district, ordered like :attr:`districts`, e.g.
+                1 where a party wins the district and 0 elsewhere.
+
+        Returns:
+            dict: Number of plans for each total, sorted by total.
+        """
+        value_of = dict(zip(self.districts, (int(value) for value in values)))
+        memo = {}
+
+        def totals(covered, parts_left):
+            if covered == self._full:
+                return Counter({0: 1}) if parts_left == 0 else Counter()
+            key = (covered, parts_left)
+            if key not in memo:
+                found = Counter()
+                if parts_left > 0:
+                    for district in self._fitting(covered):
+                        for total, plans in totals(covered | district, parts_left - 1).items():
+                            found[total + value_of[district]] += plans
+                memo[key] = found
+            return memo[key]
+
+        return dict(sorted(totals(0, self.n_parts).items()))
+
+    def sample(self, rng=random):
+        """A plan drawn uniformly at random, as a dict from node to district (0 to n_parts - 1).
+
+        Districts are numbered in the order they are drawn, by their first node.
+
+        Args:
+            rng (random.Random): Source of randomness; defaults to the ``random`` module.
+
+        Raises:
+            ValueError: If the graph has no plans.
+        """
+        if self.count() == 0:
+            raise ValueError("The graph has no plan with districts in the population bounds")
+        assignment = {}
+        covered = 0
+        for part in range(self.n_parts):
+            parts_left = self.n_parts - part - 1
+            choice = rng.randrange(self._count(covered, parts_left + 1))
+            for district in self._fitting(covered):
+                plans = self._count(covered | district, parts_left)
+                if choice < plans:
+                    break
+                choice -= plans
+            for node in self.district_nodes(district):
+                assignment[node] = part
+            covered |= district
+        return assignment
+
+    def _fitting(self, covered):
+        """Districts that cover the first uncovered node and no covered one."""
+        first = ((covered + 1) & ~covered).bit_length() - 1
+        return [district for district in self._by_first[first] if not district & covered]
+
+    def _count(self, covered, parts_left):
+        if covered == self._full:
+            return 1 if parts_left == 0 else 0
+        key = (covered, parts_left)
+        count = self._counts.get(key)
+        if count is None:
+            if len(self._counts) >= self.max_states:
+                raise CatalogTooLarge(
+                    f"Counting the plans needs more than {self.max_states} partial plans"
+                )
+            count = 0
+            if parts_left > 0:
+                for district in self._fitting(covered):
+                    count += self._count(covered | district, parts_left - 1)
+            self._counts[key] = count
+        return count
+
+    def _enumerate(self):
+        """Connected node sets in the population bounds, each found once from its first node.
+
+        Sets grow from their first node by adding neighbors that come after it (the ESU
+        algorithm of Wernicke, 2006): a node joins the candidates for extension only when it
+        neighbors the node just added and none of the set before, so no set is reached twice.
+        """
+        districts = []
+        for first in range(len(self.nodes)):
+            later = ~((1 << (first + 1)) - 1)
+            stack = [(1 << first, self.neighbor_masks[first] | 1 << first,
+                      self.neighbor_masks[first] & later, self.populations[first])]
+            while stack:
+                members, closed, candidates, population = stack.pop()
+                if self.min_pop <= population <= self.max_pop:
+                    districts.append(members)
+                    if len(districts) > self.max_districts:
+                        raise CatalogTooLarge(f"The graph has more than {self.max_districts} districts")
+                while candidates:
+                    bit = candidates & -candidates
+                    candidates ^= bit
+                    node = bit.bit_length() - 1
+                    grown = population + self.populations[node]
+                    if grown > self.max_pop:
+                        continue
+                    neighbors = self.neighbor_masks[node]
+                    stack.append((
+                        members | bit, closed | neighbors, candidates | (neighbors & later & ~closed),
+                        grown,
+                    ))
+        return districts
+
+
+def _breadth_first_order(graph):
+    """Nodes in breadth-first order from the end of a breadth-first search from the first node."""
+    def order_from(source):
+        order = [source]
+        seen = {source}
+        queue = deque([source])
+        while queue:
+            for neighbor in graph.neighbors(queue.popleft()):
+                if neighbor not in seen:
+                    seen.add(neighbor)
+                    order.append(neighbor)
+                    queue.append(neighbor)
+        return order
+
+    nodes = list(graph.nodes)
+    if not nodes:
+        return nodes
+    order = order_from(order_from(nodes[0])[-1])
+    if len(order) != len(nodes):
+        raise ValueError("The graph must be connected")
+    return order
@@ -0,0 +1,135 @@
+import numpy as np
+
+
+class DistrictTallies:
+    """Per-district totals of one partition, as arrays ordered like ``districts``.
+
+    Args:
+        districts (np.ndarray): Sorted district labels.
+        parties (list): Party names, in the order given to :class:`ElectionTally`.
+        totals (np.ndarray): ``(districts, columns)`` array of votes per party, followed by
+            population if the tally tracks it.
+    """
+
+    def __init__(self, districts, parties, totals):
+        self.districts = districts
+        self.parties = parties
+        self.totals = totals
+        self.votes = {party: totals[:, i] for i, party in enumerate(parties)}
+        self.population = totals[:, len(parties)] if totals.shape[1] > len(parties) else None
+
+    def seats(self, party):
+        """Number of districts where ``party`` gets strictly more votes than every other party."""
+        return int(self.won(party).sum())
+
+    def won(self, party):
+        """Boolean array of the districts where ``party`` gets strictly more votes than the rest."""
+        i = self.parties.index(party)
+        votes = self.totals[:, : len(self.parties)]
+        others = np.delete(votes, i, axis=1)
+        return votes[:, i] > others.max(axis=1)
+
+    def shares(self, party, denominator="votes"):
+        """Share of ``party``'s votes in each district (0 where the denominator is 0).
+
+        Args:
+            party (str): Party whose share is returned.
+            denominator (str): "votes" to divide by the votes cast for all parties, or
+                "population" to divide by the district's population.
+        """
+        if denominator == "votes":
+            total = self.totals[:, : len(self.parties)].sum(axis=1)
+        elif denominator == "population":
+            total = self.population
+        else:
+            raise ValueError(f"Unknown denominator {denominator!r}; expected 'votes' or 'population'")
+        return np.divide(
+            self.votes[party], total, out=np.zeros(len(total), dtype=float), where=total > 0
+        )
+
+    def winners(self):
+        """Party with the most votes in each district; ties go to the party listed last."""
+        votes = self.totals[:, : len(self.parties)]
+        last_max = votes.shape[1] - 1 - np.argmax(votes[:, ::-1], axis=1)
+        return np.asarray(self.parties)[last_max]
+
+
+class ElectionTally:
+    """GerryChain updater keeping per-district vote totals in NumPy arrays.
+
+    A replacement for ``Election`` when only the vote counts, seats and winners are needed:
+    the totals of a partition are its parent's totals adjusted for the nodes that flipped,
+    rather than a dict of per-district sums per party rebuilt at every step.
+
+    Args:
+        alias (str): Name of the updater in the partition.
+        parties_to_columns (dict): Node attribute holding each party's votes, e.g.
+            ``{"D": "PRES20DEM", "R": "PRES20REP"}``.
+        pop_col (str, optional): Node attribute holding population, to also track it.
+    """
+
+    def __init__(self, alias, parties_to_columns, pop_col=None):
+        self.alias = alias
+        self.parties = list(parties_to_columns)
+        self.columns = list(parties_to_columns.values())
+        if pop_col is not None:
+            self.columns.append(pop_col)
+        self._graph = None
+        self._node_index = None
+        self._node_values = None
+        self._district_labels = None
+        self._district_positions = None
+
+    def __call__(self, partition):
+        self._index_graph(partition.graph)
+
+        parent = partition.parent
+        if parent is None or not partition.flips:
+            return self._tally(partition)
+
+        previous = parent[self.alias]
+        district_index = self._district_index(previous.districts)
+        nodes = [self._node_index[node] for node in partition.flips]
+        old = [district_index[parent.assignment[node]] for node in partition.flips]
+        new = [district_index[district] for district in partition.flips.values()]
+
+        totals = previous.totals.copy()
+        values = self._node_values[nodes]
+        np.subtract.at(totals, old, values)
+        np.add.at(totals, new, values)
+        return DistrictTallies(previous.districts, self.parties, totals)
+
+    def __getstate__(self):
+        # The graph index is rebuilt on first use, e.g. in a worker process; a partition's
+        # FrozenGraph cannot be pickled
+        state = self.__dict__.copy()
+        state.update(
+            _graph=None, _node_index=None, _node_values=None, _district_labels=None,
+            _district_positions=None,
+        )
+        return state
+
+    def _tally(self, partition):
+        labels = sorted(partition.parts)
+        totals = np.zeros((len(labels), len(self.columns)), dtype=self._node_values.dtype)
+        for i, district in enumerate(labels):
+            nodes = [self._node_index[node] for node in partition.parts[district]]
+            totals[i] = self._node_values[nodes].sum(axis=0)
+        return DistrictTallies(np.array(labels), self.parties, totals)
+
+    def _index_graph(self, graph):
+        if graph is self._graph:
+            return
+        self._graph = graph
+        self._node_index = {node: i for i, node in enumerate(graph.nodes)}
+        # Integer vote counts stay integers, as they would be in Election
+        self._node_values = np.array(
+            [[graph.nodes[node][column] for column in self.columns] for node in graph.nodes]
+        )
+        self._district_labels = None
+
+    def _district_index(self, districts):
+        if self._district_labels is not districts:
+            self._district_labels = districts
+            self._district_positions = {district: i for i, district in enumerate(districts.tolist())}
+        return self._district_positions
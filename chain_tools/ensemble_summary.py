@@ -0,0 +1,282 @@
+import json
+import re
+
+import numpy as np
+
+from chain_tools.batch import atomic_write_json
+
+# Per-district D and R votes of an election in a runner's record, e.g. "D votes" (synthetic) or
+# "Pres D votes" (NY)
+VOTES_KEY = re.compile(r"(?:(?P<election>.+) )?D votes")
+
+# Vote shares are counted in buckets of 1 / SHARE_RESOLUTION, so quantiles are exact to half that
+SHARE_RESOLUTION = 1000
+
+
+class ElectionSummary:
+    """Mergeable summary of one election over an ensemble of plans.
+
+    Keeps, for the two parties "D" and "R", a histogram of the number of seats each wins
+    (districts where it gets strictly more votes, as in ``DistrictTallies.seats``), and for
+    each rank of the districts sorted by D vote share (rank 0 is the district with the lowest
+    D share) a histogram of that district's D share of the two-party vote and the sum of its
+    shares. Shares are rounded to the nearest multiple of ``1 / resolution``.
+
+    Everything is a count or a sum, so summaries of parts of an ensemble (other chains, or
+    other files of the same chain) merge exactly with :meth:`merge`, and their size does not
+    grow with the number of plans.
+
+    Args:
+        n_districts (int): Number of districts per plan.
+        resolution (int): Number of share buckets between 0 and 1.
+    """
+
+    def __init__(self, n_districts, resolution=SHARE_RESOLUTION):
+        self.n_districts = n_districts
+        self.resolution = resolution
+        self.plans = 0
+        self.seats = {party: np.zeros(n_districts + 1, dtype=np.int64) for party in ("D", "R")}
+        self.share_counts = np.zeros((n_districts, resolution + 1), dtype=np.int64)
+        self.share_sums = np.zeros(n_districts)
+
+    def add(self, d_votes, r_votes):
+        """Adds one plan, or a batch of plans, to the summary.
+
+        Args:
+            d_votes (array-like): D votes per district, as an array of shape ``(districts,)``
+                for one plan or ``(plans, districts)`` for several.
+            r_votes (array-like): R votes, shaped like ``d_votes``.
+        """
+        d_votes = np.atleast_2d(np.asarray(d_votes, dtype=float))
+        r_votes = np.atleast_2d(np.asarray(r_votes, dtype=float))
+        if d_votes.shape[1] != self.n_districts or r_votes.shape != d_votes.shape:
+            raise ValueError(
+                f"Expected votes for {self.n_districts} districts, got arrays of shape "
+                f"{d_votes.shape} and {r_votes.shape}"
+            )
+        n_plans = len(d_votes)
+        self.plans += n_plans
+        for party, seats in (("D", (d_votes > r_votes).sum(axis=1)), ("R", (r_votes > d_votes).sum(axis=1))):
+            self.seats[party] += np.bincount(seats, minlength=self.n_districts + 1)
+
+        total = d_votes + r_votes
+        shares = np.divide(d_votes, total, out=np.zeros_like(d_votes), where=total > 0)
+        shares.sort(axis=1)
+        self.share_sums += shares.sum(axis=0)
+        buckets = np.rint(shares * self.resolution).astype(np.int64)
+        buckets += np.arange(self.n_districts) * (self.resolution + 1)
+        self.share_counts += np.bincount(
+            buckets.ravel(), minlength=self.share_counts.size
+        ).reshape(self.share_counts.shape)
+
+    def merge(self, other):
+        """Adds the plans summarized by ``other`` to this summary."""
+        if (other.n_districts, other.resolution) != (self.n_districts, self.resolution):
+            raise ValueError(
+                f"Cannot merge a summary of {other.n_districts} districts at resolution "
+                f"{other.resolution} into one of {self.n_districts} at {self.resolution}"
+            )
+        self.plans += other.plans
+        for party in self.seats:
+            self.seats[party] += other.seats[party]
+        self.share_counts += other.share_counts
+        self.share_sums += other.share_sums
+        return self
+
+    def mean_seats(self, party):
+        """Mean number of seats ``party`` ("D" or "R") wins, or NaN if there are no plans."""
+        if not self.plans:
+            return float("nan")
+        return float(self.seats[party] @ np.arange(self.n_districts + 1) / self.plans)
+
+    def mean_shares(self):
+        """Mean D share of each rank of district, as an array ordered from lowest to highest."""
+        if not self.plans:
+            return np.full(self.n_districts, np.nan)
+        return self.share_sums / self.plans
+
+    def share_quantiles(self, quantiles):
+        """D share of each rank of district at each of ``quantiles``.
+
+        The ``q`` quantile is the smallest share that at least a fraction ``q`` of the plans
+        are at or below (and the smallest share seen for ``q = 0``).
+
+        Args:
+            quantiles (sequence): Fractions between 0 and 1.
+
+        Returns:
+            np.ndarray: Shares of shape ``(len(quantiles), districts)``.
+        """
+        result = np.full((len(quantiles), self.n_districts), np.nan)
+        if not self.plans:
+            return result
+        cumulative = np.cumsum(self.share_counts, axis=1)
+        for i, quantile in enumerate(quantiles):
+            target = max(quantile * self.plans, 1)
+            for rank in range(self.n_districts):
+                bucket = np.searchsorted(cumulative[rank], target - 1e-9 * self.plans)
+                result[i, rank] = bucket / self.resolution
+        return result
+
+    def to_dict(self):
+        """JSON-serializable form of the summary; share histograms are stored from their first
+        to their last nonzero bucket."""
+        histograms = []
+        for counts in self.share_counts:
+            nonzero = np.flatnonzero(counts)
+            if len(nonzero):
+                start, stop = int(nonzero[0]), int(nonzero[-1]) + 1
+                histograms.append({"start": start, "counts": counts[start:stop].tolist()})
+            else:
+                histograms.append({"start": 0, "counts": []})
+        return {
+            "n_districts": self.n_districts,
+            "resolution": self.resolution,
+            "plans": self.plans,
+            "seats": {party: seats.tolist() for party, seats in self.seats.items()},
+            "share_sums": self.share_sums.tolist(),
+            "share_histograms": histograms,
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        """Rebuilds a summary from :meth:`to_dict`."""
+        summary = cls(data["n_districts"], data["resolution"])
+        summary.plans = data["plans"]
+        for party, seats in data["seats"].items():
+            summary.seats[party] = np.array(seats, dtype=np.int64)
+        summary.share_sums = np.array(data["share_sums"], dtype=float)
+        for rank, histogram in enumerate(data["share_histograms"]):
+            start = histogram["start"]
+            summary.share_counts[rank, start:start + len(histogram["counts"])] = histogram["counts"]
+        return summary
+
+
+def merge_summaries(summaries, other):
+    """Merges a dict of ElectionSummary by election name into ``summaries`` in place.
+
+    Elections missing from ``summaries`` are added as they are.
+    """
+    for election, summary in other.items():
+        if election in summaries:
+            summaries[election].merge(summary)
+        else:
+            summaries[election] = summary
+    return summaries
+
+
+def record_elections(keys):
+    """Elections of a runner's per-step record, from its keys.
+
+    Returns:
+        dict: The (D votes, R votes) keys of each election, named by the prefix of its keys:
+        "election" for the synthetic runners' unprefixed "D votes", "Pres" and "Sen" for NY.
+    """
+    elections = {}
+    for key in keys:
+        match = VOTES_KEY.fullmatch(key)
+        if match is not None:
+            elections[match["election"] or "election"] = (key, key.replace("D votes", "R votes"))
+    return elections
+
+
+def summary_path(jsonl_path):
+    """Path of the summary written next to a runner's ``.jsonl`` updater output."""
+    base = jsonl_path[: -len(".jsonl")] if jsonl_path.endswith(".jsonl") else jsonl_path
+    return f"{base}.summary.json"
+
+
+def read_summary(jsonl_path):
+    """Reads the summary written by :class:`SummaryWriter` in place of ``jsonl_path``.
+
+    Returns:
+        dict: ElectionSummary by election.
+    """
+    with open(summary_path(jsonl_path)) as f:
+        data = json.load(f)
+    return {election: ElectionSummary.from_dict(summary) for election, summary in data["elections"].items()}
+
+
+class SummaryWriter:
+    """Stats sink that summarizes the elections of each per-step record as it is written.
+
+    Records are passed on to ``sink`` (which may discard them, see
+    ``chain_tools.columnar_stats.NullStatsWriter``) and their votes added to an
+    :class:`ElectionSummary` per election, in batches. The summaries are written as JSON next
+    to the updater output (see :func:`summary_path`) at every checkpoint and when the sink is
+    closed. The position returned by :meth:`checkpoint` holds the summaries themselves, so a
+    resumed run continues from the plans summarized up to its checkpoint.
+
+    Args:
+        jsonl_path (str): Path of the JSONL updater output.
+        sink: Stats sink the records are passed on to.
+        batch_size (int): Number of records buffered before they are added to the summaries.
+        resume_position (dict, optional): Position returned by :meth:`checkpoint`.
+    """
+
+    def __init__(self, jsonl_path, sink, batch_size=1000, resume_position=None):
+        self.path = summary_path(jsonl_path)
+        self.sink = sink
+        self.batch_size = batch_size
+        self.steps = 0
+        self.summaries = {}
+        self.elections = None
+        self._batch = []
+        if resume_position is not None:
+            self.steps = resume_position["steps"]
+            self.summaries = {
+                election: ElectionSummary.from_dict(summary)
+                for election, summary in resume_position["elections"].items()
+            }
+
+    def write(self, record):
+        self.sink.write(record)
+        if self.elections is None:
+            self.elections = record_elections(record)
+        self._batch.append(record)
+        if len(self._batch) == self.batch_size:
+            self.flush()
+
+    def flush(self):
+        """Adds the buffered records to the summaries."""
+        if not self._batch:
+            return
+        for election, (d_key, r_key) in self.elections.items():
+            d_votes, r_votes = zip(*(_district_votes(record[d_key], record[r_key]) for record in self._batch))
+            if election not in self.summaries:
+                self.summaries[election] = ElectionSummary(len(d_votes[0]))
+            self.summaries[election].add(d_votes, r_votes)
+        self.steps += len(self._batch)
+        self._batch = []
+
+    def checkpoint(self):
+        """Makes the passed-on records durable, writes the summaries and returns a position
+        holding the sink's position and the summaries."""
+        self.flush()
+        position = {"sink": self.sink.checkpoint(), **self._state()}
+        atomic_write_json(self._state(), self.path)
+        return position
+
+    def close(self):
+        self.flush()
+        self.sink.close()
+        atomic_write_json(self._state(), self.path)
+
+    def _state(self):
+        return {
+            "steps": self.steps,
+            "elections": {election: summary.to_dict() for election, summary in self.summaries.items()},
+        }
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+def _district_votes(d_votes, r_votes):
+    """D and R votes of one record, per-district dicts (as read back from JSONL) or arrays."""
+    if isinstance(d_votes, dict):
+        return list(d_votes.values()), [r_votes[district] for district in d_votes]
+    return d_votes, r_votes
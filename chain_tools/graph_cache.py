@@ -0,0 +1,222 @@
+import json
+import os
+import shutil
+from collections import OrderedDict
+
+import numpy as np
+from gerrychain import Graph
+
+# Bump when the on-disk layout changes so that stale caches are recompiled rather than misread
+CACHE_VERSION = 1
+
+# Number of results kept in memory by cached(), most recently used last
+MEMORY_CACHE_SIZE = 1024
+_memory_cache = OrderedDict()
+
+
+def cache_path(json_path):
+    """Returns the directory holding the compiled form of the dual graph at ``json_path``."""
+    return f"{os.path.splitext(json_path)[0]}.graph"
+
+
+def is_fresh(json_path, compiled_path=None):
+    """Whether the compiled form of ``json_path`` exists, has this layout and is newer than it."""
+    compiled_path = compiled_path or cache_path(json_path)
+    header_path = os.path.join(compiled_path, "header.json")
+    if not os.path.exists(header_path):
+        return False
+    with open(header_path) as f:
+        if json.load(f).get("version") != CACHE_VERSION:
+            return False
+    return os.path.getmtime(header_path) >= os.path.getmtime(json_path)
+
+
+def compile_graph(json_path, compiled_path=None):
+    """Converts a dual graph saved with ``Graph.to_json`` into a directory of .npy arrays.
+
+    The directory holds the adjacency in CSR form (``indptr`` and ``indices``), a node-id table,
+    and one array per node or edge attribute whose values are all ints or all floats (e.g.
+    TOT_POP, PRES20DEM, init_part_1, random_weight). Any other attribute is kept as JSON in
+    ``header.json``. Neighbors are stored in the order they appear in the JSON, so
+    :func:`load_graph` rebuilds a graph that iterates exactly like ``Graph.from_json``'s.
+
+    Args:
+        json_path (str): Path of the dual graph JSON.
+        compiled_path (str, optional): Output directory. Defaults to :func:`cache_path`.
+    """
+    compiled_path = compiled_path or cache_path(json_path)
+    with open(json_path) as f:
+        data = json.load(f)
+    if data["directed"] or data["multigraph"]:
+        raise ValueError(f"{json_path} is not a simple undirected graph")
+
+    nodes = data["nodes"]
+    node_ids = [node["id"] for node in nodes]
+    index = {node_id: i for i, node_id in enumerate(node_ids)}
+
+    edges = [neighbor for neighbors in data["adjacency"] for neighbor in neighbors]
+    indptr = np.zeros(len(nodes) + 1, dtype=np.int64)
+    indptr[1:] = np.cumsum([len(neighbors) for neighbors in data["adjacency"]])
+    indices = np.fromiter((index[edge["id"]] for edge in edges), dtype=np.int64, count=len(edges))
+
+    arrays = {"indptr": indptr, "indices": indices, "node_ids": _node_id_array(node_ids)}
+    node_attributes = _split_attributes(nodes, "node", arrays, json_path)
+    edge_attributes = _split_attributes(edges, "edge", arrays, json_path)
+
+    header = {
+        "version": CACHE_VERSION,
+        "source": os.path.basename(json_path),
+        "graph": data["graph"],
+        "node_attributes": node_attributes,
+        "edge_attributes": edge_attributes,
+    }
+
+    # Write next to the destination and swap it in, so a concurrent reader never sees half a cache
+    temp_path = f"{compiled_path}.tmp{os.getpid()}"
+    os.makedirs(temp_path)
+    for name, array in arrays.items():
+        np.save(os.path.join(temp_path, f"{name}.npy"), array)
+    # The header is written last: its mtime is what is_fresh compares against the JSON
+    with open(os.path.join(temp_path, "header.json"), "w") as f:
+        json.dump(header, f)
+    if os.path.exists(compiled_path):
+        shutil.rmtree(compiled_path)
+    os.replace(temp_path, compiled_path)
+    return compiled_path
+
+
+def load_graph(compiled_path):
+    """Loads a graph compiled by :func:`compile_graph`.
+
+    The node and adjacency dicts are filled in directly from the arrays rather than edge by edge
+    through networkx, which makes this faster than ``Graph.from_json`` even on a 72-block graph
+    (by about a third there, and four to five times on the NY tracts). Like ``Graph.from_json``
+    it warns about islands.
+
+    Args:
+        compiled_path (str): Directory written by :func:`compile_graph`.
+    """
+    with open(os.path.join(compiled_path, "header.json")) as f:
+        header = json.load(f)
+
+    def load(name):
+        return np.load(os.path.join(compiled_path, f"{name}.npy"))
+
+    node_ids = load("node_ids").tolist()
+    node_data = _join_attributes(header["node_attributes"], "node", load, len(node_ids))
+    indptr = load("indptr")
+    edge_data = _join_attributes(header["edge_attributes"], "edge", load, int(indptr[-1]))
+    indptr = indptr.tolist()
+    indices = load("indices").tolist()
+
+    graph = Graph()
+    graph.graph.update(header["graph"])
+    graph._node.update(zip(node_ids, node_data))
+    adjacency = {node: {} for node in node_ids}
+    # Same insertion order as networkx's adjacency_graph, which Graph.from_json uses: each edge
+    # is added from the first of its ends to list it, and both ends share its data dict
+    for i, source in enumerate(node_ids):
+        neighbors = adjacency[source]
+        for k in range(indptr[i], indptr[i + 1]):
+            target = node_ids[indices[k]]
+            data = neighbors.get(target)
+            if data is None:
+                data = neighbors[target] = adjacency[target][source] = {}
+            data.update(edge_data[k])
+    graph._adj.update(adjacency)
+
+    graph.issue_warnings()
+    return graph
+
+
+def load_dual_graph(json_path):
+    """Loads the dual graph at ``json_path``, from its compiled form when that is up to date.
+
+    Falls back to ``Graph.from_json`` when the graph has not been compiled (see
+    compile_dual_graphs_cli.py and
+    compile_block_graphs_cli.py) or the JSON has changed since.
+
+    Args:
+        json_path (str): Path of the dual graph JSON.
+    """
+    compiled_path = cache_path(json_path)
+    if is_fresh(json_path, compiled_path):
+        return load_graph(compiled_path)
+    return Graph.from_json(json_path)
+
+
+def cached(load, *paths):
+    """Returns ``load(*paths)``, reusing the result of an earlier call in this process.
+
+    Results are kept in a least-recently-used cache of ``MEMORY_CACHE_SIZE`` entries, keyed by
+    ``load`` and the absolute path and modification time of each of ``paths``, so a file that
+    changes on disk is loaded again. Every caller gets the same object and must not modify it;
+    copy a graph before changing its attributes.
+
+    Args:
+        load (callable): Function of the paths, e.g. :func:`load_dual_graph`.
+        *paths (str): Files the result is computed from.
+    """
+    key = (load, *((os.path.abspath(path), os.path.getmtime(path)) for path in paths))
+    if key in _memory_cache:
+        _memory_cache.move_to_end(key)
+        return _memory_cache[key]
+    value = load(*paths)
+    _memory_cache[key] = value
+    while len(_memory_cache) > MEMORY_CACHE_SIZE:
+        _memory_cache.popitem(last=False)
+    return value
+
+
+def _node_id_array(node_ids):
+    if all(isinstance(node_id, int) and not isinstance(node_id, bool) for node_id in node_ids):
+        return np.array(node_ids, dtype=np.int64)
+    if all(isinstance(node_id, str) for node_id in node_ids):
+        return np.array(node_ids, dtype=np.str_)
+    raise ValueError("Node ids must be all ints or all strings")
+
+
+def _column_dtype(values):
+    """Returns the NumPy dtype that round-trips ``values`` exactly, or None if there is none."""
+    if all(type(value) is int for value in values):
+        if all(-2**63 <= value < 2**63 for value in values):
+            return np.int64
+        return None
+    if all(type(value) is float for value in values):
+        return np.float64
+    return None
+
+
+def _split_attributes(records, kind, arrays, json_path):
+    """Moves the attributes of ``records`` (other than "id") into ``arrays`` where possible.
+
+    Returns the attribute layout stored in the header: the attribute names in their original
+    order, and for each one either the index of its array or its values as a JSON list.
+    """
+    names = [name for name in records[0] if name != "id"] if records else []
+    layout = {"order": names, "columns": {}, "values": {}}
+    for record in records:
+        if len(record) != len(names) + 1 or any(name not in record for name in names):
+            raise ValueError(f"Every {kind} of {json_path} must have the same attributes")
+
+    for name in names:
+        values = [record[name] for record in records]
+        dtype = _column_dtype(values)
+        if dtype is None:
+            layout["values"][name] = values
+        else:
+            column = len(layout["columns"])
+            layout["columns"][name] = column
+            arrays[f"{kind}_column_{column}"] = np.array(values, dtype=dtype)
+    return layout
+
+
+def _join_attributes(layout, kind, load, count):
+    """Inverse of :func:`_split_attributes`: returns one attribute dict per record."""
+    values = dict(layout["values"])
+    for name, column in layout["columns"].items():
+        values[name] = load(f"{kind}_column_{column}").tolist()
+    names = layout["order"]
+    if not names:
+        return [{} for _ in range(count)]
+    return [dict(zip(names, row)) for row in zip(*(values[name] for name in names))]
@@ -0,0 +1,272 @@
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from chain_tools.seeding import derive_seed
+
+# Set in each worker process by _init_worker
+_worker_partitioner = None
+
+
+class TreePartitioner:
+    """Draws random partitions of a graph into connected parts of (near-)equal population.
+
+    Like ``recursive_tree_part``, each part is cut off a random spanning tree of the nodes not
+    yet assigned, but the tree is kept between cuts: once a part is removed, the rest of the
+    tree still spans the remaining nodes, so a new tree is only drawn when the current one has
+    no balanced cut left. With exact targets (e.g. building blocks of equal population and a
+    tiny epsilon) most cuts then need no new tree at all. Every cut also leaves a remainder
+    that can still be split into balanced parts population-wise, so the last part is always
+    balanced rather than checked afterwards.
+
+    When ``max_trees_per_cut`` trees in a row have no balanced cut, the remaining nodes are
+    taken to be stuck (most often with only a few parts left to cut) and the partition starts
+    over. The counters below record how often each of these happens, and ``timeout`` bounds
+    the time spent on one partition.
+
+    Uses Python's ``random`` module, so seeding it makes the partitions reproducible.
+
+    Args:
+        graph (Graph): Connected graph to partition.
+        n_parts (int): Number of parts.
+        pop_col (str): Node attribute holding population.
+        epsilon (float): Allowed relative deviation of each part's population from the target.
+        pop_target (float, optional): Target population of each part. Defaults to the total
+            population divided by ``n_parts``.
+        max_trees_per_cut (int): Spanning trees to try for one cut before starting over.
+        timeout (float, optional): Seconds allowed per partition; None waits indefinitely.
+    """
+
+    def __init__(
+        self, graph, n_parts, pop_col, epsilon, pop_target=None, max_trees_per_cut=100,
+        timeout=None
+    ):
+        self.nodes = list(graph.nodes)
+        index = {node: i for i, node in enumerate(self.nodes)}
+        self.populations = np.array([graph.nodes[node][pop_col] for node in self.nodes], dtype=float)
+        edges = np.array([(index[u], index[v]) for u, v in graph.edges], dtype=np.int64)
+        self.edges = edges.reshape(-1, 2)
+        self.n_parts = n_parts
+        if pop_target is None:
+            pop_target = self.populations.sum() / n_parts
+        self.min_pop = pop_target * (1 - epsilon)
+        self.max_pop = pop_target * (1 + epsilon)
+        self.max_trees_per_cut = max_trees_per_cut
+        self.timeout = timeout
+
+        # Counters over every partition drawn so far
+        self.partitions = 0
+        self.trees = 0
+        self.failed_trees = 0
+        self.restarts = 0
+        self.seconds = 0.0
+
+    def partition(self):
+        """Returns a random balanced partition as a dict from node to part (0 to n_parts - 1).
+
+        Raises:
+            TimeoutError: If no partition was found within ``timeout`` seconds.
+        """
+        start = time.perf_counter()
+        deadline = None if self.timeout is None else start + self.timeout
+        try:
+            parts = self._attempt(deadline)
+        finally:
+            self.seconds += time.perf_counter() - start
+        self.partitions += 1
+        return dict(zip(self.nodes, parts.tolist()))
+
+    def counters(self):
+        """The counters as a dict, e.g. to add up across worker processes."""
+        return {
+            "partitions": self.partitions,
+            "trees": self.trees,
+            "failed_trees": self.failed_trees,
+            "restarts": self.restarts,
+            "seconds": self.seconds,
+        }
+
+    def report(self):
+        return format_counters(self.counters())
+
+    def _attempt(self, deadline):
+        """Cuts off parts one at a time, starting over whenever the remaining nodes get stuck."""
+        districts = []
+        remaining = np.ones(len(self.nodes), dtype=bool)
+        remaining_pop = self.populations.sum()
+        tree = None
+        trees_drawn = 0
+        while len(districts) < self.n_parts - 1:
+            if tree is None:
+                if trees_drawn == self.max_trees_per_cut:
+                    # Start over: undoing only the last few cuts tends to get stuck again
+                    self.restarts += 1
+                    districts = []
+                    remaining[:] = True
+                    remaining_pop = self.populations.sum()
+                    trees_drawn = 0
+                if deadline is not None and time.perf_counter() > deadline:
+                    raise TimeoutError(
+                        f"No balanced partition into {self.n_parts} parts found in "
+                        f"{self.timeout} seconds ({self.report()})"
+                    )
+                tree = self._spanning_tree(remaining)
+                trees_drawn += 1
+                self.trees += 1
+
+            district = self._balanced_cut(
+                tree, remaining, remaining_pop, self.n_parts - len(districts)
+            )
+            if district is None:
+                self.failed_trees += 1
+                tree = None
+                continue
+
+            districts.append(district)
+            remaining[district] = False
+            remaining_pop -= self.populations[district].sum()
+            # What is left of the tree still spans the remaining nodes
+            tree = tree[remaining[tree[:, 0]] & remaining[tree[:, 1]]]
+            trees_drawn = 0
+
+        parts = np.full(len(self.nodes), self.n_parts - 1, dtype=np.int64)
+        for part, district in enumerate(districts):
+            parts[district] = part
+        return parts
+
+    def _spanning_tree(self, remaining):
+        """Kruskal's method with random weights on the edges between remaining nodes."""
+        edges = self.edges[remaining[self.edges[:, 0]] & remaining[self.edges[:, 1]]]
+        weights = [random.random() for _ in range(len(edges))]
+        root = list(range(len(self.nodes)))
+
+        def find(node):
+            while root[node] != node:
+                root[node] = root[root[node]]
+                node = root[node]
+            return node
+
+        tree = []
+        for u, v in edges[np.argsort(weights, kind="stable")].tolist():
+            root_u, root_v = find(u), find(v)
+            if root_u != root_v:
+                root[root_u] = root_v
+                tree.append((u, v))
+        return np.array(tree, dtype=np.int64).reshape(-1, 2)
+
+    def _balanced_cut(self, tree, remaining, remaining_pop, parts_left):
+        """Nodes of a random balanced part that one edge of ``tree`` cuts off, or None.
+
+        A cut is balanced when the part is within bounds and the rest could still be split
+        into ``parts_left - 1`` parts within bounds.
+        """
+        members = np.flatnonzero(remaining)
+        if len(members) == 1:
+            return None
+        neighbors = [[] for _ in range(len(self.nodes))]
+        for u, v in tree.tolist():
+            neighbors[u].append(v)
+            neighbors[v].append(u)
+
+        # Subtree populations below each node, rooted at a random remaining node
+        root = random.choice(members.tolist())
+        parent = {root: None}
+        order = [root]
+        for node in order:
+            for neighbor in neighbors[node]:
+                if neighbor not in parent:
+                    parent[neighbor] = node
+                    order.append(neighbor)
+        subtree_pop = {node: self.populations[node] for node in order}
+        for node in reversed(order[1:]):
+            subtree_pop[parent[node]] += subtree_pop[node]
+
+        def fits(part_pop, rest_pop):
+            rest_parts = parts_left - 1
+            return (
+                self.min_pop <= part_pop <= self.max_pop
+                and rest_parts * self.min_pop <= rest_pop <= rest_parts * self.max_pop
+            )
+
+        cuts = []
+        for node in order[1:]:
+            below = subtree_pop[node]
+            if fits(below, remaining_pop - below):
+                cuts.append((node, True))
+            if fits(remaining_pop - below, below):
+                cuts.append((node, False))
+        if not cuts:
+            return None
+
+        # The subtree below the cut edge is everything reachable without going up through it
+        node, part_is_below = random.choice(cuts)
+        below = [node]
+        seen = {node, parent[node]}
+        for member in below:
+            for neighbor in neighbors[member]:
+                if neighbor not in seen:
+                    seen.add(neighbor)
+                    below.append(neighbor)
+        below = np.array(below, dtype=np.int64)
+        if part_is_below:
+            return below
+        rest = remaining.copy()
+        rest[below] = False
+        return np.flatnonzero(rest)
+
+
+def format_counters(counters):
+    """One-line summary of :meth:`TreePartitioner.counters`."""
+    return (
+        f"{counters['partitions']} partitions, {counters['trees']} spanning trees, "
+        f"{counters['failed_trees']} without a balanced cut, {counters['restarts']} restarts, "
+        f"{counters['seconds']:.1f}s"
+    )
+
+
+def initial_partitions(graph, n_parts, pop_col, epsilon, count, random_seed, workers=None, **kwargs):
+    """Draws ``count`` partitions of ``graph`` with a :class:`TreePartitioner`, in parallel.
+
+    Partition ``i`` is drawn with Python's ``random`` seeded with
+    ``derive_seed(random_seed, "init_part", i)``, so the result does not depend on ``workers``.
+
+    Args:
+        graph (Graph): Connected graph to partition.
+        n_parts (int): Number of parts.
+        pop_col (str): Node attribute holding population.
+        epsilon (float): Allowed relative deviation of each part's population from the target.
+        count (int): Number of partitions.
+        random_seed (int): Seed from which every partition's seed is derived.
+        workers (int, optional): Number of worker processes. Defaults to one per partition,
+            up to the number of CPUs.
+        **kwargs: Further arguments of :class:`TreePartitioner`.
+
+    Returns:
+        tuple: The partitions (dicts from node to part) and the counters summed over them.
+    """
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        initializer=_init_worker,
+        initargs=(graph, n_parts, pop_col, epsilon, kwargs),
+    ) as executor:
+        results = list(
+            executor.map(_draw, [derive_seed(random_seed, "init_part", i) for i in range(count)])
+        )
+    partitions = [partition for partition, _ in results]
+    counters = {key: sum(result[key] for _, result in results) for key in results[0][1]} if results else {}
+    return partitions, counters
+
+
+def _init_worker(graph, n_parts, pop_col, epsilon, kwargs):
+    global _worker_partitioner
+    _worker_partitioner = TreePartitioner(graph, n_parts, pop_col, epsilon, **kwargs)
+
+
+def _draw(seed):
+    random.seed(seed)
+    before = _worker_partitioner.counters()
+    partition = _worker_partitioner.partition()
+    after = _worker_partitioner.counters()
+    return partition, {key: after[key] - before[key] for key in after}
@@ -0,0 +1,145 @@
+import itertools
+import random
+from concurrent.futures import ProcessPoolExecutor
+
+import networkx as nx
+
+from gerrychain import MarkovChain
+from gerrychain.accept import always_accept
+from gerrychain.graph import FrozenGraph
+
+from chain_tools.checkpoint import assignment_list, rebuild_partition
+from chain_tools.seeding import derive_seed
+
+# Set in each worker process by _init_worker
+_worker_chain = {}
+
+
+def parallel_short_bursts(
+    optimizer, burst_length, num_rounds, bursts_per_round, random_seed, checkpointer=None,
+    mp_context=None, workers=None
+):
+    """Runs short bursts with several independent bursts per round on worker processes.
+
+    Each round launches ``bursts_per_round`` bursts of ``burst_length`` steps from the best plan
+    found so far, by default one per worker process, and continues from the best plan any of
+    them found. Burst ``k`` of round ``r`` uses its own ``random`` stream seeded with
+    ``derive_seed(random_seed, "burst", r, k)``, so the output depends only on the seed, not on
+    the number of workers or how they are scheduled.
+
+    The plans of each round are yielded burst by burst, in burst order, just like the bursts
+    of ``short_bursts`` (each burst starts with the plan it continues from). Workers only send
+    back each step's flips and score; the plans are rebuilt here by replaying the flips. As in
+    ``short_bursts``, ties between equally good plans go to the one yielded last.
+
+    Args:
+        optimizer (SingleMetricOptimizer): Configured optimizer, e.g. a Gingleator. Its
+            updaters, proposal, constraints and score function must be picklable, except for
+            the step counter the optimizer adds itself, which workers do not need and are not
+            sent.
+        burst_length (int): Number of steps within each burst.
+        num_rounds (int): Number of rounds to perform.
+        bursts_per_round (int): Number of bursts per round.
+        random_seed (int): Seed from which every burst's seed is derived.
+        checkpointer (Checkpointer, optional): Checkpointer whose
+            :meth:`~Checkpointer.begin` has been called for this chain. Checkpoints are taken
+            at the first round boundary at or after every ``checkpointer.every`` steps.
+        mp_context (multiprocessing.context.BaseContext, optional): Start method of the worker
+            processes; defaults to the platform's.
+        workers (int, optional): Number of worker processes. Defaults to ``bursts_per_round``.
+    """
+    steps_per_round = burst_length * bursts_per_round
+    checkpointing = checkpointer is not None and checkpointer.enabled
+    rounds_per_checkpoint = max(1, checkpointer.every // steps_per_round) if checkpointing else None
+
+    first_round = checkpointer.steps_done // steps_per_round if checkpointer is not None else 0
+    if first_round == 0:
+        best_part = optimizer._initial_part
+        best_score = optimizer.score(best_part)
+    else:
+        if checkpointer.chain_state.get("bursts_per_round") != bursts_per_round:
+            raise ValueError(
+                f"The checkpoint was written with {checkpointer.chain_state.get('bursts_per_round')} "
+                f"bursts per round, not {bursts_per_round}"
+            )
+        best_part = rebuild_partition(optimizer._initial_part, checkpointer.chain_state["best"])
+        best_score = checkpointer.chain_state["best_score"]
+
+    template = optimizer._initial_part
+    # SingleMetricOptimizer adds a lambda "step" updater, which cannot be pickled for workers
+    # started with spawn or forkserver
+    updaters = {
+        name: updater for name, updater in template.updaters.items() if name != optimizer._step_indexer
+    }
+    # FrozenGraph cannot be unpickled, so workers get the graph it wraps and freeze it again
+    graph = template.graph.graph if isinstance(template.graph, FrozenGraph) else template.graph
+    with ProcessPoolExecutor(
+        max_workers=workers or bursts_per_round,
+        mp_context=mp_context,
+        initializer=_init_worker,
+        initargs=(
+            type(template), graph, updaters, optimizer._proposal,
+            optimizer._constraints, optimizer.score, burst_length,
+        ),
+    ) as executor:
+        for round_number in range(first_round, num_rounds):
+            if checkpointing and round_number > first_round and round_number % rounds_per_checkpoint == 0:
+                checkpointer.save(
+                    round_number * steps_per_round,
+                    best=assignment_list(best_part), best_score=best_score,
+                    bursts_per_round=bursts_per_round,
+                )
+
+            start_assignment = assignment_list(best_part)
+            seeds = [
+                derive_seed(random_seed, "burst", round_number, k) for k in range(bursts_per_round)
+            ]
+            bursts = executor.map(_run_burst, [start_assignment] * bursts_per_round, seeds)
+
+            start = best_part
+            for burst_flips, burst_scores in bursts:
+                plan = start
+                yield plan
+                for flips, score in zip(burst_flips, burst_scores):
+                    # Like MarkovChain, only keep the link to the previous plan
+                    plan.parent = None
+                    plan = plan.flip(flips)
+                    yield plan
+                    if optimizer._is_improvement(score, best_score):
+                        best_part = plan
+                        best_score = score
+
+            optimizer._best_part = best_part
+            optimizer._best_score = best_score
+
+
+def _init_worker(partition_class, graph, updaters, proposal, constraints, score, burst_length):
+    if isinstance(graph, nx.Graph):
+        graph = FrozenGraph(graph)
+    _worker_chain.update(
+        partition_class=partition_class, graph=graph, updaters=updaters, proposal=proposal, constraints=constraints,
+        score=score, burst_length=burst_length,
+    )
+
+
+def _run_burst(start_assignment, seed):
+    """Runs one burst in a worker, returning the flips and score of every step after the first."""
+    random.seed(seed)
+    graph = _worker_chain["graph"]
+    start = _worker_chain["partition_class"](
+        graph,
+        assignment=dict(zip(graph.nodes, start_assignment)),
+        updaters=_worker_chain["updaters"],
+    )
+    chain = MarkovChain(
+        _worker_chain["proposal"], _worker_chain["constraints"], always_accept, start,
+        _worker_chain["burst_length"],
+    )
+
+    all_flips = []
+    scores = []
+    # Iterating a MarkovChain again restarts it, so its first state is skipped with islice
+    for plan in itertools.islice(chain, 1, None):
+        all_flips.append(dict(plan.flips or {}))
+        scores.append(_worker_chain["score"](plan))
+    return all_flips, scores
@@ -0,0 +1,192 @@
+import json
+import math
+import time
+from collections import Counter
+from contextlib import nullcontext
+from functools import partial
+
+from gerrychain.proposals import recom
+from gerrychain.tree import bipartition_tree, random_spanning_tree
+
+# Per-call durations are binned by powers of two microseconds: bin k holds calls that took
+# [2^(k-1), 2^k) us, bin 0 anything under 1 us
+NUM_BINS = 32
+
+
+class ChainProfiler:
+    """Opt-in timing of the stages of a chain loop, written as rolling histograms.
+
+    Every ``every`` steps, appends one JSON line to ``metrics_path`` covering the steps since
+    the previous line: for each stage, its number of calls, total seconds and a histogram of
+    per-call durations (see ``NUM_BINS``), plus histograms of how many proposals each step
+    took (more than one means rejected proposals; 0 for the first plan of a chain or burst)
+    and how many spanning trees each bipartition drew.
+
+    A profiler created with ``metrics_path=None`` is disabled: its wrappers return their
+    argument unchanged and :meth:`timed` is a no-op, so runners can call it unconditionally.
+
+    Args:
+        metrics_path (str, optional): Path of the JSONL metrics file; None disables profiling.
+        every (int): Number of steps per metrics line.
+    """
+
+    def __init__(self, metrics_path=None, every=1000):
+        self.metrics_path = metrics_path
+        self.every = every
+        self._file = None
+        self._steps = 0
+        self._reset_window()
+
+    @property
+    def enabled(self):
+        return self.metrics_path is not None
+
+    def start(self, first_step=0):
+        """Opens the metrics file, appending to it when resuming from ``first_step`` > 0."""
+        if self.enabled:
+            self._file = open(self.metrics_path, "a" if first_step else "w")
+            self._steps = first_step
+            self._reset_window()
+
+    def wrap(self, stage, function):
+        """Returns ``function`` with each call timed under ``stage``."""
+        if not self.enabled:
+            return function
+
+        def timed(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                self._record(stage, time.perf_counter() - start)
+
+        return timed
+
+    def timed(self, stage):
+        """Context manager timing its body under ``stage``."""
+        if not self.enabled:
+            return nullcontext()
+        return _StageTimer(self, stage)
+
+    def instrument_proposal(self, proposal):
+        """Times a ``partial(recom, ...)`` proposal, its bipartitions and their spanning trees.
+
+        Args:
+            proposal (partial): ReCom proposal; its ``method`` keyword (default
+                ``bipartition_tree``) is replaced by a timed one that counts spanning trees.
+                Other proposals, such as chain_tools.bitset_recom's, are timed as a whole.
+        """
+        if not self.enabled:
+            return proposal
+
+        if proposal.func is not recom:
+            def counted_proposal(*args, **kwargs):
+                self._proposals += 1
+                return proposal(*args, **kwargs)
+
+            return self.wrap("proposal", counted_proposal)
+
+        def counted_spanning_tree(*args, **kwargs):
+            self._trees += 1
+            return random_spanning_tree(*args, **kwargs)
+
+        method = proposal.keywords.get("method", bipartition_tree)
+        timed_bipartition = self.wrap(
+            "bipartition", partial(method, spanning_tree_fn=counted_spanning_tree)
+        )
+
+        def bipartition(*args, **kwargs):
+            self._trees = 0
+            try:
+                return timed_bipartition(*args, **kwargs)
+            finally:
+                self._trees_per_bipartition[self._trees] += 1
+
+        recom_with_timing = partial(
+            proposal.func, *proposal.args, **{**proposal.keywords, "method": bipartition}
+        )
+
+        def timed_proposal(*args, **kwargs):
+            self._proposals += 1
+            return recom_with_timing(*args, **kwargs)
+
+        return self.wrap("proposal", timed_proposal)
+
+    def step(self):
+        """Marks the end of one step of the chain; writes a metrics line every ``every`` steps."""
+        if not self.enabled:
+            return
+        self._steps += 1
+        self._window_steps += 1
+        self._proposals_per_step[self._proposals] += 1
+        self._proposals = 0
+        if self._window_steps >= self.every:
+            self.flush()
+
+    def flush(self):
+        """Writes the metrics of the steps since the last line, if any."""
+        if not self.enabled or self._file is None or not self._window_steps:
+            return
+        line = {
+            "step": self._steps,
+            "window_steps": self._window_steps,
+            "window_seconds": time.perf_counter() - self._window_start,
+            "stages": {
+                stage: {
+                    "calls": calls,
+                    "seconds": self._seconds[stage],
+                    "histogram_us": self._histograms[stage],
+                }
+                for stage, calls in self._calls.items()
+            },
+            "proposals_per_step": dict(sorted(self._proposals_per_step.items())),
+            "trees_per_bipartition": dict(sorted(self._trees_per_bipartition.items())),
+        }
+        self._file.write(json.dumps(line) + "\n")
+        self._file.flush()
+        self._reset_window()
+
+    def close(self):
+        if self._file is not None:
+            self.flush()
+            self._file.close()
+            self._file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def _record(self, stage, seconds):
+        self._calls[stage] = self._calls.get(stage, 0) + 1
+        self._seconds[stage] = self._seconds.get(stage, 0.0) + seconds
+        histogram = self._histograms.get(stage)
+        if histogram is None:
+            histogram = self._histograms[stage] = [0] * NUM_BINS
+        histogram[min(max(math.frexp(seconds * 1e6)[1], 0), NUM_BINS - 1)] += 1
+
+    def _reset_window(self):
+        self._window_start = time.perf_counter()
+        self._window_steps = 0
+        self._calls = {}
+        self._seconds = {}
+        self._histograms = {}
+        self._proposals = 0
+        self._trees = 0
+        self._proposals_per_step = Counter()
+        self._trees_per_bipartition = Counter()
+
+
+class _StageTimer:
+    __slots__ = ("profiler", "stage", "start")
+
+    def __init__(self, profiler, stage):
+        self.profiler = profiler
+        self.stage = stage
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.profiler._record(self.stage, time.perf_counter() - self.start)
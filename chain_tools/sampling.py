@@ -0,0 +1,47 @@
+import numpy as np
+from gerrychain import Partition
+
+
+def thinned(plans, every, updaters=None):
+    """Yields every ``every``-th plan of a chain, numbered from 1, and nothing in between.
+
+    GerryChain evaluates an updater the first time it is read, so a chain whose intermediate
+    states are never looked at only pays for the updaters its proposal, constraints and score
+    function read. Build the chain with just those; the updaters the saved samples need can be
+    passed here instead, and are then computed on the saved samples alone.
+
+    Args:
+        plans (iterable): Partitions of a chain, e.g. a MarkovChain or short_bursts generator.
+        every (int): Number of steps between saved samples.
+        updaters (dict, optional): Updaters to evaluate on the saved samples only. Each saved
+            sample is then a fresh Partition of the plan's assignment carrying these updaters.
+    """
+    for step, plan in enumerate(plans, start=1):
+        if step % every:
+            continue
+        if updaters is not None:
+            plan = Partition(plan.graph, plan.assignment.to_dict(), updaters)
+        yield step // every, plan
+
+
+def final_state(plans):
+    """Runs a chain to the end and returns its last plan, without keeping the ones before it."""
+    plan = None
+    for plan in plans:
+        pass
+    return plan
+
+
+def autocorrelation(series, max_lag):
+    """Sample autocorrelation of ``series`` at lags 1 to ``max_lag`` (0 for a constant series).
+
+    Args:
+        series (array-like): One statistic per sample, in sampling order.
+        max_lag (int): Largest lag to return.
+    """
+    series = np.asarray(series, dtype=float)
+    centered = series - series.mean()
+    variance = np.dot(centered, centered)
+    if variance == 0:
+        return np.zeros(max_lag)
+    return np.array([np.dot(centered[:-lag], centered[lag:]) / variance for lag in range(1, max_lag + 1)])
@@ -0,0 +1,47 @@
+import numpy as np
+
+
+def reward_partial_dist(part, minority_perc_col, threshold):
+    """Gingleator score function that rewards all opportunity districts plus partial credit for
+    the next highest district below threshold.
+
+    Computes the same score as GerryChain's ``Gingleator.reward_partial_dist``, except that when
+    no district is below threshold it returns the number of opportunity districts instead of
+    raising. The shares are compared as one array, so the common case costs no exception
+    handling and a single pass over the districts.
+
+    Args:
+        part (Partition): GerryChain Partition object.
+        minority_perc_col (str): Name of the updater giving each district's minority share,
+            either as an array (see :class:`ShareUpdater`) or as a dict keyed by district.
+        threshold (float): Threshold for minority percentage.
+    """
+    shares = part[minority_perc_col]
+    if not isinstance(shares, np.ndarray):
+        shares = np.fromiter(shares.values(), dtype=float)
+    opportunity = shares >= threshold
+    below = shares[~opportunity]
+    return int(opportunity.sum()) + (below.max() if below.size else 0)
+
+
+class ShareUpdater:
+    """Updater giving a party's share in each district as an array.
+
+    Pass its alias to Gingleator as ``minority_perc_col`` in place of ``minority_pop_col`` and
+    ``total_pop_col``, so the shares come from the arrays of an ElectionTally updater instead of
+    a dict rebuilt from two Tally updaters at every step. Unlike a lambda it can be pickled,
+    e.g. to send a chain's updaters to worker processes.
+
+    Args:
+        tally_alias (str): Alias of the ElectionTally updater to read.
+        party (str): Party whose share is returned.
+        denominator (str): "votes" or "population"; see ``DistrictTallies.shares``.
+    """
+
+    def __init__(self, tally_alias, party, denominator="votes"):
+        self.tally_alias = tally_alias
+        self.party = party
+        self.denominator = denominator
+
+    def __call__(self, partition):
+        return partition[self.tally_alias].shares(self.party, self.denominator)
@@ -0,0 +1,25 @@
+import hashlib
+
+import numpy as np
+
+
+def derive_seed(master_seed, *key):
+    """Derives an independent integer seed for one task from a master seed.
+
+    Uses numpy's ``SeedSequence`` so that seeds derived from the same master seed with different
+    keys give statistically independent streams, while the same (master seed, key) pair always
+    gives the same seed regardless of the order in which tasks are scheduled.
+
+    Args:
+        master_seed (int): Seed the whole run was started with.
+        *key: Integers or strings identifying the task, e.g. ("GG", 72, 1, 4, 17).
+    """
+    entropy = [master_seed] + [_key_to_int(part) for part in key]
+    return int(np.random.SeedSequence(entropy).generate_state(1, dtype=np.uint64)[0])
+
+
+def _key_to_int(part):
+    if isinstance(part, (int, np.integer)) and part >= 0:
+        return int(part)
+    digest = hashlib.sha256(str(part).encode()).digest()
+    return int.from_bytes(digest[:8], "little")
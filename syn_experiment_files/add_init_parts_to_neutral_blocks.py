@@ -1,73 +1,92 @@
-from gerrychain import Partition, Graph, updaters
-from gerrychain.tree import recursive_tree_part
-import random
+import click
+from gerrychain import Graph
 import os
+import sys
 from networkx.readwrite import json_graph
 from pathlib import Path
-import json
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from chain_tools.batch import Manifest, atomic_write_json, process_files
+from chain_tools.initial_partitions import TreePartitioner, format_counters
 
 SCRIPT_FILE_PATH = os.path.abspath(__file__)
 SCRIPT_DIR = os.path.dirname(SCRIPT_FILE_PATH)
 
 random_seed_num = 320
-random.seed(random_seed_num)
 
-def main():
+neutral_blocks_dir = (
+        f"{SCRIPT_DIR}/syn_building_block_partitions/neutral"
+    )
+
+
+def add_init_parts_to_file(file_name):
+    """
+    Finds three initial partitions (assignments of blocks to districts) of one building block
+    graph and overwrites it with a graph where they are saved as node attributes
+    "init_part_1", "init_part_2", and "init_part_3". Returns the partitioner's counters.
+    """
+    graph = Graph.from_json(file_name)
+
+    # Find three initial partitions, reusing spanning trees between the cuts of each
+    partitioner = TreePartitioner(graph, 12, "population", 0.00001)
+    for i in [1,2,3]:
+        assignment_i = partitioner.partition()
+
+        for block, district in assignment_i.items():
+            graph.nodes[block][f"init_part_{i}"] = district
+
+    # Overwrite file with graph with initial partitions added, without ever leaving half of it
+    atomic_write_json(json_graph.adjacency_data(graph), file_name)
+
+    return partitioner.counters()
+
+
+@click.command()
+@click.option(
+    "--workers",
+    default=os.cpu_count(),
+    show_default=True,
+    type=int,
+    help="Number of worker processes",
+)
+def main(workers):
     """
     For each neutral building block graph, finds three initial partitions
     (assignments of blocks to districts).
     Overwrites the block graph with a new graph where these initial partition are saved as
     node attributes "init_part_1", "init_part_2", and "init_part_3".
-    """
 
-    neutral_blocks_dir = (
-            f"{SCRIPT_DIR}/../syn_files/syn_building_block_partitions/neutral"
-        )
+    Files are processed in parallel, each with Python's random seeded from its path, so the
+    result does not depend on the number of workers. Finished files are listed in
+    init_parts_manifest.txt next to the block graphs and skipped when the script is run again,
+    unless they changed since (e.g. the building blocks were rebuilt), so it can be interrupted
+    and restarted; delete the manifest to redo every file.
+    """
+    manifest = Manifest(f"{neutral_blocks_dir}/init_parts_manifest.txt")
+    if len(manifest):
+        print(f"Skipping {len(manifest)} unchanged files already listed in {manifest.path}")
 
-    file_count = 0
+    file_count = len(manifest)
+    counters = None
 
     # Iterate over neutral building block graphs
-    for json_file in Path(neutral_blocks_dir).rglob("*.json"):
+    json_files = Path(neutral_blocks_dir).rglob("*.json")
+    for _, file_counters in process_files(
+        add_init_parts_to_file, json_files, neutral_blocks_dir, manifest, random_seed_num, workers
+    ):
         file_count += 1
+        counters = {
+            key: value + (counters[key] if counters else 0)
+            for key, value in file_counters.items()
+        }
 
         if file_count % 100 == 0:
-            print(f"Processed {file_count} files (out of 400)")
-
-        level_1 = json_file.parent.name
-        file_name = f"{neutral_blocks_dir}/{level_1}/{json_file.name}"
-
-        graph = Graph.from_json(file_name)
-
-        my_updaters = {
-            "population": updaters.Tally("population",alias="population"),
-            "R_tally": updaters.Tally("R",alias="R_tally"),
-            "D_tally": updaters.Tally("D",alias="D_tally")
-            }
-
-        # Find three initial partitions
-        for i in [1,2,3]:
-            n_found = 0
-            while n_found < 1:
-                try:
-                    init_part_i = Partition.from_random_assignment(
-                        graph=graph,
-                        n_parts=12,
-                        pop_col='population',
-                        updaters = my_updaters,
-                        epsilon = 0.00001,
-                        method = recursive_tree_part
-                    )
-                    n_found += 1
-                except Exception:
-                    pass
-            
-            assignment_i = init_part_i.assignment
-
-            for block, district in assignment_i.items():
-                graph.nodes[block][f"init_part_{i}"] = district
-
-        # Overwrite file with graph with initial partitions added
-        with open(file_name, "w") as f:
-            json.dump(json_graph.adjacency_data(graph), f)
-
-main()
\ No newline at end of file
+            print(f"Processed {file_count} files (out of 400), initial partitions so far: {format_counters(counters)}")
+
+    if counters:
+        print(f"Initial partitions: {format_counters(counters)}")
+
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
@@ -1,160 +1,268 @@
-import networkx as nx
-from gerrychain import Partition, Graph, updaters, Election
+from gerrychain import Partition, Graph
 from gerrychain.proposals import recom
 from gerrychain.tree import recursive_tree_part
 from gerrychain.constraints import contiguous
 from gerrychain.optimization import Gingleator
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from functools import partial
+import click
 import random
 import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from chain_tools.block_graphs import block_labels, build_block_graphs, write_block_graphs
+from chain_tools.election_tally import ElectionTally
+from chain_tools.initial_partitions import TreePartitioner
+from chain_tools.sampling import final_state, thinned
+from chain_tools.seeding import derive_seed
+from chain_tools.scoring import ShareUpdater, reward_partial_dist
 
 SCRIPT_FILE_PATH = os.path.abspath(__file__)
 SCRIPT_DIR = os.path.dirname(SCRIPT_FILE_PATH)
 
-def safe_reward_partial_dist(part, minority_perc_col, threshold):
-    """Gingleator score function that rewards all opportunity districts plus partial credit for
-    the next highest district below threshold.
+# (num_r_units, map_number, block_size), in the order of the original nested loops
+COMBINATIONS = [
+    (num_r_units, map_number, block_size)
+    for num_r_units in [58, 72, 86]
+    for map_number in [1, 2, 3]
+    for block_size in [2, 3, 4, 6]
+]
+
+# Building block partitions saved per combination, and the steps between them in thinned mode
+NUM_SAMPLES = 100
+THIN_EVERY = 10000
+
+def load_grid_graph(num_r_units, map_number):
+    """Loads the dual graph of one grid map."""
+    # Access dual graph for grid map
+    grid_dual_graph_file = (
+        f"{SCRIPT_DIR}/syn_unit_maps/map_.jsons/"
+        f"r_units_{num_r_units}_map_{map_number}.json"
+    )
+
+    return Graph.from_json(grid_dual_graph_file)
+
+
+def gerry_chain(grid_graph, block_size, legacy=False):
+    """
+    Draws a random initial partition of grid_graph into pieces of size block_size and returns
+    a Gingleator gerrymandering toward Democrats from it. With legacy, the initial partition
+    is drawn by the original rejection loop over recursive_tree_part rather than a
+    TreePartitioner, so that a seeded run reproduces the published building blocks.
+    """
+    pop_col = "population"
+
+    # Set updaters for use later
+    # Only what the Gingleator score reads: every other updater would go unread
+    # between the saved samples, which only need their assignment
+    my_updaters = {
+        "election": ElectionTally("election", {"D": "D", "R": "R"}, pop_col="population"),
+        "D_share": ShareUpdater("election", "D", denominator="population"),
+    }
+
+    # Find initial partition of grid map into pieces of size block_size
+    if legacy:
+        # The rejection loop the published building blocks were drawn with
+        partition_4_lst = []
+        n_found = 0
+        while n_found < 1:
+            try:
+                init_part = Partition.from_random_assignment(
+                    graph=grid_graph,
+                    n_parts=144 // block_size,
+                    pop_col="population",
+                    updaters=my_updaters,
+                    epsilon=0.00001,
+                    method=recursive_tree_part,
+                )
+                assert all(init_part.assignment.to_series().value_counts() == block_size)
+                partition_4_lst.append(init_part.assignment.to_dict())
+                n_found += 1
+            except Exception:
+                pass
+    else:
+        partitioner = TreePartitioner(grid_graph, 144 // block_size, "population", 0.00001)
+        init_part = Partition(grid_graph, partitioner.partition(), my_updaters)
+
+    # Value to be optimized toward
+    num_dem_seats = lambda p: p["election"].seats("D")
+
+    proposal = partial(
+        recom, pop_col=pop_col, pop_target=block_size, epsilon=0, node_repeats=2
+    )
+
+    return Gingleator(
+        proposal=proposal,
+        constraints=[contiguous],
+        threshold=0.5,
+        initial_state=init_part,
+        minority_perc_col="D_share",
+        score_function=reward_partial_dist
+    )
+
+
+def save_gerry_blocks(grid_graph, samples, num_r_units, map_number, block_size):
+    """Saves the building block dual graphs of the sampled partitions of one grid map."""
+    # Represent each sample's building blocks as a quotient graph of the original
+    # grid dual graph, with the blocks' units and summed votes, and save them together
+    block_graphs = build_block_graphs(grid_graph, samples, ("population", "D", "R"))
+    write_block_graphs(block_graphs, [
+        f"{SCRIPT_DIR}/syn_building_block_partitions/gerry/"
+        f"r_units_{num_r_units}_map_{map_number}_burst_length_20/block_size_{block_size}/sample_{i+1}.json"
+        for i in range(len(samples))
+    ])
+
+
+def thinned_gerry_samples(
+    grid_graph, block_size, num_samples=NUM_SAMPLES, every=THIN_EVERY, legacy=False
+):
+    """
+    Runs one chain of num_samples * every steps and returns every every-th state,
+    as the block of each unit in grid_graph.nodes order (see block_labels).
+    """
+    recom_chain = gerry_chain(grid_graph, block_size, legacy)
+    samples = []
+    for k, partition in thinned(recom_chain.short_bursts(20, round(num_samples * every / 20)), every):
+        samples.append(block_labels(partition, grid_graph.nodes))
+        print(f"collected sample! (i = {k})")
+    return samples
+
+
+def independent_gerry_sample(num_r_units, map_number, block_size, random_seed, burn_in):
+    """
+    Runs one chain of burn_in steps from its own random initial partition and returns its
+    final state, as the block of each unit in grid_graph.nodes order (see block_labels).
+    """
+    random.seed(random_seed)
+    grid_graph = load_grid_graph(num_r_units, map_number)
+    recom_chain = gerry_chain(grid_graph, block_size)
+    partition = final_state(recom_chain.short_bursts(20, round(burn_in / 20)))
+    return block_labels(partition, grid_graph.nodes)
+
 
-    As opposed to the function currently present in GerryChain, this function won't throw an
-    error if no districts are below threshold. If no such district exists, returns number of
-    opportunity districts.
+def build_gerry_blocks(num_r_units, map_number, block_size, random_seed=None):
+    """
+    Generates and saves the dual graphs of 100 gerrymandered partitions of one grid map into
+    pieces of size block_size, thinned from one long chain.
 
     Args:
-        part (Partition): GerryChain Partition object.
-        minority_perc_col (str): Column name for minority percentage.
-        threshold (float): Threshold for minority percentage.
+        num_r_units (int): Number of red units in the grid map (58, 72 or 86).
+        map_number (int): Which map with that many red units (1–3).
+        block_size (int): Number of units per building block (2, 3, 4 or 6).
+        random_seed (int, optional): Seed for Python's random module. None continues the
+            current random stream and draws the initial partition the original way, as the
+            legacy serial run does.
+    """
+    if random_seed is not None:
+        random.seed(random_seed)
+
+    grid_graph = load_grid_graph(num_r_units, map_number)
+    samples = thinned_gerry_samples(grid_graph, block_size, legacy=random_seed is None)
+    print(f"Collected {len(samples)} samples.")
+    save_gerry_blocks(grid_graph, samples, num_r_units, map_number, block_size)
+
+    return num_r_units, map_number, block_size
+
+
+def build_independent_gerry_blocks(executor, random_seed, burn_in):
     """
-    try:
-        return Gingleator.reward_partial_dist(
-            part=part, minority_perc_col=minority_perc_col, threshold=threshold
-        )
-    except ValueError:
-        return Gingleator.num_opportunity_dists(
-            part=part, minority_perc_col=minority_perc_col, threshold=threshold
-        )
+    Generates and saves the building blocks of every combination from NUM_SAMPLES independent
+    chains each, all submitted to executor at once. Chain k of a combination is seeded from
+    the combination's coordinates and k.
+    """
+    futures = {
+        executor.submit(
+            independent_gerry_sample, num_r_units, map_number, block_size,
+            derive_seed(random_seed, "gerry", num_r_units, map_number, block_size, "chain", k),
+            burn_in,
+        ): (num_r_units, map_number, block_size, k)
+        for num_r_units, map_number, block_size in COMBINATIONS
+        for k in range(NUM_SAMPLES)
+    }
+    samples = {combination: [None] * NUM_SAMPLES for combination in COMBINATIONS}
+    remaining = {combination: NUM_SAMPLES for combination in COMBINATIONS}
+    for future in as_completed(futures):
+        num_r_units, map_number, block_size, k = futures[future]
+        combination = (num_r_units, map_number, block_size)
+        samples[combination][k] = future.result()
+        remaining[combination] -= 1
+        if remaining[combination] == 0:
+            save_gerry_blocks(
+                load_grid_graph(num_r_units, map_number), samples.pop(combination), *combination
+            )
+            print(f"Saved blocks for r_units_{num_r_units}_map_{map_number}, block_size_{block_size}")
 
 
-def main():
+@click.command()
+@click.option("--random-seed", default=211, show_default=True, type=int, help="Master random seed")
+@click.option(
+    "--workers",
+    default=os.cpu_count(),
+    show_default=True,
+    type=int,
+    help="Number of worker processes",
+)
+@click.option(
+    "--legacy-serial",
+    is_flag=True,
+    help="Run the combinations one after another on one random stream seeded with --random-seed, "
+    "reproducing the published building blocks file for file with the default seed",
+)
+@click.option(
+    "--sampling",
+    default="thinned",
+    show_default=True,
+    type=click.Choice(["thinned", "independent"]),
+    help="Save every 10,000th state of one 1,000,000-step chain per combination, or the final "
+    "states of 100 independent chains",
+)
+@click.option(
+    "--burn-in",
+    default=THIN_EVERY,
+    show_default=True,
+    type=click.IntRange(min=20),
+    help="Steps per chain with --sampling independent (rounded to a multiple of 20)",
+)
+def main(random_seed, workers, legacy_serial, sampling, burn_in):
     """
     For each individual grid map, and for each building block size 2, 3, 4, and 6,
     generates dual graphs for 100 partitions of that grid map into pieces of that size.
-    Does this by by generating 1,000,000 possible partitions and saving every 10,000th sample.
+    Does this by by generating 1,000,000 possible partitions and saving every 10,000th sample,
+    or with --sampling independent by running 100 chains of --burn-in steps, each from its
+    own random initial partition, and saving the final state of each.
 
     Uses short bursts algorithm to gerrymander these building block graphs in favor of Democrats,
     i.e. maximize the number of building blocks for which over 50% of the units are Democratic.
-    """
-    random_seed_num = 211
-    random.seed(random_seed_num)
-    pop_col = "population"
 
-    # Iterate over grid map, block size
-    for num_r_units in [58, 72, 86]:
-        for map_number in [1, 2, 3]:
-            for block_size in [2, 3, 4, 6]:
+    The 36 (map, block size) combinations run in parallel, each seeded from its own coordinates
+    (see chain_tools.seeding.derive_seed), so results do not depend on the number of workers.
+    """
+    if legacy_serial:
+        if sampling != "thinned":
+            raise click.UsageError("--legacy-serial reproduces the thinned chains only")
+        random.seed(random_seed)
+        for num_r_units, map_number, block_size in COMBINATIONS:
+            build_gerry_blocks(num_r_units, map_number, block_size)
+        return
 
-                # Access dual graph for grid map
-                grid_dual_graph_file = (
-                    f"{SCRIPT_DIR}/../syn_files/syn_unit_maps/map_.jsons/"
-                    f"r_units_{num_r_units}_map_{map_number}.json"
-                )
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        if sampling == "independent":
+            build_independent_gerry_blocks(executor, random_seed, burn_in)
+            return
 
-                grid_graph = Graph.from_json(grid_dual_graph_file)
-
-                # Set updaters for use later
-                my_updaters = {
-                    "population": updaters.Tally("population"),
-                    "election": Election("election", {"D": "D", "R": "R"}),
-                    "R_tally": updaters.Tally("R", alias="R_tally"),
-                    "D_tally": updaters.Tally("D", alias="D_tally"),
-                }
-
-                # Find initial partition of grid map into pieces of size block_size
-                partition_4_lst = []
-                n_found = 0
-                while n_found < 1:
-                    try:
-                        init_part = Partition.from_random_assignment(
-                            graph=grid_graph,
-                            n_parts=144 // block_size,
-                            pop_col="population",
-                            updaters=my_updaters,
-                            epsilon=0.00001,
-                            method=recursive_tree_part,
-                        )
-                        assert all(init_part.assignment.to_series().value_counts() == block_size)
-                        partition_4_lst.append(init_part.assignment.to_dict())
-                        n_found += 1
-                    except Exception:
-                        pass
-
-                # Value to be optimized toward
-                num_dem_seats = lambda p: p["election"].seats("D")
-
-                proposal = partial(
-                    recom, pop_col=pop_col, pop_target=block_size, epsilon=0, node_repeats=2
-                )
+        futures = [
+            executor.submit(
+                build_gerry_blocks, num_r_units, map_number, block_size,
+                random_seed=derive_seed(random_seed, "gerry", num_r_units, map_number, block_size),
+            )
+            for num_r_units, map_number, block_size in COMBINATIONS
+        ]
+        for future in as_completed(futures):
+            num_r_units, map_number, block_size = future.result()
+            print(f"Saved blocks for r_units_{num_r_units}_map_{map_number}, block_size_{block_size}")
 
-                recom_chain = Gingleator(
-                    proposal=proposal,
-                    constraints=[contiguous],
-                    threshold=0.5,
-                    initial_state=init_part,
-                    total_pop_col="population",
-                    minority_pop_col="D_tally",
-                    score_function=safe_reward_partial_dist
-                )
 
-                # Save every 10,000th sample
-                samples = []
-                for i, partition in enumerate(
-                    recom_chain.short_bursts(20, round(1000000 / 20))
-                ):
-                    if (i + 1) % 10000 == 0:
-                        partition_info = partition.assignment.to_dict()
-                        samples.append(partition_info)
-                        print(f"collected sample! (i = {int((i+1) / 10000)})")
-                    else:
-                        continue
-
-                print(f"Collected {len(samples)} samples.")
-
-                # Each sample is saved as a dictionary mapping units to districts
-                # Convert these into dictionaries mapping districts to lists of units
-                for i in range(len(samples)):
-                    district_units_dict = {}
-                    for node, assign in samples[i].items():
-                        if assign not in district_units_dict:
-                            district_units_dict[assign] = set()
-                        district_units_dict[assign].add(int(node))
-
-                    # Use new dictionary to represent building blocks
-                    # as a quotient graph of the original grid dual graph
-                    subgraph = nx.quotient_graph(grid_graph, list(district_units_dict.values()))
-                    subgraph = nx.convert_node_labels_to_integers(subgraph)
-                    gerry_subgraph = Graph.from_networkx(subgraph)
-                    gerry_subgraph.nodes(data=True)
-
-                    # Save important node attribute info to building block dual graph
-                    for block, data in gerry_subgraph.nodes(data=True):
-                        units = data["graph"].nodes
-                        gerry_subgraph.nodes[block]["units"] = str(units)
-                        gerry_subgraph.nodes[block]["population"] = block_size
-                        gerry_subgraph.nodes[block]["id"] = '"' + str(block) + '"'
-
-                        d_votes = 0
-                        r_votes = 0
-                        for unit in units:
-                            d_votes = d_votes + grid_graph.nodes[unit]['D']
-                            r_votes = r_votes + grid_graph.nodes[unit]['R']
-                        gerry_subgraph.nodes[block]['D'] = d_votes
-                        gerry_subgraph.nodes[block]['R'] = r_votes
-
-                    # Save building block file
-                    save_to_file = (
-                        f"{SCRIPT_DIR}/../syn_files/syn_building_block_partitions/gerry/"
-                        f"r_units_{num_r_units}_map_{map_number}_burst_length_20/block_size_{block_size}/sample_{i+1}.json"
-                    )
-                    os.makedirs(os.path.dirname(save_to_file), exist_ok=True)
-                    gerry_subgraph.to_json(save_to_file)
-
-main()
\ No newline at end of file
+if __name__ == "__main__":
+    main()
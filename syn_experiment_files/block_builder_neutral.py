@@ -1,42 +1,58 @@
-import networkx as nx
 from gerrychain import Partition, Graph, MarkovChain, updaters, accept
 from gerrychain.proposals import recom
 from gerrychain.tree import recursive_tree_part
 from gerrychain.constraints import contiguous
 from gerrychain.accept import always_accept
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from functools import partial
+import click
 import random
 import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from chain_tools.block_graphs import block_labels, build_block_graphs, write_block_graphs
+from chain_tools.initial_partitions import TreePartitioner
+from chain_tools.sampling import final_state, thinned
+from chain_tools.seeding import derive_seed
 
 SCRIPT_FILE_PATH = os.path.abspath(__file__)
 SCRIPT_DIR = os.path.dirname(SCRIPT_FILE_PATH)
 
-def main():
-    """
-    For each building block size 2, 3, 4, and 6, creates 100 partitions of a 12x12 grid into pieces of that size.
-    Does this by by generating 1,000,000 possible partitions and saving every 10,000th sample.
-    """
+BLOCK_SIZES = [2, 3, 4, 6]
 
-    random_seed_num = 346
-    random.seed(random_seed_num)
-    pop_col = "population"
+# Building block partitions saved per block size, and the steps between them in thinned mode
+NUM_SAMPLES = 100
+THIN_EVERY = 10000
 
-    # Iterate over block sizes
-    for block_size in [2, 3, 4, 6]:
+def load_grid_graph():
+    """Loads the dual graph of the 12x12 grid."""
+    # Load 12x12 grid
+    grid_dual_graph_file = (
+        f"{SCRIPT_DIR}/syn_unit_maps/"
+        f"12x12_grid_no_votes.json"
+    )
+    return Graph.from_json(grid_dual_graph_file)
 
-        # Load 12x12 grid
-        grid_dual_graph_file = (
-            f"{SCRIPT_DIR}/../syn_files/syn_unit_maps/"
-            f"12x12_grid_no_votes.json"
-        )
-        grid_graph = Graph.from_json(grid_dual_graph_file)        
 
-        # Set updaters for use later
-        my_updaters = {
-            "population": updaters.Tally("population")
-        }
+def neutral_chain(grid_graph, block_size, total_steps, legacy=False):
+    """
+    Draws a random initial partition of grid_graph into pieces of size block_size and returns
+    a ReCom chain of total_steps steps from it. With legacy, the initial partition is drawn by
+    the original rejection loop over recursive_tree_part rather than a TreePartitioner, so that
+    a seeded run reproduces the published building blocks.
+    """
+    pop_col = "population"
 
-        # Find initial partition of grid map into pieces of size block_size
+    # Set updaters for use later
+    my_updaters = {
+        "population": updaters.Tally("population")
+    }
+
+    # Find initial partition of grid map into pieces of size block_size
+    if legacy:
+        # The rejection loop the published building blocks were drawn with
         partition_4_lst = []
         n_found = 0
         while n_found < 1:
@@ -54,60 +70,171 @@ def main():
                 n_found += 1
             except Exception:
                 pass
+    else:
+        partitioner = TreePartitioner(grid_graph, 144 // block_size, "population", 0.00001)
+        init_part = Partition(grid_graph, partitioner.partition(), my_updaters)
+
+    proposal = partial(
+        recom, pop_col=pop_col, pop_target=block_size, epsilon=0, node_repeats=2
+    )
 
-        proposal = partial(
-            recom, pop_col=pop_col, pop_target=block_size, epsilon=0, node_repeats=2
-        )
-
-        recom_chain = MarkovChain(
-            proposal=proposal,
-            constraints=[contiguous],
-            initial_state=init_part,
-            accept=always_accept,
-            total_steps=1000000
-        )
-
-        # Save every 10,000th sample
-        samples = []
-        for i, partition in enumerate(recom_chain):
-            if (i+1) % 10000 == 0:
-                partition_info = partition.assignment.to_dict()
-                samples.append(partition_info)
-                print(f"collected sample! (i = {int((i+1) / 10000)})")
-            else:
-                continue
-            
-        print(f"Collected {len(samples)} samples.")
-
-        # Each sample is saved as a dictionary mapping units to districts
-        # Convert these into dictionaries mapping districts to lists of units
-        for i in range(len(samples)):
-            district_units_dict = {}
-            for node, assign in samples[i].items():
-                if assign not in district_units_dict:
-                    district_units_dict[assign] = set()
-                district_units_dict[assign].add(int(node))
-
-            # Use new dictionary to represent building blocks
-            # as a quotient graph of 12x12 grid
-            subgraph = nx.quotient_graph(grid_graph, list(district_units_dict.values()))
-            subgraph = nx.convert_node_labels_to_integers(subgraph)
-            neutral_subgraph = Graph.from_networkx(subgraph)
-            neutral_subgraph.nodes(data=True)
-
-            # Save important node attribute info to building block dual graph
-            for node, data in neutral_subgraph.nodes(data=True):
-                units = data["graph"].nodes
-                neutral_subgraph.nodes[node]["units"] = str(units)
-                neutral_subgraph.nodes[node]["population"] = block_size
-                neutral_subgraph.nodes[node]["id"] = '"' + str(node) + '"'
-
-            # Save building block file
-            save_to_file = (
-                f"{SCRIPT_DIR}/../syn_files/syn_building_block_partitions/neutral/"
-                f"/block_size_{block_size}/sample_{i+1}.json"
+    return MarkovChain(
+        proposal=proposal,
+        constraints=[contiguous],
+        initial_state=init_part,
+        accept=always_accept,
+        total_steps=total_steps
+    )
+
+
+def save_neutral_blocks(grid_graph, samples, block_size):
+    """Saves the building block dual graphs of the sampled partitions of the grid."""
+    # Represent each sample's building blocks as a quotient graph of 12x12 grid,
+    # with the blocks' units and population, and save them together
+    block_graphs = build_block_graphs(grid_graph, samples, ("population",))
+    write_block_graphs(block_graphs, [
+        f"{SCRIPT_DIR}/syn_building_block_partitions/neutral/"
+        f"block_size_{block_size}/sample_{i+1}.json"
+        for i in range(len(samples))
+    ])
+
+
+def thinned_neutral_samples(
+    grid_graph, block_size, num_samples=NUM_SAMPLES, every=THIN_EVERY, legacy=False
+):
+    """
+    Runs one chain of num_samples * every steps and returns every every-th state,
+    as the block of each unit in grid_graph.nodes order (see block_labels).
+    """
+    recom_chain = neutral_chain(grid_graph, block_size, num_samples * every, legacy)
+    samples = []
+    for k, partition in thinned(recom_chain, every):
+        samples.append(block_labels(partition, grid_graph.nodes))
+        print(f"collected sample! (i = {k})")
+    return samples
+
+
+def independent_neutral_sample(block_size, random_seed, burn_in):
+    """
+    Runs one chain of burn_in steps from its own random initial partition and returns its
+    final state, as the block of each unit in grid_graph.nodes order (see block_labels).
+    """
+    random.seed(random_seed)
+    grid_graph = load_grid_graph()
+    partition = final_state(neutral_chain(grid_graph, block_size, burn_in))
+    return block_labels(partition, grid_graph.nodes)
+
+
+def build_neutral_blocks(block_size, random_seed=None):
+    """
+    Generates and saves the dual graphs of 100 partitions of a 12x12 grid into pieces of
+    size block_size, thinned from one long chain.
+
+    Args:
+        block_size (int): Number of units per building block (2, 3, 4 or 6).
+        random_seed (int, optional): Seed for Python's random module. None continues the
+            current random stream and draws the initial partition the original way, as the
+            legacy serial run does.
+    """
+    if random_seed is not None:
+        random.seed(random_seed)
+
+    grid_graph = load_grid_graph()
+    samples = thinned_neutral_samples(grid_graph, block_size, legacy=random_seed is None)
+    print(f"Collected {len(samples)} samples.")
+    save_neutral_blocks(grid_graph, samples, block_size)
+
+    return block_size
+
+
+def build_independent_neutral_blocks(executor, random_seed, burn_in):
+    """
+    Generates and saves the building blocks of every block size from NUM_SAMPLES independent
+    chains each, all submitted to executor at once. Chain k of a block size is seeded from the
+    block size and k.
+    """
+    futures = {
+        executor.submit(
+            independent_neutral_sample, block_size,
+            derive_seed(random_seed, "neutral", block_size, "chain", k), burn_in,
+        ): (block_size, k)
+        for block_size in BLOCK_SIZES
+        for k in range(NUM_SAMPLES)
+    }
+    samples = {block_size: [None] * NUM_SAMPLES for block_size in BLOCK_SIZES}
+    remaining = {block_size: NUM_SAMPLES for block_size in BLOCK_SIZES}
+    for future in as_completed(futures):
+        block_size, k = futures[future]
+        samples[block_size][k] = future.result()
+        remaining[block_size] -= 1
+        if remaining[block_size] == 0:
+            save_neutral_blocks(load_grid_graph(), samples.pop(block_size), block_size)
+            print(f"Saved blocks for block_size_{block_size}")
+
+
+@click.command()
+@click.option("--random-seed", default=346, show_default=True, type=int, help="Master random seed")
+@click.option(
+    "--workers",
+    default=os.cpu_count(),
+    show_default=True,
+    type=int,
+    help="Number of worker processes",
+)
+@click.option(
+    "--legacy-serial",
+    is_flag=True,
+    help="Run the block sizes one after another on one random stream seeded with --random-seed, "
+    "reproducing the published building blocks file for file with the default seed",
+)
+@click.option(
+    "--sampling",
+    default="thinned",
+    show_default=True,
+    type=click.Choice(["thinned", "independent"]),
+    help="Save every 10,000th state of one 1,000,000-step chain per block size, or the final "
+    "states of 100 independent chains",
+)
+@click.option(
+    "--burn-in",
+    default=THIN_EVERY,
+    show_default=True,
+    type=click.IntRange(min=1),
+    help="Steps per chain with --sampling independent",
+)
+def main(random_seed, workers, legacy_serial, sampling, burn_in):
+    """
+    For each building block size 2, 3, 4, and 6, creates 100 partitions of a 12x12 grid into pieces of that size.
+    Does this by by generating 1,000,000 possible partitions and saving every 10,000th sample,
+    or with --sampling independent by running 100 chains of --burn-in steps, each from its
+    own random initial partition, and saving the final state of each.
+
+    The block sizes run in parallel, each seeded from its own size (see
+    chain_tools.seeding.derive_seed), so results do not depend on the number of workers.
+    """
+    if legacy_serial:
+        if sampling != "thinned":
+            raise click.UsageError("--legacy-serial reproduces the thinned chains only")
+        random.seed(random_seed)
+        for block_size in BLOCK_SIZES:
+            build_neutral_blocks(block_size)
+        return
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        if sampling == "independent":
+            build_independent_neutral_blocks(executor, random_seed, burn_in)
+            return
+
+        futures = [
+            executor.submit(
+                build_neutral_blocks, block_size,
+                random_seed=derive_seed(random_seed, "neutral", block_size),
             )
-            os.makedirs(os.path.dirname(save_to_file), exist_ok=True)
-            neutral_subgraph.to_json(save_to_file)
+            for block_size in BLOCK_SIZES
+        ]
+        for future in as_completed(futures):
+            print(f"Saved blocks for block_size_{future.result()}")
+
 
-main()
\ No newline at end of file
+if __name__ == "__main__":
+    main()
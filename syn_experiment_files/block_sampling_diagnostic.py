@@ -0,0 +1,155 @@
+import click
+import json
+import os
+import random
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import block_builder_gerry
+import block_builder_neutral
+from chain_tools.sampling import autocorrelation
+from chain_tools.seeding import derive_seed
+
+
+def d_majority_counts(samples, vote_graph):
+    """Number of building blocks with more D than R units, for each sampled partition.
+
+    Args:
+        samples (list): Block of each unit, in vote_graph.nodes order, per sample.
+        vote_graph (Graph): Grid map holding the D and R units.
+    """
+    samples = np.asarray(samples)
+    d_votes = np.array([vote_graph.nodes[unit]["D"] for unit in vote_graph.nodes])
+    r_votes = np.array([vote_graph.nodes[unit]["R"] for unit in vote_graph.nodes])
+    counts = []
+    for sample in samples:
+        _, blocks = np.unique(sample, return_inverse=True)
+        margin = np.bincount(blocks, weights=d_votes) - np.bincount(blocks, weights=r_votes)
+        counts.append(int((margin > 0).sum()))
+    return np.array(counts)
+
+
+def summarize(counts, max_lag):
+    """Mean, spread, autocorrelations and effective sample size of a series of counts.
+
+    The effective sample size sums the autocorrelations up to the first one that is not
+    positive (Geyer's initial positive sequence, truncated at max_lag).
+    """
+    rho = autocorrelation(counts, max_lag)
+    first_non_positive = np.flatnonzero(rho <= 0)
+    positive = rho[: first_non_positive[0]] if len(first_non_positive) else rho
+    return {
+        "mean": float(np.mean(counts)),
+        "std": float(np.std(counts)),
+        "autocorrelation": rho.tolist(),
+        "effective_sample_size": float(len(counts) / (1 + 2 * positive.sum())),
+    }
+
+
+@click.command()
+@click.option("--builder", default="gerry", show_default=True, type=click.Choice(["gerry", "neutral"]))
+@click.option("--num-r-units", default=72, show_default=True, type=click.Choice([58, 72, 86]))
+@click.option("--map-number", default=1, show_default=True, type=click.Choice([1, 2, 3]))
+@click.option("--block-size", default=4, show_default=True, type=click.Choice([2, 3, 4, 6]))
+@click.option("--samples", default=100, show_default=True, type=int, help="Samples per mode")
+@click.option(
+    "--thin-every",
+    default=10000,
+    show_default=True,
+    type=int,
+    help="Steps between saved samples of the thinned chain",
+)
+@click.option(
+    "--burn-in",
+    default=10000,
+    show_default=True,
+    type=int,
+    help="Steps per independent chain",
+)
+@click.option("--max-lag", default=10, show_default=True, type=int)
+@click.option("--random-seed", default=1, show_default=True, type=int)
+@click.option(
+    "--workers",
+    default=os.cpu_count(),
+    show_default=True,
+    type=int,
+    help="Number of worker processes for the independent chains",
+)
+@click.option("--output", default=None, help="Where to save the summaries as JSON")
+def main(
+    builder, num_r_units, map_number, block_size, samples, thin_every, burn_in, max_lag,
+    random_seed, workers, output
+):
+    """Compares the two sampling modes of the block builders on one grid map and block size.
+
+    Draws the building block partitions both ways, thinned from one long chain and as the final
+    states of independent chains, and reports for each the autocorrelation of the number of
+    blocks with a D majority from one sample to the next. The neutral builder partitions the
+    blank grid, so its blocks are scored on the vote map given by --num-r-units and
+    --map-number.
+    """
+    vote_graph = block_builder_gerry.load_grid_graph(num_r_units, map_number)
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        if builder == "gerry":
+            independent = [
+                executor.submit(
+                    block_builder_gerry.independent_gerry_sample, num_r_units, map_number,
+                    block_size, derive_seed(random_seed, "independent", k), burn_in,
+                )
+                for k in range(samples)
+            ]
+            random.seed(derive_seed(random_seed, "thinned"))
+            thinned = block_builder_gerry.thinned_gerry_samples(
+                vote_graph, block_size, samples, thin_every
+            )
+        else:
+            independent = [
+                executor.submit(
+                    block_builder_neutral.independent_neutral_sample, block_size,
+                    derive_seed(random_seed, "independent", k), burn_in,
+                )
+                for k in range(samples)
+            ]
+            random.seed(derive_seed(random_seed, "thinned"))
+            thinned = block_builder_neutral.thinned_neutral_samples(
+                block_builder_neutral.load_grid_graph(), block_size, samples, thin_every
+            )
+        independent = [future.result() for future in independent]
+
+    summaries = {
+        "thinned": summarize(d_majority_counts(thinned, vote_graph), max_lag),
+        "independent": summarize(d_majority_counts(independent, vote_graph), max_lag),
+    }
+    for mode, summary in summaries.items():
+        shown = summary["autocorrelation"][:5]
+        lags = ", ".join(f"{rho:.2f}" for rho in shown)
+        print(
+            f"{mode:>11}: D-majority blocks {summary['mean']:.2f} ± {summary['std']:.2f}, "
+            f"autocorrelation at lags 1–{len(shown)} [{lags}], "
+            f"effective sample size {summary['effective_sample_size']:.1f} of {samples}"
+        )
+
+    if output is not None:
+        with open(output, "w") as f:
+            json.dump(
+                {
+                    "builder": builder,
+                    "num_r_units": num_r_units,
+                    "map_number": map_number,
+                    "block_size": block_size,
+                    "thin_every": thin_every,
+                    "burn_in": burn_in,
+                    "summaries": summaries,
+                },
+                f,
+                indent=2,
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,36 @@
+import click
+import glob
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from chain_tools.graph_cache import compile_graph, is_fresh
+
+SCRIPT_FILE_PATH = os.path.abspath(__file__)
+SCRIPT_DIR = os.path.dirname(SCRIPT_FILE_PATH)
+
+@click.command()
+@click.option(
+    "--force",
+    is_flag=True,
+    help="Recompile graphs whose binary form is already up to date",
+)
+def main(force):
+    """Compiles the synthetic unit maps and building block graphs into the binary form that the
+    experiment runners load instead of the JSON when it is up to date.
+    """
+    json_files = sorted(
+        glob.glob(f"{SCRIPT_DIR}/syn_unit_maps/**/*.json", recursive=True)
+        + glob.glob(f"{SCRIPT_DIR}/syn_building_block_partitions/**/sample_*.json", recursive=True)
+    )
+    compiled = 0
+    for json_file in json_files:
+        if force or not is_fresh(json_file):
+            compile_graph(json_file)
+            compiled += 1
+    print(f"Compiled {compiled} of {len(json_files)} graphs")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,42 @@
+import click
+import glob
+import json
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from chain_tools.batch import atomic_write_json
+from chain_tools.block_graphs import encode_units
+
+SCRIPT_FILE_PATH = os.path.abspath(__file__)
+SCRIPT_DIR = os.path.dirname(SCRIPT_FILE_PATH)
+
+@click.command()
+@click.option(
+    "--blocks-dir",
+    default=f"{SCRIPT_DIR}/syn_building_block_partitions",
+    show_default=True,
+    help="Directory searched recursively for building block graphs (sample_*.json)",
+)
+def main(blocks_dir):
+    """Converts building block graphs that list each block's units as a string to the compact
+    membership that the block builders now write: the graph attributes "unit_ids" and
+    "unit_blocks". Graphs already converted are left alone, and each file is replaced in one
+    atomic rename, so the conversion can be rerun after an interruption.
+
+    Rerun compile_block_graphs_cli.py afterwards to bring the binary forms up to date.
+    """
+    json_files = sorted(glob.glob(f"{blocks_dir}/**/sample_*.json", recursive=True))
+    converted = 0
+    for json_file in json_files:
+        with open(json_file) as f:
+            data = json.load(f)
+        if encode_units(data):
+            atomic_write_json(data, json_file)
+            converted += 1
+    print(f"Converted {converted} of {len(json_files)} building block graphs")
+
+
+if __name__ == "__main__":
+    main()
@@ -14,10 +14,10 @@ for block_set in "gerry" "neutral"; do
         --nodes=1 \
         --ntasks=1 \
         --partition=duchin \
-        --cpus-per-task=2 \
+        --cpus-per-task=16 \
         --mem=2G \
         --time=2-00:00:00 \
         --error="init_parts_${block_set}.log" \
         --output="init_parts_${block_set}.out" \
-        --wrap="PYTHONHASHSEED=0 uv run $SCRIPT"
+        --wrap="PYTHONHASHSEED=0 uv run $SCRIPT --workers 16"
 done
\ No newline at end of file
@@ -0,0 +1,10 @@
+#!/usr/bin/env bash
+
+echo "started"
+
+SCRIPT_DIR="$(cd "$(dirname "${BASH_SOURCE[0]}")" && pwd)"
+TOP_DIR="$(realpath "${SCRIPT_DIR}/..")"
+
+# Same grid as run_syn_exps.sh, split into one task per building block sample and run on all cores.
+# Pass extra options (e.g. --experiment-type GG --block-size 4 --workers 32) to run a subset.
+PYTHONHASHSEED=0 uv run "${TOP_DIR}/syn_sweep.py" --total-steps 20000 "$@"
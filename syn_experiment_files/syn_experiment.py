@@ -0,0 +1,368 @@
+from gerrychain import MarkovChain, Partition
+from gerrychain.proposals import recom
+from gerrychain.accept import always_accept
+from gerrychain.optimization import Gingleator
+from functools import partial
+import random
+import os
+import sys
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from chain_tools.assignment_export import AssignmentStreamWriter
+from chain_tools.batch import atomic_write_json
+from chain_tools.bitset_recom import (
+    BitsetGraph, BitsetPartition, PopcountTally, bitset_recom, check_gerrychain_version,
+    unit_bitsets
+)
+from chain_tools.block_graphs import block_membership, block_totals
+from chain_tools.checkpoint import (
+    Checkpointer, resumable_markov_chain, resumable_samples, resumable_short_bursts
+)
+from chain_tools.columnar_stats import open_stats_sink
+from chain_tools.contiguity import ContiguityPolicy
+from chain_tools.district_catalog import CatalogTooLarge, DistrictCatalog
+from chain_tools.election_tally import ElectionTally
+from chain_tools.graph_cache import cached, load_dual_graph
+from chain_tools.parallel_bursts import parallel_short_bursts
+from chain_tools.profiling import ChainProfiler
+from chain_tools.scoring import ShareUpdater, reward_partial_dist
+from chain_tools.seeding import derive_seed
+
+SCRIPT_FILE_PATH = os.path.abspath(__file__)
+SCRIPT_DIR = os.path.dirname(SCRIPT_FILE_PATH)
+
+# Blank 12x12 grid that every unit map and neutral building block is drawn on
+GRID_PATH = f"{SCRIPT_DIR}/syn_unit_maps/12x12_grid_no_votes.json"
+
+# Each experiment type is a building block source ("gerry" or "neutral") and a chain on the
+# blocks: a neutral ReCom chain (party None), or short bursts of a Gingleator gerrymandering
+# for party
+EXPERIMENTS = {
+    # Both the building blocks and resulting map are gerrymandered
+    "GG": {"blocks": "gerry", "party": "D", "burst_length": 20},
+    # The building blocks are not gerrymandered but the resulting map is
+    "NG": {"blocks": "neutral", "party": "D", "burst_length": 5},
+    # The building blocks are gerrymandered but the resulting map is not
+    "GN": {"blocks": "gerry", "party": None, "burst_length": None},
+    # Neither the building blocks nor the resulting maps are gerrymandered
+    "NN": {"blocks": "neutral", "party": None, "burst_length": None},
+    # As GG, but the resulting map is gerrymandered for Republicans
+    "GGopp": {"blocks": "gerry", "party": "R", "burst_length": 20},
+}
+
+# Implementations of the chain: GerryChain's, or chain_tools.bitset_recom, which proposes the
+# same plans from the same seed with the districts as bitsets
+ENGINES = ["gerrychain", "bitset"]
+
+# Ways to replace the neutral chain with the exact set of plans (see block_catalog): draw the
+# plans uniformly from it, or count them
+EXACT_MODES = ["sample", "count"]
+
+
+def block_graph_path(blocks, num_r_units, map_number, block_size, sample):
+    """Path of one building block sample, gerrymandered on the given map or neutral."""
+    if blocks == "gerry":
+        return (
+            f"{SCRIPT_DIR}/syn_building_block_partitions/gerry/"
+            f"r_units_{num_r_units}_map_{map_number}_burst_length_20/block_size_{block_size}/sample_{sample}.json"
+        )
+    return (
+        f"{SCRIPT_DIR}/syn_building_block_partitions/neutral/"
+        f"block_size_{block_size}/sample_{sample}.json"
+    )
+
+
+def unit_map_path(num_r_units, map_number):
+    """Path of one of the grid maps with votes."""
+    return f"{SCRIPT_DIR}/syn_unit_maps/map_.jsons/r_units_{num_r_units}_map_{map_number}.json"
+
+
+def map_votes(unit_map, grid):
+    """D and R votes of the units of a map, as arrays in the order of the grid's units."""
+    unit_graph = cached(load_dual_graph, unit_map)
+    units = list(cached(load_dual_graph, grid).nodes)
+    return {party: np.array([unit_graph.nodes[unit][party] for unit in units]) for party in ("D", "R")}
+
+
+def grid_membership(block_data, grid):
+    """Block of each of the grid's units in a building block graph (see block_membership)."""
+    return block_membership(cached(load_dual_graph, block_data), list(cached(load_dual_graph, grid).nodes))
+
+
+def neutral_block_graph(block_data, unit_map):
+    """A copy of a neutral building block graph with each block's D and R votes on a map.
+
+    Neutral building blocks are drawn on the blank grid, so they only get votes once a map is
+    chosen. The block graph, its membership and the map's votes are each computed once per
+    process, which leaves one product of the membership with each party's votes per map.
+    """
+    block_graph = cached(load_dual_graph, block_data).copy()
+    membership = cached(grid_membership, block_data, GRID_PATH)
+    for party, unit_votes in cached(map_votes, unit_map, GRID_PATH).items():
+        totals = block_totals(membership, unit_votes, len(block_graph)).tolist()
+        for block, total in zip(block_graph.nodes, totals):
+            block_graph.nodes[block][party] = total
+    return block_graph
+
+
+def block_catalog(block_data):
+    """District catalog of a building block sample with its plans counted, or None when there
+    are too many districts or plans to enumerate (see chain_tools.district_catalog).
+
+    With block size 6 a district is 2 adjacent blocks and with block size 4 a connected triple,
+    and both have few enough plans; block size 2 falls back to the chain.
+    """
+    try:
+        catalog = DistrictCatalog(cached(load_dual_graph, block_data), 12, "population", pop_target=12)
+        catalog.count()
+    except CatalogTooLarge:
+        return None
+    return catalog
+
+
+def count_plans(catalog, block_graph):
+    """Number of plans of a catalog, overall and by the seats each party wins."""
+    votes = {party: catalog.totals(block_graph, party) for party in ("D", "R")}
+    return {
+        "plans": catalog.count(),
+        "districts": len(catalog),
+        "seats": {
+            "D": catalog.distribution(votes["D"] > votes["R"]),
+            "R": catalog.distribution(votes["R"] > votes["D"]),
+        },
+    }
+
+
+def run_experiment(
+    experiment_type, num_r_units, map_number, block_size, init_part, random_seed, total_steps,
+    stats_format="jsonl", samples=range(1, 101), seed_per_sample=False, checkpoint_every=None,
+    resume=False, parallel_bursts=None, profile_every=None, engine="gerrychain", exact=None,
+    contiguity="full", summary=False
+):
+    """Run one experiment type on the building block samples of one map and block size.
+
+    The updaters and proposal are set up once for all samples, and graphs are loaded through
+    an in-memory cache (see chain_tools.graph_cache.cached), so an invocation in a process that
+    has run others, such as a worker of syn_sweep.py, does not parse the same files again.
+
+    Args:
+        experiment_type (str): Key of EXPERIMENTS, e.g. "GG" or "NN".
+        num_r_units (int): Number of Republican units in underlying map (e.g., 58, 72, 86).
+        map_number (int): Map number to use (1-9).
+        block_size (int): Size of building blocks (e.g., 2, 3, 4, 6).
+        init_part (int): Number of initial district partition to use for Markov chain (1–3)
+        random_seed (int): Random seed for reproducibility.
+        total_steps (int): Total number of steps for each chain.
+        stats_format (str): Format of the per-step updater output, "jsonl" or "columnar", or
+            "none" to write none and keep only the summaries, which requires ``summary``.
+        samples (Iterable[int]): Building block samples to run (1–100). Defaults to all of them.
+        seed_per_sample (bool): If True, reseed before each sample with a seed derived from
+            random_seed and the sample's coordinates, so that a sample's chain does not depend on
+            which other samples ran before it in the same process.
+        checkpoint_every (int, optional): Number of steps between checkpoints; None disables
+            checkpointing.
+        resume (bool): Whether to resume from the checkpoint left by an interrupted run.
+        parallel_bursts (int, optional): If given, run this many independent bursts per round on
+            as many worker processes (see chain_tools.parallel_bursts) instead of one at a time.
+            Only for the gerrymandering chains.
+        profile_every (int, optional): If given, time the stages of the chain loop and write
+            their histograms to a ``_metrics.jsonl`` file next to the updater output every
+            this many steps (see chain_tools.profiling).
+        engine (str): "gerrychain", or "bitset" to run the chain on
+            chain_tools.bitset_recom, which gives the same output several times faster.
+        exact (str, optional): For the neutral experiments, "sample" to draw the total_steps
+            plans independently and uniformly from all plans of each sample instead of running
+            the chain, or "count" to write the number of plans, overall and by seats won, to
+            ``exact_counts.json`` in the sample's output_stats directory. Samples with too many
+            plans to enumerate (see block_catalog) run the chain instead.
+        contiguity (str): How the chain checks that districts stay connected: "full",
+            "changed-districts-only" or "audit-every-N" (see chain_tools.contiguity).
+        summary (bool): Whether to also keep histograms of the seats won and of the district
+            vote shares, written to a ``.summary.json`` file next to the updater output at every
+            checkpoint and at the end (see chain_tools.ensemble_summary.SummaryWriter).
+    """
+    experiment = EXPERIMENTS[experiment_type]
+    party = experiment["party"]
+    if parallel_bursts is not None and party is None:
+        raise ValueError(f"parallel_bursts does not apply to {experiment_type}, which runs no short bursts")
+    if exact is not None and party is not None:
+        raise ValueError(f"exact does not apply to {experiment_type}, which runs short bursts")
+    if exact is not None and exact not in EXACT_MODES:
+        raise ValueError(f"Unknown exact mode {exact!r}; expected one of {EXACT_MODES}")
+    if engine not in ENGINES:
+        raise ValueError(f"Unknown engine {engine!r}; expected one of {ENGINES}")
+    if engine == "bitset":
+        check_gerrychain_version()
+
+    # NOTE: Set random seed for reproducibility
+    random.seed(random_seed)
+    pop_col = "population"
+
+    # Only what the output records, the proposal and the score function read; updaters are
+    # evaluated lazily, per partition, so the same ones serve every sample
+    my_updaters = {
+        "election": ElectionTally("election", {"D": "D", "R": "R"}, pop_col="population"),
+    }
+    if party is not None:
+        my_updaters[f"{party}_share"] = ShareUpdater("election", party, denominator="population")
+
+    # 144 nodes and 12 districts, so pop_target is 12
+    base_proposal = partial(
+        bitset_recom if engine == "bitset" else recom,
+        pop_col=pop_col, pop_target=12, epsilon=0, node_repeats=2
+    )
+    constraints = [ContiguityPolicy(contiguity)]
+
+    run_name = (
+        f"{experiment_type}/r_units_{num_r_units}_map_{map_number}/block_size_{block_size}"
+    )
+    file_stem = f"init_part_{init_part}_random_seed_{random_seed}_burst_length_20_steps_{total_steps}"
+
+    # One checkpoint covers the whole invocation, i.e. all of its samples
+    checkpointer = Checkpointer(
+        f"{SCRIPT_DIR}/../output_ensembles/{run_name}/{file_stem}_checkpoint.pkl",
+        every=checkpoint_every,
+        resume=resume,
+    )
+
+    for sample in checkpointer.remaining(samples, "sample"):
+        sample_seed = derive_seed(
+            random_seed, experiment_type, num_r_units, map_number, block_size, init_part, sample
+        )
+        if seed_per_sample:
+            random.seed(sample_seed)
+
+        save_assignment_results_to = (
+            f"{SCRIPT_DIR}/../output_ensembles/{run_name}/sample_{sample}/{file_stem}_assignment.ben"
+        )
+        save_updaters_results_to = (
+            f"{SCRIPT_DIR}/../output_stats/{run_name}/sample_{sample}/{file_stem}_updaters.jsonl"
+        )
+        os.makedirs(os.path.dirname(save_assignment_results_to), exist_ok=True)
+        os.makedirs(os.path.dirname(save_updaters_results_to), exist_ok=True)
+
+        block_data = block_graph_path(experiment["blocks"], num_r_units, map_number, block_size, sample)
+        unit_map = unit_map_path(num_r_units, map_number)
+        if experiment["blocks"] == "neutral":
+            # Neutral blocks take their votes from the underlying map
+            block_graph = cached(neutral_block_graph, block_data, unit_map)
+        else:
+            block_graph = cached(load_dual_graph, block_data)
+
+        if engine == "bitset":
+            # Votes are counted unit by unit, so the tally needs this sample's blocks
+            node_units, party_units = unit_bitsets(
+                block_graph, cached(grid_membership, block_data, GRID_PATH),
+                cached(map_votes, unit_map, GRID_PATH), pop_col
+            )
+            initial_partition = BitsetPartition(
+                BitsetGraph(block_graph), assignment=f"init_part_{init_part}",
+                updaters={**my_updaters, "election": PopcountTally("election", node_units, party_units)},
+            )
+        else:
+            initial_partition = Partition(
+                block_graph, assignment=f"init_part_{init_part}", updaters=my_updaters
+            )
+
+        # Not cached: the memoized counts of a catalog can take tens of MB, and are only needed
+        # for this sample
+        catalog = block_catalog(block_data) if exact is not None else None
+        if exact is not None and catalog is None:
+            print(f"{block_data} has too many plans to enumerate; running the chain instead")
+        if exact == "count" and catalog is not None:
+            atomic_write_json(
+                count_plans(catalog, block_graph),
+                f"{os.path.dirname(save_updaters_results_to)}/exact_counts.json",
+            )
+            continue
+
+        # Opt-in per-stage timings, written next to the updater output
+        profiler = ChainProfiler(
+            save_updaters_results_to.replace("_updaters.jsonl", "_metrics.jsonl") if profile_every else None,
+            every=profile_every,
+        )
+        proposal = profiler.instrument_proposal(base_proposal)
+
+        if party is None:
+            recom_chain = MarkovChain(
+                proposal=proposal,
+                constraints=constraints,
+                initial_state=initial_partition,
+                accept=always_accept,
+                total_steps=total_steps
+            )
+        else:
+            # Gingleator score function should return number of districts where over 50% of the
+            # votes go to gerrymandered party + percentage of that party in district where it
+            # gets the highest vote share under 50%
+            recom_chain = Gingleator(
+                proposal=proposal,
+                constraints=constraints,
+                threshold=0.5,
+                initial_state=initial_partition,
+                minority_perc_col=f"{party}_share",
+                score_function=profiler.wrap("score", reward_partial_dist)
+            )
+
+        # Restores the random state and chain position if resuming this sample
+        checkpointer.begin(sample=sample)
+
+        with (
+            AssignmentStreamWriter(
+                save_assignment_results_to, block_graph,
+                resume_position=checkpointer.output_position("assignment")
+            ) as assignment_writer,
+            open_stats_sink(
+                save_updaters_results_to, stats_format, initial_partition.parts,
+                resume_position=checkpointer.output_position("updaters"), summary=summary
+            ) as updater_output_file,
+            profiler,
+        ):
+            checkpointer.track(assignment=assignment_writer, updaters=updater_output_file)
+            profiler.start(first_step=checkpointer.steps_done)
+
+            burst_length = experiment["burst_length"]
+            if catalog is not None:
+                plans = resumable_samples(catalog, initial_partition, total_steps, checkpointer)
+            elif party is None:
+                plans = resumable_markov_chain(recom_chain, checkpointer)
+            elif parallel_bursts is None:
+                plans = resumable_short_bursts(
+                    recom_chain, burst_length, round(total_steps / burst_length), checkpointer
+                )
+            else:
+                plans = parallel_short_bursts(
+                    recom_chain, burst_length, round(total_steps / (burst_length * parallel_bursts)),
+                    parallel_bursts, sample_seed, checkpointer
+                )
+            for i, plan in enumerate(plans, start=checkpointer.steps_done):
+
+                assert (
+                    plan is not None
+                ), "Something went terribly wrong. There is no output partition."
+
+                with profiler.timed("ben_write"):
+                    assignment_writer.write(plan)
+
+                # Per-district values are arrays ordered like the sorted districts
+                with profiler.timed("updaters"):
+                    election = plan["election"]
+
+                    record = {
+                        "step": i,
+                        "population": election.population,
+                        "Seats won": {"D": election.seats("D"), "R": election.seats("R")},
+                        "D votes": election.votes["D"],
+                        "R votes": election.votes["R"],
+                        "District winners": election.winners()
+                    }
+
+                with profiler.timed("stats_write"):
+                    updater_output_file.write(record)
+
+                profiler.step()
+
+    checkpointer.finish()
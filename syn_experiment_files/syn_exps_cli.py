@@ -1,9 +1,5 @@
 import click
-from syn_file_GG import run_experiment_gg
-from syn_file_NG import run_experiment_ng
-from syn_file_GN import run_experiment_gn
-from syn_file_NN import run_experiment_nn
-from syn_file_GGopp import run_experiment_ggopp
+from syn_experiment import ENGINES, EXACT_MODES, EXPERIMENTS, ContiguityPolicy, run_experiment
 
 # Add the choice type to everything.
 @click.command()
@@ -26,7 +22,7 @@ from syn_file_GGopp import run_experiment_ggopp
 @click.option("--experiment-type",
     prompt="Experiment type? (GG, NG, GN, or NN)",
     help="",
-    type=click.Choice(["GG", "GN", "NG", "NN","GGopp"])
+    type=click.Choice(list(EXPERIMENTS))
 )
 @click.option(
     "--init-part",
@@ -46,19 +42,82 @@ from syn_file_GGopp import run_experiment_ggopp
     type=int,
     help="Number of districting plans per building block graph",
 )
+@click.option(
+    "--stats-format",
+    default="jsonl",
+    show_default=True,
+    help="Format of the per-step updater output; none writes none, to keep only --summary",
+    type=click.Choice(["jsonl", "columnar", "none"]),
+)
+@click.option(
+    "--checkpoint-every",
+    default=None,
+    help="Save a resumable checkpoint every this many steps (disabled by default)",
+    type=int,
+)
+@click.option(
+    "--resume",
+    is_flag=True,
+    help="Resume from the checkpoint left by an interrupted run with the same arguments",
+)
+@click.option(
+    "--parallel-bursts",
+    default=None,
+    help="Run this many independent bursts per round of short bursts (GG, NG and GGopp only), each on its own worker process",
+    type=click.IntRange(min=1),
+)
+@click.option(
+    "--profile-every",
+    default=None,
+    help="Time the stages of the chain loop and write their histograms to a _metrics.jsonl file every this many steps",
+    type=click.IntRange(min=1),
+)
+@click.option(
+    "--engine",
+    default="gerrychain",
+    show_default=True,
+    help="Chain implementation; bitset gives the same output several times faster",
+    type=click.Choice(ENGINES),
+)
+@click.option(
+    "--exact",
+    default=None,
+    help="For GN and NN, draw the plans uniformly from all plans of each sample (sample) or count them (count) instead of running the chain, where there are few enough to enumerate",
+    type=click.Choice(EXACT_MODES),
+)
+@click.option(
+    "--contiguity",
+    default="full",
+    show_default=True,
+    help="How to check that districts stay connected: full, changed-districts-only, or audit-every-N to check every district on every N-th proposal only",
+)
+@click.option(
+    "--summary",
+    is_flag=True,
+    help="Also write histograms of the seats won and district vote shares to a .summary.json file next to the updater output",
+)
 def main(
-    num_r_units, map_number, block_size, experiment_type, init_part, random_seed, total_steps
+    num_r_units, map_number, block_size, experiment_type, init_part, random_seed, total_steps,
+    stats_format, checkpoint_every, resume, parallel_bursts, profile_every, engine, exact,
+    contiguity, summary
 ):
-    if experiment_type == "GG":
-        run_experiment_gg(num_r_units, map_number, block_size, init_part, random_seed, total_steps)
-    elif experiment_type == "NG":
-        run_experiment_ng(num_r_units, map_number, block_size, init_part, random_seed, total_steps)
-    elif experiment_type == "GN":
-        run_experiment_gn(num_r_units, map_number, block_size, init_part, random_seed, total_steps)
-    elif experiment_type == "NN":
-        run_experiment_nn(num_r_units, map_number, block_size, init_part, random_seed, total_steps)
-    elif experiment_type == "GGopp":
-        run_experiment_ggopp(num_r_units, map_number, block_size, init_part, random_seed, total_steps)
+    if parallel_bursts is not None and EXPERIMENTS[experiment_type]["party"] is None:
+        raise click.UsageError(f"--parallel-bursts does not apply to {experiment_type}, which runs no short bursts")
+    if parallel_bursts is not None and profile_every is not None:
+        raise click.UsageError("--profile-every times the main process only and cannot be combined with --parallel-bursts")
+    if exact is not None and EXPERIMENTS[experiment_type]["party"] is not None:
+        raise click.UsageError(f"--exact does not apply to {experiment_type}, which runs short bursts")
+    if stats_format == "none" and not summary:
+        raise click.UsageError("--stats-format none writes no statistics at all; add --summary to keep summaries of them")
+    try:
+        ContiguityPolicy(contiguity)
+    except ValueError as error:
+        raise click.BadParameter(str(error), param_hint="--contiguity")
+
+    run_experiment(experiment_type, num_r_units, map_number, block_size, init_part, random_seed,
+        total_steps, stats_format, checkpoint_every=checkpoint_every, resume=resume,
+        parallel_bursts=parallel_bursts, profile_every=profile_every, engine=engine,
+        exact=exact, contiguity=contiguity, summary=summary)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,216 @@
+import click
+import itertools
+import os
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from syn_experiment import ENGINES, EXACT_MODES, EXPERIMENTS, ContiguityPolicy, run_experiment
+
+
+def expand_tasks(experiment_types, r_units, map_numbers, block_sizes, samples, init_parts, random_seeds):
+    """Expands the sweep grid into one task per (experiment, map, block size, sample, init part, seed).
+
+    Tasks are ordered like the nested loops of run_syn_exps.sh, with samples innermost.
+    """
+    return [
+        {
+            "experiment_type": experiment_type,
+            "num_r_units": num_r_units,
+            "map_number": map_number,
+            "block_size": block_size,
+            "sample": sample,
+            "init_part": init_part,
+            "random_seed": random_seed,
+        }
+        for random_seed, init_part, experiment_type, map_number, num_r_units, block_size, sample
+        in itertools.product(
+            random_seeds, init_parts, experiment_types, map_numbers, r_units, block_sizes, samples
+        )
+    ]
+
+
+def run_task(task, total_steps, stats_format, engine, exact, contiguity, summary):
+    """Runs a single building block sample of one experiment.
+
+    Each task reseeds Python's random module from its own coordinates (see
+    chain_tools.seeding.derive_seed), so its output does not depend on how tasks are scheduled.
+    Exceptions are returned rather than raised so that one failing task does not stop the sweep.
+    """
+    start = time.time()
+    try:
+        run_experiment(
+            task["experiment_type"],
+            task["num_r_units"],
+            task["map_number"],
+            task["block_size"],
+            task["init_part"],
+            task["random_seed"],
+            total_steps,
+            stats_format,
+            samples=[task["sample"]],
+            seed_per_sample=True,
+            engine=engine,
+            # Only the neutral chains have an exact counterpart
+            exact=exact if EXPERIMENTS[task["experiment_type"]]["party"] is None else None,
+            contiguity=contiguity,
+            summary=summary,
+        )
+    except Exception:
+        return task, time.time() - start, traceback.format_exc()
+    return task, time.time() - start, None
+
+
+def parse_samples(samples):
+    """Parses a sample selection such as "1-100" or "1,5,9-12" into a list of ints."""
+    selected = []
+    for chunk in samples.split(","):
+        if "-" in chunk:
+            first, last = chunk.split("-")
+            selected.extend(range(int(first), int(last) + 1))
+        else:
+            selected.append(int(chunk))
+    return selected
+
+
+@click.command()
+@click.option(
+    "--experiment-type",
+    "experiment_types",
+    multiple=True,
+    default=list(EXPERIMENTS),
+    show_default=True,
+    help="Experiment types to run; repeat the option to select several",
+    type=click.Choice(list(EXPERIMENTS)),
+)
+@click.option(
+    "--num-r-units",
+    "r_units",
+    multiple=True,
+    default=[72, 86, 58],
+    show_default=True,
+    help="Number of red units in underlying map",
+    type=click.Choice([72, 86, 58]),
+)
+@click.option(
+    "--map-number",
+    "map_numbers",
+    multiple=True,
+    default=[1, 2, 3],
+    show_default=True,
+    type=click.Choice([1, 2, 3]),
+)
+@click.option(
+    "--block-size",
+    "block_sizes",
+    multiple=True,
+    default=[2, 3, 4, 6],
+    show_default=True,
+    type=click.Choice([2, 3, 4, 6]),
+)
+@click.option(
+    "--samples",
+    default="1-100",
+    show_default=True,
+    help='Building block samples to run, e.g. "1-100" or "1,5,9-12"',
+)
+@click.option(
+    "--init-part",
+    "init_parts",
+    multiple=True,
+    default=[1, 2, 3],
+    show_default=True,
+    type=click.Choice([1, 2, 3]),
+)
+@click.option(
+    "--random-seed",
+    "random_seeds",
+    multiple=True,
+    default=[1, 2, 3, 4, 5],
+    show_default=True,
+    type=int,
+)
+@click.option(
+    "--total-steps",
+    default=20000,
+    show_default=True,
+    type=int,
+    help="Number of districting plans per building block graph (must be divisible by 20)",
+)
+@click.option(
+    "--stats-format",
+    default="jsonl",
+    show_default=True,
+    help="Format of the per-step updater output; none writes none, to keep only --summary",
+    type=click.Choice(["jsonl", "columnar", "none"]),
+)
+@click.option(
+    "--workers",
+    default=os.cpu_count(),
+    show_default=True,
+    type=int,
+    help="Number of worker processes",
+)
+@click.option(
+    "--engine",
+    default="gerrychain",
+    show_default=True,
+    help="Chain implementation; bitset gives the same output several times faster",
+    type=click.Choice(ENGINES),
+)
+@click.option(
+    "--exact",
+    default=None,
+    help="For GN and NN, draw the plans uniformly from all plans of each sample (sample) or count them (count) instead of running the chain, where there are few enough to enumerate",
+    type=click.Choice(EXACT_MODES),
+)
+@click.option(
+    "--contiguity",
+    default="full",
+    show_default=True,
+    help="How to check that districts stay connected: full, changed-districts-only, or audit-every-N to check every district on every N-th proposal only",
+)
+@click.option(
+    "--summary",
+    is_flag=True,
+    help="Also write histograms of the seats won and district vote shares to a .summary.json file next to the updater output",
+)
+def main(
+    experiment_types, r_units, map_numbers, block_sizes, samples, init_parts, random_seeds,
+    total_steps, stats_format, workers, engine, exact, contiguity, summary
+):
+    """Runs a grid of synthetic experiments on a process pool, one building block sample per task.
+
+    Writes to the same output paths as syn_exps_cli.py. Every task is seeded from its own
+    coordinates, so results are reproducible for any number of workers, but they are not the
+    same chains as a serial syn_exps_cli.py run, which threads one random stream through all
+    100 samples.
+    """
+    if stats_format == "none" and not summary:
+        raise click.UsageError("--stats-format none writes no statistics at all; add --summary to keep summaries of them")
+    try:
+        ContiguityPolicy(contiguity)
+    except ValueError as error:
+        raise click.BadParameter(str(error), param_hint="--contiguity")
+    tasks = expand_tasks(
+        experiment_types, r_units, map_numbers, block_sizes, parse_samples(samples), init_parts,
+        random_seeds
+    )
+    print(f"Running {len(tasks)} tasks on {workers} workers")
+
+    failures = []
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(run_task, task, total_steps, stats_format, engine, exact, contiguity, summary) for task in tasks]
+        for n_done, future in enumerate(as_completed(futures), start=1):
+            task, elapsed, error = future.result()
+            if error is not None:
+                failures.append((task, error))
+                print(f"FAILED {task}:\n{error}")
+            if n_done % 100 == 0 or n_done == len(tasks):
+                print(f"Finished {n_done} of {len(tasks)} tasks (last took {elapsed:.1f}s)")
+
+    if failures:
+        raise click.ClickException(f"{len(failures)} of {len(tasks)} tasks failed")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,21 @@
+import os
+import sys
+
+import networkx as nx
+import pytest
+from gerrychain import Graph
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture
+def grid_graph():
+    """6x6 grid of unit-population nodes with D/R votes, split into four 3x3 districts in
+    the node attribute "init_part"."""
+    graph = Graph(nx.convert_node_labels_to_integers(nx.grid_2d_graph(6, 6), label_attribute="xy"))
+    for node in graph.nodes:
+        x, y = graph.nodes[node].pop("xy")
+        graph.nodes[node].update(
+            population=1, D=(x * 7 + y * 3) % 5, R=(x * 2 + y * 5) % 4, init_part=2 * (x // 3) + y // 3
+        )
+    return graph
@@ -0,0 +1,43 @@
+import json
+import random
+
+from chain_tools.batch import Manifest, atomic_write_json, process_files
+
+
+def add_draw(path):
+    with open(path) as f:
+        data = json.load(f)
+    data["draw"] = random.random()
+    atomic_write_json(data, path)
+    return data["draw"]
+
+
+def run(root, paths):
+    manifest = Manifest(str(root / "manifest.txt"))
+    return sorted(name for name, _ in process_files(add_draw, paths, str(root), manifest, 7, workers=1))
+
+
+def test_manifest_redoes_files_changed_since(tmp_path):
+    paths = []
+    for i in range(3):
+        paths.append(tmp_path / f"block_size_{i}" / "sample_1.json")
+        paths[-1].parent.mkdir()
+        paths[-1].write_text("{}")
+
+    assert run(tmp_path, paths) == ["block_size_0/sample_1.json", "block_size_1/sample_1.json", "block_size_2/sample_1.json"]
+    assert run(tmp_path, paths) == []
+    assert len(Manifest(str(tmp_path / "manifest.txt"))) == 3
+
+    # A rebuilt block graph has lost what the batch added and must be done again
+    paths[1].write_text("{}")
+    assert len(Manifest(str(tmp_path / "manifest.txt"))) == 2
+    assert run(tmp_path, paths) == ["block_size_1/sample_1.json"]
+    assert "draw" in json.loads(paths[1].read_text())
+    assert run(tmp_path, paths) == []
+
+
+def test_manifest_of_names_only_redoes_every_file(tmp_path):
+    path = tmp_path / "sample_1.json"
+    path.write_text("{}")
+    (tmp_path / "manifest.txt").write_text("sample_1.json\n")
+    assert run(tmp_path, [path]) == ["sample_1.json"]
@@ -0,0 +1,87 @@
+import os
+import random
+import sys
+from functools import partial
+
+import pytest
+from gerrychain import MarkovChain, Partition
+from gerrychain.accept import always_accept
+from gerrychain.constraints import contiguous
+from gerrychain.optimization import Gingleator
+from gerrychain.proposals import recom
+
+import chain_tools.bitset_recom as bitset_recom_module
+from chain_tools.bitset_recom import (
+    BitsetGraph, BitsetPartition, PopcountTally, bitset_contiguous, bitset_recom, unit_bitsets
+)
+from chain_tools.checkpoint import assignment_list
+from chain_tools.election_tally import ElectionTally
+from chain_tools.graph_cache import load_dual_graph
+from chain_tools.scoring import ShareUpdater, reward_partial_dist
+
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "syn_experiment_files"))
+
+from syn_experiment import GRID_PATH, block_graph_path, grid_membership, map_votes, unit_map_path  # noqa: E402
+
+STEPS = 300
+
+
+def initial_partitions(block_size):
+    """The same initial plan of one gerrymandered building block sample, for either engine."""
+    block_data = block_graph_path("gerry", 72, 1, block_size, 1)
+    unit_map = unit_map_path(72, 1)
+    graph = load_dual_graph(block_data)
+    my_updaters = {
+        "election": ElectionTally("election", {"D": "D", "R": "R"}, pop_col="population"),
+        "D_share": ShareUpdater("election", "D", denominator="population"),
+    }
+    node_units, party_units = unit_bitsets(
+        graph, grid_membership(block_data, GRID_PATH), map_votes(unit_map, GRID_PATH), "population"
+    )
+    gerrychain_partition = Partition(graph, "init_part_1", my_updaters)
+    bitset_partition = BitsetPartition(
+        BitsetGraph(graph), "init_part_1",
+        {**my_updaters, "election": PopcountTally("election", node_units, party_units)},
+    )
+    return gerrychain_partition, bitset_partition
+
+
+def neutral_plans(initial, proposal, constraint):
+    random.seed(2024)
+    chain = MarkovChain(
+        partial(proposal, pop_col="population", pop_target=12, epsilon=0, node_repeats=2),
+        [constraint], always_accept, initial, STEPS,
+    )
+    return [(assignment_list(plan), plan["election"].seats("D")) for plan in chain]
+
+
+def burst_plans(initial, proposal, constraint):
+    random.seed(2024)
+    optimizer = Gingleator(
+        proposal=partial(proposal, pop_col="population", pop_target=12, epsilon=0, node_repeats=2),
+        constraints=[constraint],
+        threshold=0.5,
+        initial_state=initial,
+        minority_perc_col="D_share",
+        score_function=reward_partial_dist,
+    )
+    return [
+        (assignment_list(plan), optimizer.score(plan)) for plan in optimizer.short_bursts(20, STEPS // 20)
+    ]
+
+
+@pytest.mark.parametrize("block_size", [2, 3, 4, 6])
+@pytest.mark.parametrize("run", [neutral_plans, burst_plans])
+def test_engines_agree_step_by_step(block_size, run):
+    gerrychain_partition, bitset_partition = initial_partitions(block_size)
+    expected = run(gerrychain_partition, recom, contiguous)
+    plans = run(bitset_partition, bitset_recom, bitset_contiguous)
+    assert len(plans) == len(expected) == STEPS
+    for step, (plan, expected_plan) in enumerate(zip(plans, expected)):
+        assert plan == expected_plan, f"the engines diverge at step {step}"
+
+
+def test_other_gerrychain_versions_are_refused(monkeypatch, grid_graph):
+    monkeypatch.setattr(bitset_recom_module.gerrychain, "__version__", "0.3.3")
+    with pytest.raises(RuntimeError, match="mirrors GerryChain 0.3.2"):
+        BitsetGraph(grid_graph)
@@ -0,0 +1,48 @@
+import random
+from functools import partial
+
+import networkx as nx
+from gerrychain import MarkovChain, Partition
+from gerrychain.accept import always_accept
+from gerrychain.constraints import contiguous
+from gerrychain.proposals import recom
+
+from chain_tools.block_graphs import UNIT_BLOCKS, UNIT_IDS, block_labels, build_block_graphs
+
+
+def quotient_block_graph(grid_graph, partition):
+    """Block graph as the original builders made it, from the partition's assignment dict."""
+    district_units_dict = {}
+    for node, assign in partition.assignment.to_dict().items():
+        district_units_dict.setdefault(assign, set()).add(int(node))
+    subgraph = nx.quotient_graph(grid_graph, list(district_units_dict.values()))
+    return nx.convert_node_labels_to_integers(subgraph)
+
+
+def test_blocks_numbered_like_quotient_graph(grid_graph):
+    random.seed(2024)
+    chain = MarkovChain(
+        partial(recom, pop_col="population", pop_target=9, epsilon=0, node_repeats=2),
+        [contiguous], always_accept, Partition(grid_graph, "init_part"), 20,
+    )
+    partitions = list(chain)
+    samples = [block_labels(partition, grid_graph.nodes) for partition in partitions]
+    block_graphs = build_block_graphs(grid_graph, samples, ("population",))
+
+    for partition, block_graph in zip(partitions, block_graphs):
+        expected = quotient_block_graph(grid_graph, partition)
+        units = {}
+        for unit, block in zip(block_graph["graph"][0][1], block_graph["graph"][1][1]):
+            units.setdefault(block, set()).add(unit)
+        assert [pair[0] for pair in block_graph["graph"]] == [UNIT_IDS, UNIT_BLOCKS]
+        assert [node["id"] for node in block_graph["nodes"]] == list(expected.nodes)
+        assert [units[block] for block in expected.nodes] == [
+            set(data["graph"].nodes) for _, data in expected.nodes(data=True)
+        ]
+        assert [
+            [(neighbor["id"], neighbor["weight"]) for neighbor in adjacency]
+            for adjacency in block_graph["adjacency"]
+        ] == [
+            [(neighbor, data["weight"]) for neighbor, data in expected.adj[block].items()]
+            for block in expected.nodes
+        ]
@@ -0,0 +1,48 @@
+import random
+from functools import partial
+
+import pytest
+from gerrychain import MarkovChain, Partition
+from gerrychain.accept import always_accept
+from gerrychain.constraints import contiguous
+from gerrychain.proposals import recom
+
+from chain_tools.checkpoint import Checkpointer, assignment_list, resumable_markov_chain
+
+TOTAL_STEPS = 30
+
+
+def run_neutral(graph, checkpoint_path, every=None, resume=False, stop_after=None):
+    """Assignments of the plans of a resumable neutral chain on ``graph``."""
+    random.seed(2024)
+    chain = MarkovChain(
+        partial(recom, pop_col="population", pop_target=9, epsilon=0, node_repeats=2),
+        [contiguous], always_accept, Partition(graph, "init_part"), TOTAL_STEPS,
+    )
+    checkpointer = Checkpointer(str(checkpoint_path), every=every, resume=resume)
+    checkpointer.begin()
+    plans = []
+    for plan in resumable_markov_chain(chain, checkpointer):
+        plans.append(assignment_list(plan))
+        if stop_after is not None and len(plans) == stop_after:
+            break
+    return checkpointer.steps_done, plans
+
+
+@pytest.mark.parametrize("every", [1, 7, 10])
+def test_checkpointed_chain_emits_total_steps_plans(grid_graph, tmp_path, every):
+    _, plain = run_neutral(grid_graph, tmp_path / "plain.pkl")
+    _, checkpointed = run_neutral(grid_graph, tmp_path / "checkpoint.pkl", every=every)
+    assert len(plain) == len(checkpointed) == TOTAL_STEPS
+    # Each checkpoint rebuilds the partition it continues from, which reorders its cut edges,
+    # so the chains only agree up to the first checkpoint (see Checkpointer)
+    assert checkpointed[:every] == plain[:every]
+
+
+def test_resumed_chain_continues_where_it_stopped(grid_graph, tmp_path):
+    path = tmp_path / "checkpoint.pkl"
+    _, full = run_neutral(grid_graph, tmp_path / "full.pkl", every=7)
+    _, interrupted = run_neutral(grid_graph, path, every=7, stop_after=17)
+    steps_done, resumed = run_neutral(grid_graph, path, every=7, resume=True)
+    assert steps_done == 14
+    assert interrupted[:steps_done] + resumed == full
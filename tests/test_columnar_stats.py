@@ -0,0 +1,36 @@
+import os
+import sys
+
+import numpy as np
+import pytest
+from click.testing import CliRunner
+
+from chain_tools.columnar_stats import open_stats_sink
+from chain_tools.ensemble_summary import read_summary
+
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "syn_experiment_files"))
+
+import syn_exps_cli  # noqa: E402
+
+
+def test_stats_format_none_needs_summary(tmp_path):
+    with pytest.raises(ValueError, match="summary"):
+        open_stats_sink(str(tmp_path / "run_updaters.jsonl"), "none", [1, 2])
+
+
+def test_stats_format_none_keeps_only_summaries(tmp_path):
+    jsonl_path = str(tmp_path / "run_updaters.jsonl")
+    with open_stats_sink(jsonl_path, "none", [1, 2], summary=True) as sink:
+        for d_votes in ([3, 1], [2, 5]):
+            sink.write({"D votes": np.array(d_votes), "R votes": np.array([2, 2])})
+    assert not os.path.exists(jsonl_path)
+    assert read_summary(jsonl_path)["election"].plans == 2
+
+
+def test_cli_rejects_stats_format_none_without_summary():
+    result = CliRunner().invoke(syn_exps_cli.main, [
+        "--num-r-units", "72", "--map-number", "1", "--block-size", "4", "--experiment-type", "NN",
+        "--init-part", "1", "--random-seed", "1", "--total-steps", "20", "--stats-format", "none",
+    ])
+    assert result.exit_code == 2
+    assert "--summary" in result.output
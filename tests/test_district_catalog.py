@@ -0,0 +1,64 @@
+import random
+from itertools import combinations
+
+import networkx as nx
+import pytest
+
+from chain_tools.district_catalog import CatalogTooLarge, DistrictCatalog
+
+
+def grid(rows, columns):
+    graph = nx.grid_2d_graph(rows, columns)
+    nx.set_node_attributes(graph, 1, "population")
+    return graph
+
+
+def brute_force_plans(graph, size):
+    """Every plan of ``graph`` into connected districts of ``size`` nodes, as sets of districts."""
+    districts = [
+        frozenset(nodes) for nodes in combinations(graph.nodes, size)
+        if nx.is_connected(graph.subgraph(nodes))
+    ]
+    n_parts = len(graph) // size
+    return districts, {
+        frozenset(plan) for plan in combinations(districts, n_parts)
+        if len(frozenset().union(*plan)) == len(graph)
+    }
+
+
+@pytest.mark.parametrize("rows, columns, size", [(2, 4, 2), (3, 4, 3), (4, 4, 2), (3, 4, 4)])
+def test_counts_match_brute_force(rows, columns, size):
+    graph = grid(rows, columns)
+    catalog = DistrictCatalog(graph, len(graph) // size, "population")
+    districts, plans = brute_force_plans(graph, size)
+
+    assert {frozenset(catalog.district_nodes(district)) for district in catalog.districts} == set(districts)
+    assert catalog.count() == len(plans)
+
+    # Plans by how many of their districts hold a corner of the top row
+    corners = {(0, 0), (0, columns - 1)}
+    holds_corner = [
+        int(bool(corners & set(catalog.district_nodes(district)))) for district in catalog.districts
+    ]
+    expected = {}
+    for plan in plans:
+        total = sum(bool(corners & district) for district in plan)
+        expected[total] = expected.get(total, 0) + 1
+    assert catalog.distribution(holds_corner) == dict(sorted(expected.items()))
+
+def test_samples_are_plans():
+    graph = grid(3, 4)
+    catalog = DistrictCatalog(graph, 4, "population")
+    _, plans = brute_force_plans(graph, 3)
+    rng = random.Random(5)
+    for _ in range(50):
+        assignment = catalog.sample(rng)
+        plan = frozenset(
+            frozenset(node for node in assignment if assignment[node] == part) for part in range(4)
+        )
+        assert plan in plans
+
+
+def test_too_many_states():
+    with pytest.raises(CatalogTooLarge):
+        DistrictCatalog(grid(4, 4), 8, "population", max_states=10).count()
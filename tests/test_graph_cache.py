@@ -0,0 +1,41 @@
+import os
+
+import networkx as nx
+import pytest
+from gerrychain import Graph
+
+from chain_tools.graph_cache import compile_graph, load_graph
+
+BLOCK_GRAPH = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    "syn_experiment_files/syn_building_block_partitions/gerry/r_units_72_map_1_burst_length_20/"
+    "block_size_2/sample_1.json",
+)
+
+
+def assert_same_graph(loaded, expected):
+    assert type(loaded) is type(expected)
+    assert loaded.graph == expected.graph
+    assert list(loaded.nodes(data=True)) == list(expected.nodes(data=True))
+    assert [list(loaded.adj[node].items()) for node in loaded] == [
+        list(expected.adj[node].items()) for node in expected
+    ]
+    for u, v in loaded.edges:
+        assert loaded[u][v] is loaded[v][u]
+
+
+def test_compiled_graph_loads_like_json(tmp_path):
+    compiled = compile_graph(BLOCK_GRAPH, str(tmp_path / "sample_1.graph"))
+    assert_same_graph(load_graph(compiled), Graph.from_json(BLOCK_GRAPH))
+
+
+def test_compiled_graph_warns_for_islands(tmp_path, grid_graph):
+    graph = Graph(grid_graph)
+    graph.add_node(100, population=1, D=0, R=0, init_part=0)
+    graph.to_json(str(tmp_path / "islands.json"))
+    with pytest.warns(UserWarning):
+        expected = Graph.from_json(str(tmp_path / "islands.json"))
+    compiled = compile_graph(str(tmp_path / "islands.json"))
+    with pytest.warns(UserWarning):
+        loaded = load_graph(compiled)
+    assert_same_graph(loaded, expected)
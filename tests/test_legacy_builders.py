@@ -0,0 +1,41 @@
+import json
+import os
+import random
+import sys
+
+from click.testing import CliRunner
+
+from chain_tools.block_graphs import build_block_graphs
+
+SYN_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "syn_experiment_files")
+sys.path.append(SYN_DIR)
+
+import block_builder_neutral  # noqa: E402
+import block_sampling_diagnostic  # noqa: E402
+
+
+def test_legacy_neutral_run_reproduces_published_sample():
+    # The first block size of `block_builder_neutral.py --legacy-serial` with its default seed
+    grid_graph = block_builder_neutral.load_grid_graph()
+    random.seed(346)
+    samples = block_builder_neutral.thinned_neutral_samples(grid_graph, 2, num_samples=1, legacy=True)
+    built = build_block_graphs(grid_graph, samples, ("population",))[0]
+
+    with open(f"{SYN_DIR}/syn_building_block_partitions/neutral/block_size_2/sample_1.json") as f:
+        published = json.load(f)
+    block_of = dict(zip(built["graph"][0][1], built["graph"][1][1]))
+    assert [
+        sorted(unit for unit, block in block_of.items() if block == node["id"]) for node in built["nodes"]
+    ] == [sorted(json.loads(node["units"])) for node in published["nodes"]]
+    assert built["adjacency"] == published["adjacency"]
+    assert [node["population"] for node in built["nodes"]] == [node["population"] for node in published["nodes"]]
+
+
+def test_block_sampling_diagnostic_runs_on_the_tracked_maps(tmp_path):
+    result = CliRunner().invoke(block_sampling_diagnostic.main, [
+        "--builder", "gerry", "--block-size", "4", "--samples", "3", "--thin-every", "20",
+        "--burn-in", "20", "--workers", "1", "--output", str(tmp_path / "diagnostic.json"),
+    ])
+    assert result.exit_code == 0, result.output
+    with open(tmp_path / "diagnostic.json") as f:
+        assert set(json.load(f)["summaries"]) == {"thinned", "independent"}
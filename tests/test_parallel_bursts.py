@@ -0,0 +1,57 @@
+import multiprocessing
+from functools import partial
+
+import pytest
+from gerrychain import Partition
+from gerrychain.constraints import contiguous
+from gerrychain.optimization import Gingleator
+from gerrychain.proposals import recom
+
+from chain_tools.checkpoint import assignment_list
+from chain_tools.election_tally import ElectionTally
+from chain_tools.parallel_bursts import parallel_short_bursts
+from chain_tools.scoring import ShareUpdater, reward_partial_dist
+
+
+def make_optimizer(graph):
+    initial = Partition(graph, "init_part", {
+        "election": ElectionTally("election", {"D": "D", "R": "R"}),
+        "D_share": ShareUpdater("election", "D"),
+    })
+    return Gingleator(
+        proposal=partial(recom, pop_col="population", pop_target=9, epsilon=0, node_repeats=2),
+        constraints=[contiguous],
+        threshold=0.5,
+        initial_state=initial,
+        minority_perc_col="D_share",
+        score_function=reward_partial_dist,
+    )
+
+
+@pytest.mark.parametrize("start_method", ["spawn", "forkserver"])
+def test_parallel_bursts_emit_burst_length_plans_per_burst(grid_graph, start_method):
+    if start_method not in multiprocessing.get_all_start_methods():
+        pytest.skip(f"{start_method} is not available on this platform")
+    optimizer = make_optimizer(grid_graph)
+    plans = list(parallel_short_bursts(
+        optimizer, burst_length=5, num_rounds=2, bursts_per_round=2, random_seed=1,
+        mp_context=multiprocessing.get_context(start_method),
+    ))
+    # Like short_bursts, each burst is its start plan followed by burst_length - 1 proposals
+    assert len(plans) == 2 * 2 * 5
+    # and no burst repeats its start plan
+    assert all(plan.flips for i, plan in enumerate(plans) if i % 5)
+
+
+def test_parallel_bursts_do_not_depend_on_worker_count(grid_graph):
+    def run(workers):
+        plans = parallel_short_bursts(
+            make_optimizer(grid_graph), burst_length=4, num_rounds=3, bursts_per_round=3,
+            random_seed=11, workers=workers,
+        )
+        return [assignment_list(plan) for plan in plans]
+
+    one_worker = run(1)
+    assert len(one_worker) == 3 * 3 * 4
+    assert run(3) == one_worker
+    assert run(2) == one_worker